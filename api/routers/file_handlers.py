@@ -79,7 +79,7 @@ class FileHandlers:
                 
                 contents = await audio_file.read()
                 file_size = len(contents)
-                filepath = self.audio_storage.save_uploaded_file(contents, safe_filename)
+                filepath = await self.audio_storage.save_uploaded_file_async(contents, safe_filename)
 
                 # 音频预处理：转换为16kHz WAV格式（提升转写性能）
                 preprocess_enabled = True
@@ -103,8 +103,7 @@ class FileHandlers:
                         if success:
                             # 预处理成功，更新文件路径和大小
                             filepath = new_filepath
-                            if os.path.exists(filepath):
-                                file_size = os.path.getsize(filepath)
+                            file_size = self.audio_storage.get_file_size(filepath) or file_size
                             # 更新文件名（可能从.mp3变成.wav）
                             safe_filename = os.path.basename(new_filepath)
                             logger.info(f"音频预处理成功: {audio_file.filename} -> {safe_filename}")
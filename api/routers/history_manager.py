@@ -6,8 +6,15 @@
 import os
 import json
 import logging
+from pathlib import Path
 from typing import TYPE_CHECKING
 
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
 from config import FILE_CONFIG
 
 if TYPE_CHECKING:
@@ -28,40 +35,40 @@ def load_history_from_file(uploaded_files_manager: 'ThreadSafeFileManager'):
     """
     try:
         if os.path.exists(HISTORY_FILE):
-            with open(HISTORY_FILE, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                completed_files_from_disk = data.get('files', [])
-                # 兼容老数据：补齐 user 字段，避免后续按 user 过滤时报 KeyError
-                for f in completed_files_from_disk:
-                    if isinstance(f, dict) and 'user' not in f:
-                        f['user'] = 'anonymous'
-                
-                # 保留当前内存中未完成的文件
-                all_files = uploaded_files_manager.get_all_files()
-                current_incomplete_files = [f for f in all_files 
-                                           if f['status'] in ['uploaded', 'processing', 'error']]
-                
-                # 合并：未完成的文件 + 磁盘上的已完成文件
-                # 使用字典去重，以file_id为key
-                files_dict = {}
-                
-                # 先添加未完成的文件
-                for f in current_incomplete_files:
-                    files_dict[f['id']] = f
-                
-                # 再添加已完成的文件（如果有重复，已完成的会覆盖）
-                for f in completed_files_from_disk:
-                    files_dict[f['id']] = f
-                
-                # 重新构建管理器（需要在锁内完成）
-                uploaded_files_manager._lock.acquire()
-                try:
-                    uploaded_files_manager._files = list(files_dict.values())
-                    uploaded_files_manager._completed_files = data.get('completed_files', [])
-                finally:
-                    uploaded_files_manager._lock.release()
-                
-                logger.info(f"已加载 {len(completed_files_from_disk)} 条历史记录，当前总文件数: {len(files_dict)}")
+            # 一次性读取字节并解析（orjson 直接处理 UTF-8 字节，省去 str 解码）
+            data = _json_loads(Path(HISTORY_FILE).read_bytes())
+            completed_files_from_disk = data.get('files', [])
+            # 兼容老数据：补齐 user 字段，避免后续按 user 过滤时报 KeyError
+            for f in completed_files_from_disk:
+                if isinstance(f, dict) and 'user' not in f:
+                    f['user'] = 'anonymous'
+            
+            # 保留当前内存中未完成的文件
+            all_files = uploaded_files_manager.get_all_files()
+            current_incomplete_files = [f for f in all_files 
+                                       if f['status'] in ['uploaded', 'processing', 'error']]
+            
+            # 合并：未完成的文件 + 磁盘上的已完成文件
+            # 使用字典去重，以file_id为key
+            files_dict = {}
+            
+            # 先添加未完成的文件
+            for f in current_incomplete_files:
+                files_dict[f['id']] = f
+            
+            # 再添加已完成的文件（如果有重复，已完成的会覆盖）
+            for f in completed_files_from_disk:
+                files_dict[f['id']] = f
+            
+            # 重新构建管理器（需要在锁内完成）
+            uploaded_files_manager._lock.acquire()
+            try:
+                uploaded_files_manager._files = list(files_dict.values())
+                uploaded_files_manager._completed_files = data.get('completed_files', [])
+            finally:
+                uploaded_files_manager._lock.release()
+            
+            logger.info(f"已加载 {len(completed_files_from_disk)} 条历史记录，当前总文件数: {len(files_dict)}")
     except Exception as e:
         logger.error(f"加载历史记录失败: {e}")
 
@@ -324,6 +324,7 @@ class PipelineService:
                                 mask_char=profanity_cfg.get("mask_char", "*"),
                                 replacement=profanity_cfg.get("replacement", "[不当内容已处理]"),
                                 match_mode=profanity_cfg.get("match_mode", "substring"),
+                                regex_engine=profanity_cfg.get("regex_engine", "re"),
                             )
                             if hit:
                                 entry["words"] = new_words
@@ -337,6 +338,7 @@ class PipelineService:
                                 profanity_mask_char=profanity_cfg.get("mask_char", "*"),
                                 profanity_replacement=profanity_cfg.get("replacement", "[不当内容已处理]"),
                                 profanity_match_mode=profanity_cfg.get("match_mode", "substring"),
+                                profanity_regex_engine=profanity_cfg.get("regex_engine", "re"),
                             )
                             if meta.get("changed") and processed_text != entry.get("text", ""):
                                 entry["text"] = processed_text
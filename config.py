@@ -80,7 +80,13 @@ MODEL_CONFIG = {
     # 热词配置（可选）
     # SeACo-Paraformer支持热词定制，可以提升特定词汇的识别准确率
     # 格式：空格分隔的热词列表，例如：'达摩院 魔搭 阿里巴巴'
-    "hotword": ''  # 留空表示不使用热词，使用时填入热词，如：'人工智能 深度学习'
+    "hotword": '',  # 留空表示不使用热词，使用时填入热词，如：'人工智能 深度学习'
+
+    # 推理精度：auto 在CUDA上使用fp16、CPU上使用fp32；识别准确率异常时可设为 fp32
+    # fp16/bf16 仅在CUDA上作用于ASR主模型，VAD/PUNC/说话人模型保持FP32；
+    # 半精度权重显存减半，同一张卡可容纳更多模型池实例
+    "precision": os.getenv("ASR_PRECISION", "auto"),  # auto / fp32 / fp16 / bf16
+    "cpu_int8_quantize": os.getenv("ASR_CPU_INT8", "false").lower() == "true"  # CPU部署时对VAD/PUNC模型做int8动态量化
 }
 
 # 3. 语言配置
@@ -124,6 +130,8 @@ TEXT_POSTPROCESS_CONFIG = {
         # - substring: 中文/混合内容默认（命中子串即处理）
         # - word: 仅按“词边界”匹配（适合纯英文/数字词）
         "match_mode": os.getenv("TEXT_PROFANITY_MATCH_MODE", "substring").lower(),
+        # 正则词条（/regex/）的匹配引擎：re | re2（re2 需安装 google-re2，线性时间匹配，避免回溯爆炸）
+        "regex_engine": os.getenv("TEXT_PROFANITY_REGEX_ENGINE", "re").lower(),
         # 词表来源：
         # - TEXT_PROFANITY_WORDS: 逗号分隔词表，例如 "xxx,yyy,zzz"
         # - TEXT_PROFANITY_WORDS_FILE: 词库文件路径（支持注释/空行）
@@ -171,6 +179,10 @@ CONCURRENCY_CONFIG = {
     # 模型池配置
     "use_model_pool": True,   # ✅ 启用模型池，支持并发处理
     "asr_pool_size": 6,       # ASR模型池大小（6个实例，平衡性能与内存）
+    # 启动时同步创建的ASR实例数，其余实例由后台线程补齐到最小实例数或在请求到达时按需创建
+    "asr_pool_initial_size": int(os.getenv("ASR_POOL_INITIAL_SIZE", "1")),
+    # 空闲实例回收后至少保留的ASR实例数（设为池大小则常驻全部实例、不回收）
+    "asr_pool_min_size": int(os.getenv("ASR_POOL_MIN_SIZE", "1")),
     "diarization_pool_size": 0,  # FunASR一体化模式不需要单独的声纹分离池
 
     # 线程池配置
@@ -185,6 +197,13 @@ CONCURRENCY_CONFIG = {
     "task_timeout": 3600,    # 单个任务最大执行时间(秒)
     "model_acquire_timeout": 60,  # 获取模型超时时间(秒)
 
+    # ASR动态批处理：窗口期内到达的请求合并为一次 generate 调用（同一热词才会合并）
+    "asr_batch_max_size": int(os.getenv("ASR_BATCH_MAX_SIZE", "1")),  # 最大批量，默认 1 表示关闭
+    "asr_batch_timeout_ms": int(os.getenv("ASR_BATCH_TIMEOUT_MS", "20")),  # 凑批等待窗口（毫秒）
+    # CUDA 上只加载一份模型：多份实例无法在同一张卡上并行计算，只会成倍占用显存，
+    # 吞吐由动态批处理提供（未设置 ASR_BATCH_MAX_SIZE 时，批量上限取原模型池大小）
+    "asr_cuda_single_instance": os.getenv("ASR_CUDA_SINGLE_INSTANCE", "true").lower() == "true",
+
     # 限流配置
     "rate_limit": {
         "enabled": True,
@@ -201,7 +220,20 @@ DIFY_CONFIG = {
     # workflow_id: 留空则使用已发布的工作流版本，指定则使用特定版本的工作流 ID
     # 注意：如果使用 workflow_id，必须是已发布版本的 ID，不能是草稿版本
     "workflow_id": os.getenv("DIFY_WORKFLOW_ID", ""),  # 可选，留空使用已发布的工作流
-    "user_id": os.getenv("DIFY_USER_ID")  # Dify 用户 ID（必须通过环境变量配置）
+    "user_id": os.getenv("DIFY_USER_ID"),  # Dify 用户 ID（必须通过环境变量配置）
+    # 发送队列与工作线程（事件异步发送，队列满时丢弃）
+    "queue_size": int(os.getenv("DIFY_QUEUE_SIZE", "512")),  # 发送队列最大长度
+    "workers": int(os.getenv("DIFY_WORKERS", "4")),  # 发送工作线程数
+    # 批量发送：>1 时将非 ERROR 事件合并为一次工作流调用（inputs.batch 为 JSON 数组字符串），
+    # 需要工作流支持 batch 输入；默认 1 表示逐条发送
+    "batch_max_size": int(os.getenv("DIFY_BATCH_MAX_SIZE", "1")),
+    "batch_flush_ms": int(os.getenv("DIFY_BATCH_FLUSH_MS", "200"))  # 批量等待窗口（毫秒）
+}
+
+# 6.1 监控配置
+MONITORING_CONFIG = {
+    # Prometheus 导出结果缓存时间（毫秒）：缓存期内的并发/重复抓取直接返回上次结果，0 表示不缓存
+    "prometheus_export_ttl_ms": int(os.getenv("PROM_EXPORT_TTL_MS", "1000")),
 }
 
 # 7. AI模型API配置（用于生成会议纪要）
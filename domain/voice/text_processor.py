@@ -4,18 +4,298 @@ Domain - 文本处理领域逻辑
 """
 
 import re
-from typing import List, Dict, Set, Optional, Tuple
+import functools
+import itertools
+from typing import List, Dict, Set, Optional, Tuple, NamedTuple, Pattern
+
+# pyahocorasick 为可选依赖：缺失时逐个词条查找
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+# google-re2 为可选依赖：启用 re2 引擎时 /regex/ 词条用线性时间的 RE2 匹配，缺失时使用 re
+try:
+    import re2
+except ImportError:
+    re2 = None
+
+# 实体抽取：单次扫描（数字/时间/人名三类字符集互不相交，合并后结果与分开 findall 一致）
+# 时间单位用前瞻匹配，不消耗字符，保证后续中文片段的切分方式不变
+_ENTITY_RE = re.compile(r'(?P<num>\d+)(?:(?=(?P<unit>[年月日时分秒])))?|(?P<name>[\u4e00-\u9fff]{2,4})')
+_ENTITY_STOP_CHARS = frozenset('的了我是在有')
+
+# 热词扩展同义词表（模块级常量，避免每次调用重建）
+_HOTWORD_SYNONYMS: Dict[str, Tuple[str, ...]] = {
+    'AI': ('人工智能', '机器学习', '深度学习'),
+    '人工智能': ('AI', '机器学习', '深度学习'),
+    '会议': ('开会', '讨论', '商议'),
+    '项目': ('工程', '任务', '计划'),
+    '技术': ('科技', '工程', '研发'),
+    '产品': ('商品', '服务', '方案'),
+    '市场': ('销售', '营销', '推广'),
+    '客户': ('用户', '消费者', '买家'),
+    '团队': ('小组', '部门', '组织'),
+    '预算': ('费用', '成本', '资金'),
+}
+
+# 文本清理：中文字符之间的空格、连续空白
+_CN_INNER_SPACE_RE = re.compile(r'([\u4e00-\u9fff])\s+([\u4e00-\u9fff])')
+_WHITESPACE_RE = re.compile(r'\s+')
+
+# 明显叠词/口吃重复（文本和 words 两种粒度共用，按顺序应用）：
+# 填充词连续重复、中文 2~6 字短语连续重复、带空格的中文短语重复、英文连续重复单词
+_FILLER_REPEAT_RE = re.compile(r"(?:(嗯|呃|额|啊|唉|哎|诶))(?:[\s,，、]*(嗯|呃|额|啊|唉|哎|诶))+")
+_CN_PHRASE_REPEAT_RE = re.compile(r"([\u4e00-\u9fff]{2,6})\1{1,}")
+_CN_PHRASE_SPACED_REPEAT_RE = re.compile(r"([\u4e00-\u9fff]{2,6})(?:\s+\1){1,}")
+_EN_WORD_REPEAT_RE = re.compile(r"\b([A-Za-z]{2,})\b(?:\s+\1\b)+", re.IGNORECASE)
+
+# 不当词过滤：英文/数字词条（按单词边界匹配）及单词字符集
+_ASCII_WORD_RE = re.compile(r"[A-Za-z0-9_]+")
+_ASCII_WORD_CHARS = frozenset("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789_")
+# /regex/flags 形式的词条：取最后一个 / 作为正则结束
+_REGEX_RULE_RE = re.compile(r"/(.*)/([^/]*)", re.DOTALL)
+_REGEX_RULE_FLAGS = {"i": re.IGNORECASE, "m": re.MULTILINE, "s": re.DOTALL, "x": re.VERBOSE}
+# RE2 支持的内联标志（不支持 VERBOSE）
+_RE2_INLINE_FLAGS = (("i", re.IGNORECASE), ("m", re.MULTILINE), ("s", re.DOTALL))
+
+
+class _CompiledProfanity(NamedTuple):
+    """预编译的不当词词表"""
+    literals: Tuple[str, ...]            # 普通词条（排序去重，子串匹配）
+    word_pattern: Optional[Pattern]      # 英文/数字词条合并的单个交替正则（单词边界，忽略大小写）
+    regex_patterns: Tuple[Pattern, ...]  # 单独匹配的 /regex/ 词条（re 或 RE2 编译，编译失败的已跳过）
+    fused_patterns: Tuple[Tuple[Pattern, int], ...]  # 按标志合并的 /regex/ 词条：(正则, 词条数)
+
+
+def _fuse_regex_rules(bodies: List[str], flags: int) -> Optional[Pattern]:
+    """
+    将同一组标志的多条正则合并为一个正则，对文本只扫描一次
+    
+    前导前瞻要求至少一条规则在当前位置命中，随后每条规则各自在可选前瞻中捕获（第 i 组对应第 i 条），
+    因此同一位置多条规则的命中都会记录，不会被交替的“先到先得”吞掉
+    """
+    # VERBOSE 下 # 注释会延续到行尾，用换行结束每条规则
+    end = "\n" if flags & re.VERBOSE else ""
+    guard = "|".join(f"(?:{body}{end})" for body in bodies)
+    captures = "".join(f"(?:(?=({body}{end})))?" for body in bodies)
+    try:
+        return re.compile(f"(?=(?:{guard})){captures}", flags)
+    except re.error:
+        return None
+
+
+def _compile_re2(body: str, flags: int):
+    """
+    用 RE2 编译正则词条，不可用或不支持该语法（反向引用、环视、VERBOSE 等）时返回 None
+    
+    RE2 不回溯，匹配时间与文本长度成线性，用户配置的正则不会出现灾难性回溯；
+    注意 RE2 的 \\w、\\s、\\b 只识别 ASCII 字符
+    """
+    if re2 is None or flags & re.VERBOSE:
+        return None
+    inline = "".join(flag for flag, bit in _RE2_INLINE_FLAGS if flags & bit)
+    try:
+        return re2.compile(f"(?{inline}){body}" if inline else body)
+    except Exception:
+        return None
+
+
+@functools.lru_cache(maxsize=128)
+def _compile_profanity(profanity_words: Tuple[str, ...], use_re2: bool = False) -> Optional[_CompiledProfanity]:
+    """
+    解析并编译词表（按词表元组缓存，相同词表再次调用只做匹配），没有可用词条时返回 None
+    
+    use_re2 时 /regex/ 词条优先用 RE2 单独编译（RE2 不支持前瞻，无法参与合并），RE2 不支持的词条仍用 re
+    """
+    literals = set()
+    ascii_words = set()
+    regex_patterns = []
+    # 不含捕获组的正则按标志分组合并（捕获组会打乱组号、可能包含反向引用，单独匹配）
+    fusable: Dict[int, Dict[str, Pattern]] = {}
+
+    for rule in profanity_words:
+        rule = rule.strip() if rule else ""
+        if not rule:
+            continue
+
+        # /regex/ 或 /regex/i（可选 i/m/s/x 标志）
+        m = _REGEX_RULE_RE.fullmatch(rule)
+        if m:
+            flags = 0
+            for flag in m.group(2).strip().lower():
+                flags |= _REGEX_RULE_FLAGS.get(flag, 0)
+            if use_re2:
+                pattern = _compile_re2(m.group(1), flags)
+                if pattern is not None:
+                    regex_patterns.append(pattern)
+                    continue
+            try:
+                # 包一层非捕获组校验，保证规则能作为合并正则的一个分支（如全局内联标志只能单独使用）
+                pattern = re.compile(f"(?:{m.group(1)})", flags)
+            except re.error:
+                try:
+                    regex_patterns.append(re.compile(m.group(1), flags))
+                except re.error:
+                    # 正则有误则跳过
+                    pass
+                continue
+            if pattern.groups:
+                regex_patterns.append(re.compile(m.group(1), flags))
+            else:
+                fusable.setdefault(flags, {})[m.group(1)] = pattern
+            continue
+
+        # 英文/数字词默认按单词边界匹配
+        if _ASCII_WORD_RE.fullmatch(rule):
+            ascii_words.add(rule)
+            continue
+
+        literals.add(rule)
+
+    # 英文/数字词条两侧都是单词边界，命中互不重叠，合并为一个交替正则只扫描一次
+    word_pattern = None
+    if ascii_words:
+        alternation = "|".join(map(re.escape, sorted(ascii_words, key=len, reverse=True)))
+        word_pattern = re.compile(rf"\b(?:{alternation})\b", re.IGNORECASE)
+
+    fused_patterns = []
+    for flags, patterns in fusable.items():
+        fused = _fuse_regex_rules(list(patterns), flags) if len(patterns) > 1 else None
+        if fused is not None:
+            fused_patterns.append((fused, len(patterns)))
+        else:
+            regex_patterns.extend(patterns.values())
+
+    if not (literals or word_pattern or regex_patterns or fused_patterns):
+        return None
+    return _CompiledProfanity(
+        tuple(sorted(literals)), word_pattern, tuple(regex_patterns), tuple(fused_patterns)
+    )
+
+
+@functools.lru_cache(maxsize=128)
+def _literal_automaton(literals: Tuple[str, ...]):
+    """为普通词条构建 Aho–Corasick 自动机（按排序后的词条元组缓存）"""
+    automaton = ahocorasick.Automaton()
+    for word in literals:
+        automaton.add_word(word, len(word))
+    automaton.make_automaton()
+    return automaton
+
+
+@functools.lru_cache(maxsize=128)
+def _literal_pattern(literals: Tuple[str, ...], word_mode: bool) -> Pattern:
+    """
+    无 pyahocorasick 时使用的单个交替正则（按词条元组和匹配模式缓存）
+    
+    前瞻内捕获使每个位置都尝试匹配，长词条在前保证取到该位置最长的命中，
+    合并后与自动机得到的全部（含重叠）命中一致；word 模式的边界断言放在前瞻内，
+    最长词条不满足边界时会回溯尝试较短的词条
+    """
+    alternation = "|".join(map(re.escape, sorted(literals, key=len, reverse=True)))
+    if word_mode:
+        return re.compile(rf"(?<![A-Za-z0-9_])(?=((?:{alternation})(?![A-Za-z0-9_])))")
+    return re.compile(rf"(?=({alternation}))")
+
+
+def _find_literal_spans(text: str, literals: Tuple[str, ...], word_mode: bool) -> List[Tuple[int, int]]:
+    """
+    查找普通词条的命中位置，对文本只扫描一次
+    
+    word 模式下命中两侧不能紧邻英文字母/数字/下划线（对中英混合更稳一点）
+    """
+    if ahocorasick is None:
+        return [m.span(1) for m in _literal_pattern(literals, word_mode).finditer(text)]
+
+    spans: List[Tuple[int, int]] = []
+    n = len(text)
+    for end, length in _literal_automaton(literals).iter(text):
+        s, e = end - length + 1, end + 1
+        if word_mode and ((s > 0 and text[s - 1] in _ASCII_WORD_CHARS)
+                          or (e < n and text[e] in _ASCII_WORD_CHARS)):
+            continue
+        spans.append((s, e))
+    return spans
+
+
+def _merge_spans(spans: List[Tuple[int, int]], join_adjacent: bool = True) -> List[Tuple[int, int]]:
+    """合并重叠的 spans（join_adjacent 时相邻的也合并），结果按起点排序"""
+    if not spans:
+        return []
+    spans = sorted(spans)
+    merged: List[Tuple[int, int]] = []
+    cur_s, cur_e = spans[0]
+    for s, e in spans[1:]:
+        if s < cur_e or (join_adjacent and s == cur_e):
+            cur_e = max(cur_e, e)
+        else:
+            merged.append((cur_s, cur_e))
+            cur_s, cur_e = s, e
+    merged.append((cur_s, cur_e))
+    return merged
+
+
+def _split_spans_by_word(spans: List[Tuple[int, int]], texts: List[str],
+                         starts: List[int]) -> List[Tuple[int, int, int]]:
+    """
+    将已排序且不重叠的 spans 按 word 切分为 (word 下标, 词内起点, 词内终点)
+    
+    spans 和 word 偏移都是递增的，双指针单次遍历即可，无需对每个 span 从头扫描 words
+    """
+    ops: List[Tuple[int, int, int]] = []
+    n = len(texts)
+    i = 0
+    for s, e in spans:
+        # 跳过完全位于 span 之前的 word（可能与下一个 span 相交的 word 保留）
+        while i < n and starts[i] + len(texts[i]) <= s:
+            i += 1
+        j = i
+        while j < n and starts[j] < e:
+            local_s = max(0, s - starts[j])
+            local_e = min(len(texts[j]), e - starts[j])
+            if local_s < local_e:
+                ops.append((j, local_s, local_e))
+            j += 1
+    return ops
+
+
+def _splice(text: str, ops: List[Tuple[int, int, str]]) -> str:
+    """按升序且不重叠的 (起点, 终点, 替换文本) 一次拼接出新文本（避免逐次切片拼接的重复拷贝）"""
+    pieces: List[str] = []
+    cur = 0
+    for s, e, repl in ops:
+        pieces.append(text[cur:s])
+        pieces.append(repl)
+        cur = e
+    pieces.append(text[cur:])
+    return "".join(pieces)
+
+
+def _rebuild_words(words: List[Dict], texts: List[str], changed_indices) -> List[Dict]:
+    """生成新的 words 列表：被修改的 word 复制后写入新文本，其余 word 直接复用（不修改传入的 words）"""
+    new_words = list(words)
+    for idx in changed_indices:
+        new_word = dict(words[idx])
+        new_word["text"] = texts[idx]
+        new_words[idx] = new_word
+    return new_words
 
 
 class TextProcessor:
     """文本处理器 - 处理热词、智能后处理等"""
 
+    def __init__(self):
+        # 最近一次 post_process_text 的 (参数, 结果)：流式识别时同一段假设文本常被重复提交，直接复用结果
+        self._last_post_process: Optional[Tuple[tuple, str, Dict]] = None
+
     def process_hotword(self, hotword: str) -> str:
         """智能处理热词,提升识别效果"""
-        if not hotword or not hotword.strip():
+        # str.split() 无参数时按空白切分且不会产生空串，无需再逐个 strip 校验
+        hotwords = hotword.split() if hotword else []
+        if not hotwords:
             return ''
 
-        hotwords = [word.strip() for word in hotword.split() if word.strip()]
         unique_hotwords = list(dict.fromkeys(hotwords))
         expanded_hotwords = self._expand_hotwords(unique_hotwords)
 
@@ -25,22 +305,10 @@ class TextProcessor:
         """扩展热词,添加相关词汇"""
         expanded = set(hotwords)
 
-        synonym_map = {
-            'AI': ['人工智能', '机器学习', '深度学习'],
-            '人工智能': ['AI', '机器学习', '深度学习'],
-            '会议': ['开会', '讨论', '商议'],
-            '项目': ['工程', '任务', '计划'],
-            '技术': ['科技', '工程', '研发'],
-            '产品': ['商品', '服务', '方案'],
-            '市场': ['销售', '营销', '推广'],
-            '客户': ['用户', '消费者', '买家'],
-            '团队': ['小组', '部门', '组织'],
-            '预算': ['费用', '成本', '资金']
-        }
-
         for word in hotwords:
-            if word in synonym_map:
-                expanded.update(synonym_map[word])
+            synonyms = _HOTWORD_SYNONYMS.get(word)
+            if synonyms:
+                expanded.update(synonyms)
 
         return list(expanded)
     
@@ -66,10 +334,10 @@ class TextProcessor:
             return text
         
         # 去除中文字符之间的空格
-        text = re.sub(r'([\u4e00-\u9fff])\s+([\u4e00-\u9fff])', r'\1\2', text)
+        text = _CN_INNER_SPACE_RE.sub(r'\1\2', text)
         
         # 去除多个连续空格
-        text = re.sub(r'\s+', ' ', text)
+        text = _WHITESPACE_RE.sub(' ', text)
         
         # 去除首尾空格
         text = text.strip()
@@ -86,12 +354,15 @@ class TextProcessor:
         profanity_mask_char: str = "*",
         profanity_replacement: str = "[不当内容已处理]",
         profanity_match_mode: str = "substring",
+        profanity_regex_engine: str = "re",
     ) -> Tuple[str, Dict]:
         """
         文本后处理（可用于展示/导出），包含：
         - 明显叠词/口吃式重复清理（中英文）
         - 不当词汇过滤（可配置词表 + 行为）
 
+        与上一次调用的文本和参数完全相同时直接返回上次的结果
+
         Returns:
             (processed_text, meta)
             meta: {'changed': bool, 'removed_repetitions': bool, 'profanity_hit': bool}
@@ -99,6 +370,16 @@ class TextProcessor:
         if not text or text == "[未识别到语音]":
             return text, {"changed": False, "removed_repetitions": False, "profanity_hit": False}
 
+        key = (
+            text, remove_repetitions, tuple(profanity_words) if profanity_words else None,
+            profanity_action, profanity_mask_char, profanity_replacement,
+            profanity_match_mode, profanity_regex_engine,
+        )
+        # 整体读取一次，多线程共用实例时不会读到新旧混合的记录
+        last = self._last_post_process
+        if last is not None and last[0] == key:
+            return last[1], dict(last[2])
+
         original = text
         removed_repetitions_flag = False
         profanity_hit = False
@@ -120,11 +401,14 @@ class TextProcessor:
                 mask_char=profanity_mask_char,
                 replacement=profanity_replacement,
                 match_mode=profanity_match_mode,
+                regex_engine=profanity_regex_engine,
             )
             processed = processed2
 
         changed = processed != original
-        return processed, {"changed": changed, "removed_repetitions": removed_repetitions_flag, "profanity_hit": profanity_hit}
+        meta = {"changed": changed, "removed_repetitions": removed_repetitions_flag, "profanity_hit": profanity_hit}
+        self._last_post_process = (key, processed, dict(meta))
+        return processed, meta
     
     def fix_transcript_text(self, text: str, *, remove_repetitions: bool = True) -> str:
         """
@@ -162,6 +446,7 @@ class TextProcessor:
         mask_char: str = "*",
         replacement: str = "[不当内容已处理]",
         match_mode: str = "substring",
+        regex_engine: str = "re",
     ) -> Tuple[List[Dict], bool]:
         """
         在 words 粒度做不当词过滤，保持时间戳不变，并确保最终 entry.text == ''.join(words.text)。
@@ -171,27 +456,28 @@ class TextProcessor:
         - action=mask：按命中长度打码（推荐，最稳）
         - action=replace：用 replacement 替换，但会按命中长度做截断/重复以贴合跨度（保证不跨词错位）
         - action=remove：删除命中文字（会让该 word 文字变短/为空，但时间戳仍保留）
+        - regex_engine=re2：/regex/ 词条使用 RE2（需安装 google-re2，否则仍用 re）
         """
         if not words or not profanity_words:
             return words, False
 
-        # 复制，避免原地修改带来副作用
-        new_words = [dict(w) for w in words]
-        texts = [w.get("text", "") or "" for w in new_words]
+        # 词表没有可用词条（全为空白或无效正则）时不做任何准备工作
+        compiled = self._compile_profanity(profanity_words, regex_engine)
+        if compiled is None:
+            return words, False
+
+        # 只在文本列表上处理，最后只复制被修改的 word（不原地修改，避免副作用）
+        texts = [w.get("text", "") or "" for w in words]
 
         full = "".join(texts)
         if not full:
-            return new_words, False
+            return words, False
 
         action = (action or "mask").lower().strip()
         match_mode = (match_mode or "substring").lower().strip()
 
         # 预计算每个 word 在 full 中的起始偏移
-        starts: List[int] = []
-        pos = 0
-        for t in texts:
-            starts.append(pos)
-            pos += len(t)
+        starts = list(itertools.accumulate(map(len, texts), initial=0))
 
         def _normalize_replace(seg_len: int) -> str:
             if seg_len <= 0:
@@ -206,98 +492,29 @@ class TextProcessor:
             times = (seg_len + len(replacement) - 1) // len(replacement)
             return (replacement * times)[:seg_len]
 
-        # 收集所有 match span（start,end），基于原始 full 计算
-        spans: List[Tuple[int, int]] = []
-        rule_list = [w.strip() for w in profanity_words if w and w.strip()]
-        rule_list.sort(key=len, reverse=True)
-
-        for rule in rule_list:
-            # /regex/ or /regex/i
-            if len(rule) >= 2 and rule.startswith("/") and rule.count("/") >= 2:
-                last_slash = rule.rfind("/")
-                pattern = rule[1:last_slash]
-                flags_part = rule[last_slash + 1 :].strip()
-                flags = 0
-                if "i" in flags_part.lower():
-                    flags |= re.IGNORECASE
-                try:
-                    for m in re.finditer(pattern, full, flags):
-                        if m and m.start() < m.end():
-                            spans.append((m.start(), m.end()))
-                except re.error:
-                    continue
-                continue
-
-            # 英文/数字词默认按单词边界匹配
-            if re.fullmatch(r"[A-Za-z0-9_]+", rule):
-                for m in re.finditer(rf"\b{re.escape(rule)}\b", full, flags=re.IGNORECASE):
-                    if m and m.start() < m.end():
-                        spans.append((m.start(), m.end()))
-                continue
-
-            if match_mode == "word":
-                pat = rf"(?<![A-Za-z0-9_]){re.escape(rule)}(?![A-Za-z0-9_])"
-            else:
-                pat = re.escape(rule)
-            for m in re.finditer(pat, full):
-                if m and m.start() < m.end():
-                    spans.append((m.start(), m.end()))
-
-        if not spans:
-            return new_words, False
-
-        # 合并重叠 spans（避免重复处理）
-        spans.sort()
-        merged: List[Tuple[int, int]] = []
-        cur_s, cur_e = spans[0]
-        for s, e in spans[1:]:
-            if s <= cur_e:
-                cur_e = max(cur_e, e)
-            else:
-                merged.append((cur_s, cur_e))
-                cur_s, cur_e = s, e
-        merged.append((cur_s, cur_e))
+        # 收集所有 match span（start,end），基于原始 full 计算，并合并重叠/相邻的 spans
+        merged = _merge_spans(self._find_profanity_spans(full, compiled, match_mode))
+        if not merged:
+            return words, False
 
-        # 将 spans 按 word 切分为局部替换（按原始偏移），并在每个 word 内“从后往前”应用避免位移问题
+        # 将 spans 按 word 切分为局部替换（按原始偏移，每个 word 内按起点升序），再逐个 word 一次拼接
         per_word_ops: Dict[int, List[Tuple[int, int, str]]] = {}
-        hit = False
+        hit = True
 
-        for s, e in merged:
-            if s >= e:
-                continue
-            hit = True
-            # 找到覆盖的 word 范围
-            for i, w_start in enumerate(starts):
-                w_text = texts[i]
-                w_end = w_start + len(w_text)
-                if w_end <= s:
-                    continue
-                if w_start >= e:
-                    break
-                # 相交
-                local_s = max(0, s - w_start)
-                local_e = min(len(w_text), e - w_start)
-                if local_s >= local_e:
-                    continue
-                seg_len = local_e - local_s
-                if action == "remove":
-                    repl = ""
-                elif action == "replace":
-                    repl = _normalize_replace(seg_len)
-                else:
-                    repl = mask_char * seg_len
-                per_word_ops.setdefault(i, []).append((local_s, local_e, repl))
+        for i, local_s, local_e in _split_spans_by_word(merged, texts, starts):
+            seg_len = local_e - local_s
+            if action == "remove":
+                repl = ""
+            elif action == "replace":
+                repl = _normalize_replace(seg_len)
+            else:
+                repl = mask_char * seg_len
+            per_word_ops.setdefault(i, []).append((local_s, local_e, repl))
 
         for idx, ops in per_word_ops.items():
-            t = texts[idx]
-            # 从后往前应用
-            ops.sort(key=lambda x: x[0], reverse=True)
-            for local_s, local_e, repl in ops:
-                t = t[:local_s] + repl + t[local_e:]
-            texts[idx] = t
-            new_words[idx]["text"] = t
+            texts[idx] = _splice(texts[idx], ops)
 
-        return new_words, hit
+        return _rebuild_words(words, texts, per_word_ops), hit
 
     def remove_repetitions_in_words(self, words: List[Dict]) -> Tuple[List[Dict], bool]:
         """
@@ -311,95 +528,43 @@ class TextProcessor:
         if not words:
             return words, False
 
-        new_words = [dict(w) for w in words]
-        texts = [w.get("text", "") or "" for w in new_words]
+        texts = [w.get("text", "") or "" for w in words]
         full = "".join(texts)
         if not full:
-            return new_words, False
+            return words, False
 
         # 预计算每个 word 在 full 的起始偏移
-        starts: List[int] = []
-        pos = 0
-        for t in texts:
-            starts.append(pos)
-            pos += len(t)
+        starts = list(itertools.accumulate(map(len, texts), initial=0))
 
         # 收集要删除的 spans（start,end），基于 full 偏移
         spans: List[Tuple[int, int]] = []
 
         # 1) 填充词连续重复：保留第一个，删除后续
-        fillers = r"(嗯|呃|额|啊|唉|哎|诶)"
-        for m in re.finditer(rf"(?:{fillers})(?:[\s,，、]*{fillers})+", full):
-            if not m:
-                continue
+        for m in _FILLER_REPEAT_RE.finditer(full):
             spans.append((m.start() + 1, m.end()))
 
-        # 2) 中文短语连续重复（2~6字）
-        for m in re.finditer(r"([\u4e00-\u9fff]{2,6})\1{1,}", full):
-            if not m:
-                continue
-            g = m.group(1)
-            spans.append((m.start() + len(g), m.end()))
-
-        # 3) 中文短语带空格重复
-        for m in re.finditer(r"([\u4e00-\u9fff]{2,6})(?:\s+\1){1,}", full):
-            if not m:
-                continue
-            g = m.group(1)
-            spans.append((m.start() + len(g), m.end()))
-
-        # 4) 英文连续重复单词（忽略大小写）
-        for m in re.finditer(r"\b([A-Za-z]{2,})\b(?:\s+\1\b)+", full, flags=re.IGNORECASE):
-            if not m:
-                continue
-            g = m.group(1)
-            spans.append((m.start() + len(g), m.end()))
+        # 2) 中文短语连续重复（2~6字）；3) 中文短语带空格重复；4) 英文连续重复单词（忽略大小写）
+        for pattern in (_CN_PHRASE_REPEAT_RE, _CN_PHRASE_SPACED_REPEAT_RE, _EN_WORD_REPEAT_RE):
+            for m in pattern.finditer(full):
+                spans.append((m.start() + len(m.group(1)), m.end()))
 
         if not spans:
-            return new_words, False
+            return words, False
 
         # 合并 spans
-        spans.sort()
-        merged: List[Tuple[int, int]] = []
-        cur_s, cur_e = spans[0]
-        for s, e in spans[1:]:
-            if s <= cur_e:
-                cur_e = max(cur_e, e)
-            else:
-                merged.append((cur_s, cur_e))
-                cur_s, cur_e = s, e
-        merged.append((cur_s, cur_e))
+        merged = _merge_spans(spans)
 
-        # 按 word 切分删除操作（从后往前应用）
-        per_word_ops: Dict[int, List[Tuple[int, int]]] = {}
-        changed = False
+        # 按 word 切分删除操作（每个 word 内按起点升序），再逐个 word 一次拼接
+        per_word_ops: Dict[int, List[Tuple[int, int, str]]] = {}
+        changed = any(s < e for s, e in merged)
 
-        for s, e in merged:
-            if s >= e:
-                continue
-            changed = True
-            for i, w_start in enumerate(starts):
-                w_text = texts[i]
-                w_end = w_start + len(w_text)
-                if w_end <= s:
-                    continue
-                if w_start >= e:
-                    break
-                local_s = max(0, s - w_start)
-                local_e = min(len(w_text), e - w_start)
-                if local_s >= local_e:
-                    continue
-                per_word_ops.setdefault(i, []).append((local_s, local_e))
+        for i, local_s, local_e in _split_spans_by_word(merged, texts, starts):
+            per_word_ops.setdefault(i, []).append((local_s, local_e, ""))
 
         for idx, ops in per_word_ops.items():
-            t = texts[idx]
-            ops.sort(key=lambda x: x[0], reverse=True)
-            for local_s, local_e in ops:
-                t = t[:local_s] + "" + t[local_e:]
-            texts[idx] = t
-            new_words[idx]["text"] = t
+            texts[idx] = _splice(texts[idx], ops)
 
-        return new_words, changed
+        return _rebuild_words(words, texts, per_word_ops), changed
 
     def is_tail_only_change(self, original: str, modified: str) -> bool:
         """
@@ -423,15 +588,10 @@ class TextProcessor:
             return True
 
         # 允许：末尾 2 个字符以内的轻微变化（比如 ", " -> "。"）
-        # 但必须保持绝大部分前缀一致
-        min_len = min(len(a), len(b))
-        prefix_len = 0
-        for i in range(min_len):
-            if a[i] != b[i]:
-                break
-            prefix_len += 1
-        # 只要差异点出现在最后 2 个字符内，就认为是尾部改动
-        return prefix_len >= min_len - 2
+        # 但必须保持绝大部分前缀一致：只要差异点出现在最后 2 个字符内，就认为是尾部改动
+        # （直接比较前缀切片，由 C 层逐段比较，不逐字符循环）
+        keep = min(len(a), len(b)) - 2
+        return keep <= 0 or a[:keep] == b[:keep]
 
     def _remove_obvious_repetitions(self, text: str) -> Tuple[str, bool]:
         """
@@ -447,21 +607,20 @@ class TextProcessor:
         original = text
 
         # 1) 常见口头语填充词：连续重复 -> 收敛为一个
-        fillers = r"(嗯|呃|额|啊|唉|哎|诶)"
-        text = re.sub(rf"(?:{fillers})(?:[\s,，、]*{fillers})+", r"\1", text)
+        text = _FILLER_REPEAT_RE.sub(r"\1", text)
 
         # 2) 中文短语重复（连续）
         #    - 用 2~6 字，避免误伤“人人/看看”这类单字叠字（单字叠字不在这里处理）
-        text = re.sub(r"([\u4e00-\u9fff]{2,6})\1{1,}", r"\1", text)
+        text = _CN_PHRASE_REPEAT_RE.sub(r"\1", text)
 
         # 3) 中英文混合场景：带空格的中文短语重复（ASR偶尔会插空格）
-        text = re.sub(r"([\u4e00-\u9fff]{2,6})(?:\s+\1){1,}", r"\1", text)
+        text = _CN_PHRASE_SPACED_REPEAT_RE.sub(r"\1", text)
 
         # 4) 英文连续重复单词（忽略大小写）
-        text = re.sub(r"\b([A-Za-z]{2,})\b(?:\s+\1\b)+", r"\1", text, flags=re.IGNORECASE)
+        text = _EN_WORD_REPEAT_RE.sub(r"\1", text)
 
         # 5) 多余空格再收敛一次
-        text = re.sub(r"\s+", " ", text).strip()
+        text = _WHITESPACE_RE.sub(" ", text).strip()
 
         return text, (text != original)
 
@@ -474,6 +633,7 @@ class TextProcessor:
         mask_char: str = "*",
         replacement: str = "[不当内容已处理]",
         match_mode: str = "substring",
+        regex_engine: str = "re",
     ) -> Tuple[str, bool]:
         """
         基于词表的不当词过滤。
@@ -483,65 +643,73 @@ class TextProcessor:
           - 'remove': 直接移除
         规则：
           - 普通词条：中文按子串匹配；英文/数字按单词边界匹配（忽略大小写）
-          - /regex/ 或 /regex/i：按正则匹配（高级用法）
+          - /regex/ 或 /regex/i：按正则匹配（高级用法），regex_engine=re2 时使用 RE2
+        所有词条的命中先合并重叠部分，再一次性替换（重叠命中按一处处理）
         """
         if not text or not profanity_words:
             return text, False
 
+        compiled = self._compile_profanity(profanity_words, regex_engine)
+        if compiled is None:
+            return text, False
+
         action = (action or "mask").lower().strip()
         match_mode = (match_mode or "substring").lower().strip()
-        hit = False
-
-        # 词表去重、去空
-        words = [w.strip() for w in profanity_words if w and w.strip()]
-        if not words:
-            return text, False
 
-        # 先长词后短词，避免短词抢占
-        words.sort(key=len, reverse=True)
+        # 相邻的命中各自替换，只合并重叠的命中
+        spans = _merge_spans(self._find_profanity_spans(text, compiled, match_mode), join_adjacent=False)
+        hit = bool(spans)
 
-        def repl(m: re.Match) -> str:
-            nonlocal hit
-            hit = True
-            s = m.group(0)
+        if hit:
             if action == "remove":
-                return ""
-            if action == "replace":
-                return replacement
-            # mask
-            return mask_char * max(len(s), 1)
-
-        # 对英文词做边界匹配，对中文/其他做普通子串匹配（尽量简单且可控）
-        for w in words:
-            # /regex/ 或 /regex/i（可选 i 标志）
-            if len(w) >= 2 and w.startswith("/") and w.count("/") >= 2:
-                # 取最后一个 / 作为结束
-                last_slash = w.rfind("/")
-                pattern = w[1:last_slash]
-                flags_part = w[last_slash + 1 :].strip()
-                flags = 0
-                if "i" in flags_part.lower():
-                    flags |= re.IGNORECASE
-                try:
-                    text = re.sub(pattern, repl, text, flags=flags)
-                except re.error:
-                    # 正则有误则跳过
-                    continue
-                continue
-
-            if re.fullmatch(r"[A-Za-z0-9_]+", w):
-                text = re.sub(rf"\b{re.escape(w)}\b", repl, text, flags=re.IGNORECASE)
+                ops = [(s, e, "") for s, e in spans]
+            elif action == "replace":
+                ops = [(s, e, replacement) for s, e in spans]
             else:
-                if match_mode == "word":
-                    # 尝试用“非字母数字下划线”作为边界（对中英混合更稳一点）
-                    text = re.sub(rf"(?<![A-Za-z0-9_]){re.escape(w)}(?![A-Za-z0-9_])", repl, text)
-                else:
-                    text = re.sub(re.escape(w), repl, text)
+                # mask
+                ops = [(s, e, mask_char * (e - s)) for s, e in spans]
+            text = _splice(text, ops)
 
         # 清理多余空格
-        text = re.sub(r"\s+", " ", text).strip()
+        text = _WHITESPACE_RE.sub(" ", text).strip()
         return text, hit
     
+    def _compile_profanity(self, profanity_words: List[str],
+                           regex_engine: str = "re") -> Optional[_CompiledProfanity]:
+        """获取词表的预编译结果（缓存），没有可用词条时返回 None"""
+        use_re2 = (regex_engine or "re").lower().strip() == "re2"
+        return _compile_profanity(tuple(profanity_words), use_re2)
+
+    def _find_profanity_spans(self, text: str, compiled: _CompiledProfanity,
+                              match_mode: str) -> List[Tuple[int, int]]:
+        """
+        查找所有不当词命中的 spans（未排序，可能重叠）
+        
+        普通词条（非英文/数字词）和英文/数字词条各自汇总后一次查找
+        """
+        spans: List[Tuple[int, int]] = []
+
+        for pattern in compiled.regex_patterns:
+            for m in pattern.finditer(text):
+                if m.start() < m.end():
+                    spans.append((m.start(), m.end()))
+
+        for pattern, count in compiled.fused_patterns:
+            for m in pattern.finditer(text):
+                for group in range(1, count + 1):
+                    s, e = m.span(group)
+                    if s < e:
+                        spans.append((s, e))
+
+        if compiled.word_pattern is not None:
+            for m in compiled.word_pattern.finditer(text):
+                spans.append((m.start(), m.end()))
+
+        if compiled.literals:
+            spans.extend(_find_literal_spans(text, compiled.literals, match_mode == "word"))
+
+        return spans
+
     def _check_context_consistency(self, text: str, speaker_id: int,
                                    speaker_context: Dict, full_transcript: List) -> str:
         """检查上下文一致性,修正可能的识别错误"""
@@ -658,23 +826,23 @@ class TextProcessor:
     def extract_entities(self, text: str) -> Set[str]:
         """从文本中提取实体"""
         entities = set()
-        
-        # 人名(简单规则)
-        names = re.findall(r'[\u4e00-\u9fff]{2,4}', text)
-        for name in names:
-            if len(name) >= 2 and not any(char in name for char in '的了我是在有'):
+
+        for m in _ENTITY_RE.finditer(text):
+            num = m.group('num')
+            if num is not None:
+                # 数字
+                entities.add(f"数字:{num}")
+                # 时间
+                unit = m.group('unit')
+                if unit:
+                    entities.add(f"时间:{num}{unit}")
+                continue
+
+            # 人名(简单规则)
+            name = m.group('name')
+            if _ENTITY_STOP_CHARS.isdisjoint(name):
                 entities.add(f"人名:{name}")
-        
-        # 数字
-        numbers = re.findall(r'\d+', text)
-        for num in numbers:
-            entities.add(f"数字:{num}")
-        
-        # 时间
-        time_patterns = re.findall(r'\d+[年月日时分秒]', text)
-        for time_pattern in time_patterns:
-            entities.add(f"时间:{time_pattern}")
-        
+
         return entities
     
     def analyze_sentiment(self, text: str) -> str:
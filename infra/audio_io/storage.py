@@ -4,6 +4,7 @@ Infra - 音频文件存储
 """
 
 import os
+import asyncio
 import shutil
 import subprocess
 import logging
@@ -12,6 +13,9 @@ from typing import Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+# 上传文件分块写入大小（1 MiB），避免单次超大 write 长时间占用页缓存
+_WRITE_CHUNK_SIZE = 1024 * 1024
+
 
 class AudioStorage:
     """音频存储管理器"""
@@ -29,9 +33,15 @@ class AudioStorage:
     def save_uploaded_file(self, file_content: bytes, filename: str) -> str:
         """保存上传的文件"""
         filepath = os.path.join(self.upload_dir, filename)
+        view = memoryview(file_content)
         with open(filepath, 'wb') as f:
-            f.write(file_content)
+            for offset in range(0, len(view), _WRITE_CHUNK_SIZE):
+                f.write(view[offset:offset + _WRITE_CHUNK_SIZE])
         return filepath
+
+    async def save_uploaded_file_async(self, file_content: bytes, filename: str) -> str:
+        """保存上传的文件（在线程池中执行磁盘写入，不阻塞事件循环）"""
+        return await asyncio.to_thread(self.save_uploaded_file, file_content, filename)
     
     def get_temp_path(self, filename: str) -> str:
         """获取临时文件路径"""
@@ -68,9 +78,10 @@ class AudioStorage:
     
     def get_file_size(self, filepath: str) -> int:
         """获取文件大小(字节)"""
-        if self.file_exists(filepath):
-            return os.path.getsize(filepath)
-        return 0
+        try:
+            return os.stat(filepath).st_size
+        except OSError:
+            return 0
     
     def list_output_files(self, extension: str = None) -> list:
         """列出输出目录中的文件"""
@@ -154,17 +165,19 @@ class AudioStorage:
                     os.remove(temp_output)
                 return False, filepath, error_msg
 
-            # 检查输出文件
-            if not os.path.exists(temp_output) or os.path.getsize(temp_output) == 0:
+            # 检查输出文件（单次 stat 同时判断存在性与大小）
+            new_size = self.get_file_size(temp_output)
+            if new_size == 0:
                 error_msg = "FFmpeg生成的文件为空或不存在"
                 logger.error(error_msg)
-                if os.path.exists(temp_output):
+                try:
                     os.remove(temp_output)
+                except FileNotFoundError:
+                    pass
                 return False, filepath, error_msg
 
-            # 获取原文件和新文件大小
-            original_size = os.path.getsize(filepath)
-            new_size = os.path.getsize(temp_output)
+            # 获取原文件大小
+            original_size = os.stat(filepath).st_size
 
             # 替换原文件
             # 先备份原文件路径（用于生成新文件名）
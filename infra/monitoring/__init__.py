@@ -1,23 +1,49 @@
 """监控模块"""
 
-# 延迟导入 metrics，避免 psutil 依赖问题
-try:
-    from .metrics import metrics_collector, MetricsCollector
-    __all__ = ['metrics_collector', 'MetricsCollector']
-except ImportError as e:
-    # 如果 metrics 模块导入失败（例如缺少 psutil），不影响其他模块
-    import logging
-    logger = logging.getLogger(__name__)
-    logger.warning(f"监控模块 metrics 导入失败: {e}，某些监控功能可能不可用")
-    __all__ = []
-
-# 导入 Prometheus 指标
-try:
-    from .prometheus_metrics import prometheus_metrics, PrometheusMetrics
-    if 'prometheus_metrics' not in __all__:
-        __all__.extend(['prometheus_metrics', 'PrometheusMetrics'])
-except ImportError as e:
-    import logging
-    logger = logging.getLogger(__name__)
-    logger.warning(f"Prometheus 指标模块导入失败: {e}")
+import importlib
+import logging
 
+logger = logging.getLogger(__name__)
+
+# 延迟导入（PEP 562）：首次访问属性时才加载对应子模块，
+# 避免 import infra.monitoring 时就加载 psutil 等依赖并启动后台监控线程
+_LAZY_ATTRS = {
+    'metrics_collector': '.metrics',
+    'MetricsCollector': '.metrics',
+    'prometheus_metrics': '.prometheus_metrics',
+    'PrometheusMetrics': '.prometheus_metrics',
+}
+
+# 全局实例：子模块不可用时以空实现替代，调用方无需判空
+_INSTANCE_ATTRS = frozenset({'metrics_collector', 'prometheus_metrics'})
+
+__all__ = list(_LAZY_ATTRS)
+
+
+class _NullMetrics:
+    """空指标收集器：任意方法调用均为空操作，返回 None"""
+    
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+def __getattr__(name):
+    module_name = _LAZY_ATTRS.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    try:
+        module = importlib.import_module(module_name, __name__)
+    except ImportError as e:
+        # 子模块导入失败（例如缺少 numpy）时不影响其他模块：全局实例降级为空实现，类名仍抛出 ImportError
+        logger.warning(f"监控模块 {module_name.lstrip('.')} 导入失败: {e}，某些监控功能可能不可用")
+        if name not in _INSTANCE_ATTRS:
+            raise
+        value = _NullMetrics()
+    else:
+        value = getattr(module, name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
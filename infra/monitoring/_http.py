@@ -0,0 +1,79 @@
+"""
+监控模块共享 HTTP 会话
+所有监控相关的出站 HTTP 请求（Dify Webhook、健康检查探测等）复用同一个 Session，
+保持长连接，避免每次请求重新建立 TCP/TLS 连接；
+事件循环中的请求（如 /healthz 探测）使用共享的 httpx.AsyncClient，不阻塞事件循环
+"""
+
+import threading
+
+_session = None
+_session_lock = threading.Lock()
+
+_async_client = None
+
+
+def _create_session():
+    """
+    创建带连接池和有限重试的 Session
+    
+    只重试连接失败（请求尚未发出）：POST 不是幂等的，读超时或 5xx 后重发可能重复触发 Dify 工作流
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    retry = Retry(
+        total=2,
+        connect=2,
+        read=0,
+        status=0,
+        other=0,
+        backoff_factor=0.3,
+        allowed_methods=frozenset(["POST"]),
+        # 不按状态码重试，直接返回响应，由调用方按状态码处理
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=2, pool_maxsize=8, max_retries=retry)
+
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def get_session():
+    """获取共享 Session（首次使用时创建，延迟导入 requests）"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _create_session()
+    return _session
+
+
+def get_async_client():
+    """
+    获取共享的异步 HTTP 客户端（首次使用时创建，延迟导入 httpx）
+    
+    只能在事件循环中使用；httpx 未安装时返回 None，调用方应回退到 get_session()
+    """
+    global _async_client
+    if _async_client is None:
+        try:
+            import httpx
+        except ImportError:
+            return None
+        _async_client = httpx.AsyncClient(
+            timeout=3.0,
+            limits=httpx.Limits(max_keepalive_connections=4)
+        )
+    return _async_client
+
+
+async def close_async_client():
+    """关闭共享的异步 HTTP 客户端（应用关闭时调用）"""
+    global _async_client
+    client, _async_client = _async_client, None
+    if client is not None:
+        await client.aclose()
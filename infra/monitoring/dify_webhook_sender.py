@@ -5,15 +5,41 @@ Dify Webhook 报警发送模块
 用于将关键错误和成功事件发送到 Dify 工作流进行日志记录
 """
 
-import requests
 import json
-import traceback
 import sys
+import asyncio
+import time
+import queue
+import hashlib
 import logging
-from datetime import datetime
+from collections import OrderedDict
 from typing import Optional
 import threading
 
+from ._http import get_session, get_async_client
+
+# requests / traceback 按需导入：只有真正发送事件或格式化异常时才加载，缩短冷启动时间
+
+# JSON 序列化优先使用 orjson（C 实现，输出即 UTF-8），不可用时回退到标准库
+try:
+    import orjson
+
+    def _dumps(obj) -> str:
+        return orjson.dumps(obj).decode('utf-8')
+
+    def _dumps_bytes(obj) -> bytes:
+        return orjson.dumps(obj)
+
+    _loads = orjson.loads
+except ImportError:
+    def _dumps(obj) -> str:
+        return json.dumps(obj, ensure_ascii=False)
+
+    def _dumps_bytes(obj) -> bytes:
+        return _dumps(obj).encode('utf-8')
+
+    _loads = json.loads
+
 logger = logging.getLogger(__name__)
 
 # --- 配置区域 (从 config.py 导入) ---
@@ -23,12 +49,268 @@ try:
     DIFY_BASE_URL = DIFY_CONFIG.get('base_url', 'http://localhost:5001')
     DIFY_WORKFLOW_ID = DIFY_CONFIG.get('workflow_id', '')
     DIFY_USER_ID = DIFY_CONFIG.get('user_id', '')
+    DIFY_QUEUE_SIZE = int(DIFY_CONFIG.get('queue_size', 512))
+    DIFY_WORKERS = int(DIFY_CONFIG.get('workers', 4))
+    DIFY_BATCH_MAX_SIZE = int(DIFY_CONFIG.get('batch_max_size', 1))
+    DIFY_BATCH_FLUSH_MS = int(DIFY_CONFIG.get('batch_flush_ms', 200))
 except (ImportError, AttributeError) as e:
     # 如果 config.py 中没有配置，使用默认值
     DIFY_API_KEY = ""
     DIFY_BASE_URL = "http://localhost:5001"
     DIFY_WORKFLOW_ID = ""
     DIFY_USER_ID = ""
+    DIFY_QUEUE_SIZE = 512
+    DIFY_WORKERS = 4
+    DIFY_BATCH_MAX_SIZE = 1
+    DIFY_BATCH_FLUSH_MS = 200
+
+# 请求地址与请求头在模块加载时构建一次（如果指定了 workflow_id，使用指定版本；否则使用已发布的工作流）
+if DIFY_WORKFLOW_ID:
+    _WEBHOOK_URL = f"{DIFY_BASE_URL}/v1/workflows/{DIFY_WORKFLOW_ID}/run"
+else:
+    _WEBHOOK_URL = f"{DIFY_BASE_URL}/v1/workflows/run"
+_DEFAULT_USER = DIFY_USER_ID or None  # 未传业务 user 时的 Dify user 回退值
+_HEADERS = {
+    "Authorization": f"Bearer {DIFY_API_KEY}",
+    "Content-Type": "application/json"
+}
+
+
+# --- 发送通道：共享 Session + 有界队列 + 常驻工作线程 ---
+# 所有事件复用同一个 Session（TCP/TLS 连接池），避免每个事件重新握手；
+# 事件先进入有界队列，由固定数量的工作线程发送，Dify 变慢时不会无限制地创建线程。
+
+_event_queue: "queue.Queue[dict]" = queue.Queue(maxsize=DIFY_QUEUE_SIZE)
+_workers: list = []
+_workers_lock = threading.Lock()
+
+# 队列满时丢弃事件，告警日志按间隔汇总输出，避免日志本身刷屏
+_DROP_WARN_INTERVAL = 60.0
+_dropped_count = 0
+_last_drop_warn = 0.0
+
+
+# 熔断器：连续失败达到阈值后，在冷却期内直接跳过发送，避免慢速/故障的 Dify 占满工作线程
+_BREAKER_FAIL_THRESHOLD = 5
+_BREAKER_COOLDOWN = 30.0
+_breaker = {"fails": 0, "open_until": 0.0}
+_breaker_lock = threading.Lock()
+
+
+def _breaker_is_open() -> bool:
+    """熔断器是否处于打开状态（冷却期内）"""
+    return time.monotonic() < _breaker["open_until"]
+
+
+def _breaker_record_failure():
+    """记录一次发送失败，达到阈值时打开熔断器"""
+    with _breaker_lock:
+        _breaker["fails"] += 1
+        if _breaker["fails"] >= _BREAKER_FAIL_THRESHOLD:
+            _breaker["open_until"] = time.monotonic() + _BREAKER_COOLDOWN
+            _breaker["fails"] = 0
+            logger.warning(
+                f"[Dify] ⚠️ 连续 {_BREAKER_FAIL_THRESHOLD} 次发送失败，"
+                f"暂停发送 {_BREAKER_COOLDOWN:.0f} 秒"
+            )
+
+
+def _breaker_record_success():
+    """记录一次发送成功，重置失败计数"""
+    if _breaker["fails"]:
+        with _breaker_lock:
+            _breaker["fails"] = 0
+
+
+# 重复错误抑制：同一 (event_type, module, message) 的 ERROR 事件在窗口期内只发送一次，
+# 窗口期内被抑制的次数附加到窗口结束后的下一次同类事件中，防止错误循环时刷爆 Dify
+_DEDUP_WINDOW = 10.0
+_DEDUP_MAX_KEYS = 256
+_recent_errors: "OrderedDict[bytes, list]" = OrderedDict()  # key -> [窗口开始时间, 抑制次数]
+_recent_errors_lock = threading.Lock()
+
+
+def _dedup_error(event_type: str, module: str, message: str) -> Optional[int]:
+    """
+    检查 ERROR 事件是否为窗口期内的重复事件
+
+    Returns:
+        None 表示重复事件，应丢弃；否则返回上一窗口内被抑制的次数（0 表示没有）
+    """
+    key = hashlib.blake2b(f"{event_type}|{module}|{message}".encode('utf-8'), digest_size=8).digest()
+    now = time.monotonic()
+    with _recent_errors_lock:
+        entry = _recent_errors.get(key)
+        if entry is not None and now - entry[0] < _DEDUP_WINDOW:
+            entry[1] += 1
+            return None
+        suppressed = entry[1] if entry is not None else 0
+        _recent_errors[key] = [now, 0]
+        _recent_errors.move_to_end(key)
+        while len(_recent_errors) > _DEDUP_MAX_KEYS:
+            _recent_errors.popitem(last=False)
+    return suppressed
+
+
+# SUCCESS 事件幂等：同一任务的同类成功事件在 TTL 内只发送一次（重试时会重复上报）
+_SUCCESS_TTL = 300.0
+_SUCCESS_MAX_KEYS = 4096
+_sent_success: "OrderedDict[tuple, float]" = OrderedDict()  # (event_type, level, task_id) -> 发送时间，按时间有序
+_sent_success_lock = threading.Lock()
+
+
+def _is_duplicate_success(event_type: str, level: str, task_id: str) -> bool:
+    """检查 SUCCESS 事件是否已在 TTL 内发送过；未发送过则登记并返回 False"""
+    key = (event_type, level, str(task_id))
+    now = time.monotonic()
+    with _sent_success_lock:
+        # 键按插入时间有序，从队首淘汰过期项
+        while _sent_success:
+            sent_at = next(iter(_sent_success.values()))
+            if now - sent_at < _SUCCESS_TTL and len(_sent_success) < _SUCCESS_MAX_KEYS:
+                break
+            _sent_success.popitem(last=False)
+        if key in _sent_success:
+            return True
+        _sent_success[key] = now
+    return False
+
+
+def _is_error_payload(payload: dict) -> bool:
+    """ERROR 级别事件不参与批量合并，保证错误不被延迟"""
+    return payload.get("inputs", {}).get("level") == "ERROR"
+
+
+def _build_batch_payload(payloads: list) -> dict:
+    """
+    将多个事件合并为一次工作流调用的 payload
+    
+    inputs.batch 为各事件 inputs 组成的 JSON 数组字符串，由工作流侧拆分处理
+    """
+    return {
+        "inputs": {
+            "event_type": "batch",
+            "level": "SUCCESS",
+            "message": f"批量事件: {len(payloads)} 条",
+            "batch": _dumps([p.get("inputs", {}) for p in payloads]),
+            "batch_size": len(payloads)
+        },
+        "response_mode": "blocking",
+        "user": DIFY_USER_ID or payloads[0].get("user", "")
+    }
+
+
+def _send_batch(payloads: list):
+    """发送一批事件：单条直接发送，多条合并为一次请求"""
+    if len(payloads) == 1:
+        _send_webhook_request(payloads[0])
+    else:
+        _send_webhook_request(_build_batch_payload([_resolve_deferred(p) for p in payloads]))
+
+
+def _collect_batch(first: dict) -> list:
+    """
+    以 first 为首，在 DIFY_BATCH_FLUSH_MS 内继续从队列收集事件，最多 DIFY_BATCH_MAX_SIZE 条
+    
+    收集过程中取到的 ERROR 事件立即单独发送，不进入批次
+    """
+    batch = [first]
+    deadline = time.monotonic() + DIFY_BATCH_FLUSH_MS / 1000.0
+    while len(batch) < DIFY_BATCH_MAX_SIZE:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            payload = _event_queue.get(timeout=remaining)
+        except queue.Empty:
+            break
+        if _is_error_payload(payload):
+            try:
+                _send_webhook_request(payload)
+            except Exception as e:
+                logger.warning(f"[Dify] ⚠️ 事件发送异常: {e}")
+            finally:
+                _event_queue.task_done()
+            continue
+        batch.append(payload)
+    return batch
+
+
+def _worker_loop():
+    """工作线程：持续从队列取事件并发送（启用批量时合并非 ERROR 事件）"""
+    while True:
+        payload = _event_queue.get()
+        batch = [payload]
+        try:
+            if DIFY_BATCH_MAX_SIZE > 1 and not _is_error_payload(payload):
+                batch = _collect_batch(payload)
+            _send_batch(batch)
+        except Exception as e:
+            logger.warning(f"[Dify] ⚠️ 事件发送异常: {e}")
+        finally:
+            for _ in batch:
+                _event_queue.task_done()
+
+
+def _ensure_workers():
+    """首次发送事件时启动工作线程（只启动一次）"""
+    if _workers:
+        return
+    with _workers_lock:
+        if _workers:
+            return
+        for i in range(max(1, DIFY_WORKERS)):
+            worker = threading.Thread(
+                target=_worker_loop,
+                daemon=True,
+                name=f"DifyWH-{i}"
+            )
+            worker.start()
+            _workers.append(worker)
+
+
+def _enqueue_event(payload: dict) -> bool:
+    """
+    将事件放入发送队列（非阻塞）
+
+    Returns:
+        是否成功入队；队列已满时丢弃事件并返回 False
+    """
+    global _dropped_count, _last_drop_warn
+
+    _ensure_workers()
+    try:
+        _event_queue.put_nowait(payload)
+        return True
+    except queue.Full:
+        _dropped_count += 1
+        now = time.monotonic()
+        if now - _last_drop_warn >= _DROP_WARN_INTERVAL:
+            logger.warning(
+                f"[Dify] ⚠️ 发送队列已满（{DIFY_QUEUE_SIZE}），"
+                f"已丢弃 {_dropped_count} 个事件"
+            )
+            _last_drop_warn = now
+            _dropped_count = 0
+        return False
+
+
+def _handle_response(response, payload: dict):
+    """处理 Dify 响应（requests 与 httpx 的响应对象接口一致）"""
+    if response.status_code not in [200, 201]:
+        # 记录到本地日志作为回退
+        logger.warning(f"[Dify] 报警发送失败: HTTP {response.status_code}, {response.text}")
+        if response.status_code >= 500:
+            _breaker_record_failure()
+    else:
+        _breaker_record_success()
+        logger.info(f"[Dify] ✅ 报警发送成功: {payload.get('inputs', {}).get('level', 'UNKNOWN')} - {payload.get('inputs', {}).get('message', '')}")
+        if logger.isEnabledFor(logging.DEBUG):
+            try:
+                result = response.json()
+                logger.debug(f"[Dify] 响应: {_dumps(result)}")
+            except:
+                logger.debug(f"[Dify] 响应文本: {response.text[:200]}")
 
 
 def _send_webhook_request(payload: dict):
@@ -41,45 +323,177 @@ def _send_webhook_request(payload: dict):
     if not DIFY_API_KEY:
         logger.warning("[Dify] ⚠️ API Key 未配置，跳过报警发送")
         return
+
+    if _breaker_is_open():
+        logger.debug("[Dify] 熔断器打开中，跳过报警发送")
+        return
+
+    import requests
+
+    # 异常堆栈等延迟字段在发送线程中格式化
+    _resolve_deferred(payload)
     
-    # 如果指定了 workflow_id，使用指定版本；否则使用已发布的工作流
-    if DIFY_WORKFLOW_ID:
-        url = f"{DIFY_BASE_URL}/v1/workflows/{DIFY_WORKFLOW_ID}/run"
-    else:
-        url = f"{DIFY_BASE_URL}/v1/workflows/run"
+    url = _WEBHOOK_URL
+    if not DIFY_WORKFLOW_ID:
         logger.info("[Dify] 使用已发布的工作流版本（未指定 workflow_id）")
-    headers = {
-        "Authorization": f"Bearer {DIFY_API_KEY}",
-        "Content-Type": "application/json"
-    }
     
     try:
         logger.info(f"[Dify] 正在发送事件到 {url}")
         logger.info(f"[Dify] 事件类型: {payload.get('inputs', {}).get('event_type', 'unknown')}")
-        logger.debug(f"[Dify] 请求体: {json.dumps(payload, ensure_ascii=False, indent=2)}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"[Dify] 请求体: {_dumps(payload)}")
         
-        # 设置短超时，防止 Dify 响应慢时卡住主业务线程
-        response = requests.post(url, headers=headers, json=payload, timeout=5)  # 增加到5秒超时
-        if response.status_code not in [200, 201]:
-            # 记录到本地日志作为回退
-            logger.warning(f"[Dify] 报警发送失败: HTTP {response.status_code}, {response.text}")
-        else:
-            logger.info(f"[Dify] ✅ 报警发送成功: {payload.get('inputs', {}).get('level', 'UNKNOWN')} - {payload.get('inputs', {}).get('message', '')}")
-            try:
-                result = response.json()
-                logger.debug(f"[Dify] 响应: {json.dumps(result, ensure_ascii=False, indent=2)}")
-            except:
-                logger.debug(f"[Dify] 响应文本: {response.text[:200]}")
+        # 日志类事件不值得长时间等待：连接超时 1 秒、读取超时 3 秒
+        response = get_session().post(url, headers=_HEADERS, data=_dumps_bytes(payload), timeout=(1.0, 3.0))
+        _handle_response(response, payload)
     except requests.exceptions.Timeout:
-        logger.warning(f"[Dify] ⚠️ 报警发送超时（5秒），URL: {url}")
+        logger.warning(f"[Dify] ⚠️ 报警发送超时，URL: {url}")
+        _breaker_record_failure()
     except requests.exceptions.ConnectionError as e:
         logger.warning(f"[Dify] ⚠️ 无法连接到 Dify 服务: {e}, URL: {url}")
+        _breaker_record_failure()
     except Exception as e:
         logger.warning(f"[Dify] ⚠️ Webhook 连接错误: {e}, URL: {url}")
         import traceback
         logger.debug(f"[Dify] 错误堆栈: {traceback.format_exc()}")
 
 
+class _DeferredTraceback:
+    """
+    延迟格式化的异常堆栈
+
+    调用线程只保存异常信息（exc_info 元组，开销很小），堆栈格式化与 detail 序列化
+    由发送工作线程在发送前完成，避免业务线程承担遍历栈帧的开销。
+
+    Args:
+        exc_info: (type, value, traceback) 元组
+        template: 可选的 detail 字典模板，堆栈写入其中的 key 字段；为 None 时堆栈作为纯文本 detail
+        key: 堆栈在 template 中的字段名
+    """
+
+    __slots__ = ('exc_info', 'template', 'key', 'file_info')
+
+    def __init__(self, exc_info: tuple, template: Optional[dict] = None, key: str = "error"):
+        self.exc_info = exc_info
+        self.template = template
+        self.key = key
+        self.file_info: dict = {}
+
+    @classmethod
+    def from_exception(cls, exc: BaseException, template: Optional[dict] = None, key: str = "error"):
+        return cls((type(exc), exc, exc.__traceback__), template, key)
+
+    @classmethod
+    def from_current(cls, template: Optional[dict] = None, key: str = "error"):
+        """捕获当前正在处理的异常（等价于 traceback.format_exc 的输入）"""
+        return cls(sys.exc_info(), template, key)
+
+    def format_stack(self) -> str:
+        import traceback
+        etype, value, tb = self.exc_info
+        try:
+            return ''.join(traceback.format_exception(etype, value, tb))
+        except Exception:
+            return f"{etype.__name__ if etype else 'NoneType'}: {value}\n"
+
+    def render(self) -> str:
+        """生成最终的 detail JSON 字符串（与同步构建时的格式一致）"""
+        stack = self.format_stack()
+        if self.template is None:
+            detail_obj = {"raw": stack}
+        else:
+            detail_obj = dict(self.template)
+            detail_obj[self.key] = stack
+        detail_obj.update(self.file_info)
+        return _dumps(detail_obj)
+
+
+# 时间戳格式化缓存：同一秒内只格式化一次秒级前缀 [秒, 前缀]
+_ts_prefix_cache = [-1, ""]
+
+
+def _format_timestamp(ts: float) -> str:
+    """将 time.time() 格式化为本地时间 ISO 字符串（与 datetime.now().isoformat() 格式一致）"""
+    sec = int(ts)
+    cached_sec, prefix = _ts_prefix_cache
+    if sec != cached_sec:
+        prefix = time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(sec))
+        _ts_prefix_cache[:] = [sec, prefix]
+    return f"{prefix}.{int((ts - sec) * 1_000_000):06d}"
+
+
+def _resolve_deferred(payload: dict) -> dict:
+    """在工作线程中将延迟字段（异常堆栈、时间戳）格式化为最终字符串"""
+    inputs = payload.get("inputs")
+    if inputs is not None:
+        detail = inputs.get("detail")
+        if isinstance(detail, _DeferredTraceback):
+            inputs["detail"] = detail.render()
+        ts = inputs.get("timestamp")
+        if isinstance(ts, float):
+            inputs["timestamp"] = _format_timestamp(ts)
+    return payload
+
+
+# --- 协程发送通道：在事件循环中调用时直接创建任务发送，不经过工作线程 ---
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+# 单次发送的超时（连接 1 秒），总耗时与工作线程通道一致
+_ASYNC_TIMEOUT = httpx.Timeout(3.0, connect=1.0) if httpx is not None else None
+_pending_tasks: set = set()  # 持有任务引用，防止未完成的任务被垃圾回收
+
+
+async def _send_webhook_request_async(payload: dict):
+    """_send_webhook_request 的协程版本"""
+    if _breaker_is_open():
+        logger.debug("[Dify] 熔断器打开中，跳过报警发送")
+        return
+
+    _resolve_deferred(payload)
+    url = _WEBHOOK_URL
+    try:
+        logger.info(f"[Dify] 正在发送事件到 {url}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"[Dify] 请求体: {_dumps(payload)}")
+        response = await get_async_client().post(
+            url, headers=_HEADERS, content=_dumps_bytes(payload), timeout=_ASYNC_TIMEOUT
+        )
+        _handle_response(response, payload)
+    except httpx.TimeoutException:
+        logger.warning(f"[Dify] ⚠️ 报警发送超时，URL: {url}")
+        _breaker_record_failure()
+    except httpx.TransportError as e:
+        logger.warning(f"[Dify] ⚠️ 无法连接到 Dify 服务: {e}, URL: {url}")
+        _breaker_record_failure()
+    except Exception as e:
+        logger.warning(f"[Dify] ⚠️ Webhook 连接错误: {e}, URL: {url}")
+
+
+def _try_send_in_loop(payload: dict) -> bool:
+    """
+    调用方运行在事件循环中时，以任务方式发送事件
+
+    Returns:
+        是否已调度；无运行中的事件循环、httpx 不可用、启用了批量发送，
+        或 detail 含待格式化的异常堆栈（格式化较重，留给工作线程）时返回 False
+    """
+    if httpx is None or DIFY_BATCH_MAX_SIZE > 1:
+        return False
+    if isinstance(payload["inputs"].get("detail"), _DeferredTraceback):
+        return False
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    task = loop.create_task(_send_webhook_request_async(payload))
+    _pending_tasks.add(task)
+    task.add_done_callback(_pending_tasks.discard)
+    return True
+
+
 def send_alarm_webhook(task_id: str, module: str, level: str, message: str, detail: str = ""):
     """
     发送结构化的报警 Webhook 到 Dify（已废弃，请使用 log_event）
@@ -102,30 +516,26 @@ def send_alarm_webhook(task_id: str, module: str, level: str, message: str, deta
     )
 
 
-def _build_event_payload(
-    task_id: str,
-    event_type: str,
-    module: str,
-    level: str,
-    message: str,
-    detail: str = "",
-    file_id: str = "",
-    filename: str = "",
-    file_size: int = 0,
-    user: Optional[str] = None
-) -> dict:
-    """
-    构建发送给 Dify 的事件 payload（纯函数，便于自测）
-    """
-    # 构建 detail，如果提供了额外信息，合并到 detail 中
+# 事件过滤规则：只有这些级别和事件类型会发送到 Dify
+_ACCEPTED_LEVELS = frozenset({"ERROR", "SUCCESS"})
+_ACCEPTED_EVENT_TYPES = frozenset({"transcribe", "error"})
+
+
+def _is_event_accepted(event_type: str, level: str) -> bool:
+    """事件是否会被 log_event 发送；各 log_*_event 在构建消息和 detail 之前先做判断，避免无用功"""
+    return level in _ACCEPTED_LEVELS and event_type in _ACCEPTED_EVENT_TYPES
+
+
+def _build_detail_str(detail: str, file_id: str, filename: str, file_size: int) -> str:
+    """构建 detail JSON 字符串，合并文件信息"""
     detail_obj = {}
     if detail:
         try:
             # 尝试解析为 JSON
-            detail_obj = json.loads(detail)
+            detail_obj = _loads(detail)
             if not isinstance(detail_obj, dict):
                 detail_obj = {"raw": detail}
-        except (json.JSONDecodeError, TypeError):
+        except (ValueError, TypeError):
             # 如果不是 JSON，作为普通文本
             detail_obj = {"raw": detail}
 
@@ -138,28 +548,58 @@ def _build_event_payload(
         detail_obj["file_size"] = file_size
 
     # 将 detail_obj 转换回 JSON 字符串
-    detail_str = json.dumps(detail_obj, ensure_ascii=False) if detail_obj else ""
+    return _dumps(detail_obj) if detail_obj else ""
+
+
+def _build_event_payload(
+    task_id: str,
+    event_type: str,
+    module: str,
+    level: str,
+    message: str,
+    detail: str = "",
+    file_id: str = "",
+    filename: str = "",
+    file_size: int = 0,
+    user: Optional[str] = None
+) -> dict:
+    """
+    构建发送给 Dify 的事件 payload（纯函数，便于自测）
+    """
+    # 异常堆栈延迟到发送线程格式化：这里只记录需要合并的文件信息
+    if isinstance(detail, _DeferredTraceback):
+        if file_id:
+            detail.file_info["file_id"] = file_id
+        if filename:
+            detail.file_info["filename"] = filename
+        if file_size > 0:
+            detail.file_info["file_size"] = file_size
+        detail_value = detail
+    else:
+        detail_value = _build_detail_str(detail, file_id, filename, file_size)
 
-    normalized_user = (user or "").strip()
+    normalized_user = user.strip() if user else ""
+    # 调用方传入的通常已是 str，只在必要时转换
+    task_id = task_id if type(task_id) is str else str(task_id)
 
     payload = {
         "inputs": {
-            "task_id": str(task_id),
+            "task_id": task_id,
             "level": level,
             "module": module,
             "message": message,
-            "detail": detail_str,
-            "timestamp": datetime.now().isoformat(),
+            "detail": detail_value,
+            "timestamp": time.time(),  # 发送线程中再格式化为字符串
             "event_type": event_type,  # 新增：事件类型
-            "file_id": str(file_id) if file_id else str(task_id),  # 新增：文件ID
-            "filename": str(filename) if filename else "",  # 新增：文件名
+            "file_id": (file_id if type(file_id) is str else str(file_id)) if file_id else task_id,  # 新增：文件ID
+            "filename": (filename if type(filename) is str else str(filename)) if filename else "",  # 新增：文件名
             "file_size": int(file_size) if file_size > 0 else 0,  # 新增：文件大小
             # 新增：业务侧用户标识（便于工作流内使用/检索）
             "caller_user": normalized_user
         },
         "response_mode": "blocking",  # 保证日志发送的可靠性
-        # ✅ 最重要：Dify 顶层 user 用业务 user（若未提供则回退到配置/事件ID）
-        "user": normalized_user or (DIFY_USER_ID if DIFY_USER_ID else f"event_{task_id}")
+        # ✅ 最重要：Dify 顶层 user 用业务 user（若未提供则回退到配置/事件ID，事件ID仅在需要时拼接）
+        "user": normalized_user or _DEFAULT_USER or f"event_{task_id}"
     }
 
     return payload
@@ -191,12 +631,12 @@ def log_event(
         filename: 文件名（可选）
         file_size: 文件大小，单位字节（可选）
     """
-    if level not in ["ERROR", "SUCCESS"]:
+    if level not in _ACCEPTED_LEVELS:
         logger.warning(f"[Dify] 跳过非关键事件: {level}")
         return
     
     # 只保留转写事件和错误事件的日志，其他事件类型不发送到 Dify
-    if event_type not in ["transcribe", "error"]:
+    if event_type not in _ACCEPTED_EVENT_TYPES:
         logger.debug(f"[Dify] 跳过非转写事件: {event_type} - {message}")
         return
     
@@ -204,6 +644,18 @@ def log_event(
         logger.warning(f"[Dify] ⚠️ API Key 未配置，跳过事件日志")
         return
     
+    # 同一错误在短时间内重复出现时只发送一次
+    if level == "ERROR":
+        suppressed = _dedup_error(event_type, module, message)
+        if suppressed is None:
+            logger.debug(f"[Dify] 跳过重复错误事件: {module} - {message}")
+            return
+        if suppressed:
+            message = f"{message}（此前 {_DEDUP_WINDOW:.0f} 秒内重复 {suppressed} 次）"
+    elif _is_duplicate_success(event_type, level, task_id):
+        logger.debug(f"[Dify] 跳过重复成功事件: task_id={task_id}, event_type={event_type}")
+        return
+    
     # workflow_id 是可选的，如果不指定则使用已发布的工作流
     if not DIFY_WORKFLOW_ID:
         logger.info("[Dify] 未指定 workflow_id，将使用已发布的工作流版本")
@@ -223,13 +675,10 @@ def log_event(
         user=user
     )
     
-    # 使用异步线程发送 (推荐!)，防止 Webhook 延迟影响主业务流
-    threading.Thread(
-        target=_send_webhook_request,
-        args=(payload,),
-        daemon=True,
-        name=f"DifyEvent-{event_type}-{task_id[:8]}"
-    ).start()
+    # 在事件循环中调用时直接创建发送任务；否则放入发送队列由工作线程异步发送，
+    # 两种方式都不会让 Webhook 延迟影响主业务流
+    if not _try_send_in_loop(payload):
+        _enqueue_event(payload)
 
 
 def log_error_alarm(task_id: str, module: str, message: str, exception: Optional[Exception] = None, user: Optional[str] = None):
@@ -242,14 +691,11 @@ def log_error_alarm(task_id: str, module: str, message: str, exception: Optional
         message: 错误消息
         exception: 异常对象（可选），如果提供会自动提取堆栈信息
     """
-    # 自动获取完整的堆栈信息
+    # 自动获取完整的堆栈信息（只捕获异常对象，格式化由发送线程完成）
     if exception:
-        try:
-            error_stack = ''.join(traceback.format_exception(type(exception), exception, exception.__traceback__))
-        except:
-            error_stack = traceback.format_exc()
+        error_stack = _DeferredTraceback.from_exception(exception)
     else:
-        error_stack = traceback.format_exc()
+        error_stack = _DeferredTraceback.from_current()
     
     # 增强错误消息：如果是特定类型的错误，添加更详细的模块信息
     enhanced_module = module
@@ -291,7 +737,7 @@ def log_success_alarm(task_id: str, module: str, message: str, detail: str = "",
     
     if detail:
         try:
-            detail_obj = json.loads(detail)
+            detail_obj = _loads(detail)
             if isinstance(detail_obj, dict):
                 file_id = detail_obj.get('file_id', task_id)
                 filename = detail_obj.get('filename', '')
@@ -325,13 +771,16 @@ def log_upload_event(file_id: str, filename: str, file_size: int, level: str, er
         level: SUCCESS 或 ERROR
         error: 错误异常（可选）
     """
+    if not _is_event_accepted("upload", level):
+        return
+    
     if level == "SUCCESS":
         message = f"文件上传成功: {filename}"
         detail = ""
     else:
         message = f"文件上传失败: {filename}"
         if error:
-            detail = ''.join(traceback.format_exception(type(error), error, error.__traceback__))
+            detail = _DeferredTraceback.from_exception(error)
         else:
             detail = "未知错误"
     
@@ -358,13 +807,16 @@ def log_download_event(file_id: str, filename: str, level: str, error: Optional[
         level: SUCCESS 或 ERROR
         error: 错误异常（可选）
     """
+    if not _is_event_accepted("download", level):
+        return
+    
     if level == "SUCCESS":
         message = f"文件下载成功: {filename}"
         detail = ""
     else:
         message = f"文件下载失败: {filename}"
         if error:
-            detail = ''.join(traceback.format_exception(type(error), error, error.__traceback__))
+            detail = _DeferredTraceback.from_exception(error)
         else:
             detail = "未知错误"
     
@@ -391,25 +843,27 @@ def log_delete_event(file_id: str, filename: str, level: str, error: Optional[Ex
         error: 错误异常（可选）
         was_stopped: 是否是被停止的转写文件（可选）
     """
+    if not _is_event_accepted("delete", level):
+        return
+    
     if level == "SUCCESS":
         message = f"文件删除成功: {filename}"
         detail_obj = {}
         if was_stopped:
             detail_obj["was_stopped"] = True
-        detail = json.dumps(detail_obj, ensure_ascii=False) if detail_obj else ""
+        detail = _dumps(detail_obj) if detail_obj else ""
     else:
         message = f"文件删除失败: {filename}"
         if error:
-            error_stack = ''.join(traceback.format_exception(type(error), error, error.__traceback__))
-            detail_obj = {"error": error_stack}
+            detail_obj = {"error": None}
             if was_stopped:
                 detail_obj["was_stopped"] = True
-            detail = json.dumps(detail_obj, ensure_ascii=False)
+            detail = _DeferredTraceback.from_exception(error, template=detail_obj)
         else:
             detail_obj = {"error": "未知错误"}
             if was_stopped:
                 detail_obj["was_stopped"] = True
-            detail = json.dumps(detail_obj, ensure_ascii=False)
+            detail = _dumps(detail_obj)
     
     log_event(
         task_id=file_id,
@@ -440,6 +894,9 @@ def log_clear_history_event(
         deleted_transcript_files: 删除的转写文档数
         error: 错误异常（可选）
     """
+    if not _is_event_accepted("clear_history", level):
+        return
+    
     import uuid
     task_id = str(uuid.uuid4())
     
@@ -458,15 +915,15 @@ def log_clear_history_event(
         else:
             message = "清空历史记录成功: 没有需要删除的内容"
         
-        detail = json.dumps({
+        detail = _dumps({
             "deleted_records": deleted_records,
             "deleted_audio_files": deleted_audio_files,
             "deleted_transcript_files": deleted_transcript_files
-        }, ensure_ascii=False)
+        })
     else:
         message = f"清空历史记录失败"
         if error:
-            detail = ''.join(traceback.format_exception(type(error), error, error.__traceback__))
+            detail = _DeferredTraceback.from_exception(error)
         else:
             detail = "未知错误"
     
@@ -491,6 +948,9 @@ def log_stop_transcription_event(file_id: str, filename: str, level: str, error:
         error: 错误异常（可选）
         progress: 停止时的进度（0-100，可选）
     """
+    if not _is_event_accepted("stop_transcribe", level):
+        return
+    
     if level == "SUCCESS":
         message = f"转写已停止: {filename}"
         detail_obj = {
@@ -499,22 +959,21 @@ def log_stop_transcription_event(file_id: str, filename: str, level: str, error:
         }
         if progress > 0:
             detail_obj["progress"] = progress
-        detail = json.dumps(detail_obj, ensure_ascii=False)
+        detail = _dumps(detail_obj)
     else:
         message = f"停止转写失败: {filename}"
         if error:
-            error_stack = ''.join(traceback.format_exception(type(error), error, error.__traceback__))
-            detail = json.dumps({
+            detail = _DeferredTraceback.from_exception(error, template={
                 "file_id": file_id,
                 "filename": filename,
-                "error": error_stack
-            }, ensure_ascii=False)
+                "error": None
+            })
         else:
-            detail = json.dumps({
+            detail = _dumps({
                 "file_id": file_id,
                 "filename": filename,
                 "error": "未知错误"
-            }, ensure_ascii=False)
+            })
     
     log_event(
         task_id=file_id,
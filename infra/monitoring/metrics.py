@@ -4,25 +4,47 @@
 """
 
 import time
-import psutil
 import logging
+import itertools
 import threading
 from typing import Dict, List, Optional
 from collections import deque
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 
+import numpy as np
+
 logger = logging.getLogger(__name__)
 
+# psutil 为可选依赖：缺失时不采集系统指标，也不启动后台监控线程
+try:
+    import psutil
+except ImportError:
+    psutil = None
 
-@dataclass
-class RequestMetrics:
-    """请求指标"""
-    endpoint: str
-    method: str
-    status_code: int
-    duration: float  # 秒
-    timestamp: float
+
+class AtomicCounter:
+    """
+    线程安全的单调计数器
+    
+    递增在锁内完成，临界区只有一次整数加法；读取直接返回当前整数（读取单个属性在 GIL 下是原子的）
+    """
+    
+    __slots__ = ('_count', '_lock')
+    
+    def __init__(self):
+        self._count = 0
+        self._lock = threading.Lock()
+    
+    def increment(self):
+        """计数加一"""
+        with self._lock:
+            self._count += 1
+    
+    @property
+    def value(self) -> int:
+        """当前计数值"""
+        return self._count
 
 
 @dataclass
@@ -48,63 +70,81 @@ class MetricsCollector:
         """
         self.history_size = history_size
         
-        # 请求指标
-        self.request_history: deque = deque(maxlen=history_size)
-        self.request_lock = threading.Lock()
+        # 请求指标：预分配的环形缓冲区，按列存储（SoA），记录请求时不创建 Python 对象
+        # 写入位置由无锁计数器分配；时间戳最后写入，未写完的槽位（时间戳为 0）不会落入统计窗口
+        self._req_endpoint = np.empty(history_size, dtype=object)
+        self._req_method = np.empty(history_size, dtype=object)
+        self._req_status = np.zeros(history_size, dtype=np.int16)
+        self._req_duration = np.zeros(history_size, dtype=np.float64)  # 秒
+        self._req_timestamp = np.zeros(history_size, dtype=np.float64)
+        self._req_head = itertools.count()
         
         # 系统指标
         self.system_history: deque = deque(maxlen=history_size)
         self.system_lock = threading.Lock()
         
-        # 统计计数器
-        self.counters = {
-            'total_requests': 0,
-            'failed_requests': 0,
-            'active_requests': 0,
-            'total_transcriptions': 0,
-            'successful_transcriptions': 0,
-            'failed_transcriptions': 0
-        }
-        self.counter_lock = threading.Lock()
+        # 统计计数器（各自加锁，互不阻塞）
+        # 活跃请求数 = 已开始 - 已结束，拆成两个单调计数器以避免加锁做减法
+        self._total_requests = AtomicCounter()
+        self._failed_requests = AtomicCounter()
+        self._active_started = AtomicCounter()
+        self._active_finished = AtomicCounter()
+        self._total_transcriptions = AtomicCounter()
+        self._successful_transcriptions = AtomicCounter()
+        self._failed_transcriptions = AtomicCounter()
         
-        # 启动系统监控线程
-        self.monitoring = True
-        self.monitor_thread = threading.Thread(
-            target=self._system_monitor_loop,
-            daemon=True,
-            name='SystemMonitor'
-        )
-        self.monitor_thread.start()
+        # 启动系统监控线程（psutil 不可用时跳过）
+        self.monitoring = psutil is not None
+        self.sample_interval = 30.0  # 采样间隔（秒）
+        self._stop_event = threading.Event()
+        self.monitor_thread: Optional[threading.Thread] = None
+        if self.monitoring:
+            # 预热 cpu_percent：interval=None 返回与上次调用之间的 CPU 占用，首次调用结果无意义
+            psutil.cpu_percent(interval=None)
+            self.monitor_thread = threading.Thread(
+                target=self._system_monitor_loop,
+                daemon=True,
+                name='SystemMonitor'
+            )
+            self.monitor_thread.start()
+        else:
+            logger.warning("psutil 未安装，系统资源指标采集已禁用")
         
         logger.info("指标收集器已启动")
     
     def record_request(self, endpoint: str, method: str, status_code: int, duration: float):
         """记录请求"""
-        with self.request_lock:
-            metrics = RequestMetrics(
-                endpoint=endpoint,
-                method=method,
-                status_code=status_code,
-                duration=duration,
-                timestamp=time.time()
-            )
-            self.request_history.append(metrics)
+        idx = next(self._req_head) % self.history_size
+        self._req_endpoint[idx] = endpoint
+        self._req_method[idx] = method
+        self._req_status[idx] = status_code
+        self._req_duration[idx] = duration
+        self._req_timestamp[idx] = time.time()
         
         # 更新计数器
-        with self.counter_lock:
-            self.counters['total_requests'] += 1
-            if status_code >= 400:
-                self.counters['failed_requests'] += 1
+        self._total_requests.increment()
+        if status_code >= 400:
+            self._failed_requests.increment()
     
     def increment_active_requests(self):
         """增加活跃请求数"""
-        with self.counter_lock:
-            self.counters['active_requests'] += 1
+        self._active_started.increment()
     
     def decrement_active_requests(self):
         """减少活跃请求数"""
-        with self.counter_lock:
-            self.counters['active_requests'] = max(0, self.counters['active_requests'] - 1)
+        self._active_finished.increment()
+    
+    @property
+    def counters(self) -> Dict[str, int]:
+        """统计计数器快照"""
+        return {
+            'total_requests': self._total_requests.value,
+            'failed_requests': self._failed_requests.value,
+            'active_requests': max(0, self._active_started.value - self._active_finished.value),
+            'total_transcriptions': self._total_transcriptions.value,
+            'successful_transcriptions': self._successful_transcriptions.value,
+            'failed_transcriptions': self._failed_transcriptions.value
+        }
     
     def record_transcription(self, success: bool, duration: float = 0.0, 
                             file_size: int = 0, audio_duration: float = 0.0):
@@ -116,54 +156,49 @@ class MetricsCollector:
             file_size: 文件大小（字节）
             audio_duration: 音频时长（秒）
         """
-        with self.counter_lock:
-            self.counters['total_transcriptions'] += 1
-            if success:
-                self.counters['successful_transcriptions'] += 1
-            else:
-                self.counters['failed_transcriptions'] += 1
+        self._total_transcriptions.increment()
+        if success:
+            self._successful_transcriptions.increment()
+        else:
+            self._failed_transcriptions.increment()
         
-        # 记录转写耗时（用于统计）
-        if duration > 0:
-            with self.request_lock:
-                # 使用 request_history 存储转写耗时（复用现有结构）
-                from dataclasses import dataclass
-                @dataclass
-                class TranscriptionDuration:
-                    duration: float
-                    timestamp: float
-                    success: bool
-                
-                # 如果 request_history 已满，会自动丢弃最旧的记录
-                # 这里我们只记录耗时，不占用太多空间
-                if len(self.request_history) < self.history_size:
-                    # 创建一个临时的 metrics 对象来存储转写耗时
-                    pass  # 转写耗时已通过其他方式记录
+        # 转写耗时由 Prometheus 指标（transcription_duration_seconds）记录
+    
+    def _sample_system(self):
+        """采集一次系统指标（非阻塞）"""
+        memory = psutil.virtual_memory()
+        metrics = SystemMetrics(
+            cpu_percent=psutil.cpu_percent(interval=None),
+            memory_percent=memory.percent,
+            memory_used_mb=memory.used / (1024 * 1024),
+            memory_available_mb=memory.available / (1024 * 1024),
+            active_threads=threading.active_count()
+        )
+        with self.system_lock:
+            self.system_history.append(metrics)
+    
+    def _sample_if_stale(self):
+        """最近一次采样已超过采样间隔（或尚无采样）时补采一次"""
+        if psutil is None:
+            return
+        with self.system_lock:
+            latest_ts = self.system_history[-1].timestamp if self.system_history else 0.0
+        if time.time() - latest_ts >= self.sample_interval:
+            self._sample_system()
     
     def _system_monitor_loop(self):
         """系统监控循环（后台线程）"""
-        while self.monitoring:
+        # 先等待再采样：cpu_percent(interval=None) 统计的是两次调用之间的占用，
+        # 使用 Event 等待，关闭时可立即退出
+        wait = self.sample_interval
+        while not self._stop_event.wait(wait):
             try:
-                # 收集系统指标
-                cpu_percent = psutil.cpu_percent(interval=1)
-                memory = psutil.virtual_memory()
-                
-                metrics = SystemMetrics(
-                    cpu_percent=cpu_percent,
-                    memory_percent=memory.percent,
-                    memory_used_mb=memory.used / (1024 * 1024),
-                    memory_available_mb=memory.available / (1024 * 1024),
-                    active_threads=threading.active_count()
-                )
-                
-                with self.system_lock:
-                    self.system_history.append(metrics)
-                
-                time.sleep(30)  # 每30秒收集一次
-                
+                # 读取统计时可能已按需采样，这里只在数据过期时采样
+                self._sample_if_stale()
+                wait = self.sample_interval
             except Exception as e:
                 logger.error(f"系统监控错误: {e}")
-                time.sleep(60)
+                wait = 60
     
     def get_request_stats(self, time_window: int = 3600) -> Dict:
         """
@@ -174,10 +209,11 @@ class MetricsCollector:
         """
         cutoff_time = time.time() - time_window
         
-        with self.request_lock:
-            recent_requests = [r for r in self.request_history if r.timestamp >= cutoff_time]
+        # 向量化统计：按时间戳筛选窗口内的记录（未写入的槽位时间戳为 0，自然被排除）
+        mask = self._req_timestamp >= cutoff_time
+        total = int(np.count_nonzero(mask))
         
-        if not recent_requests:
+        if not total:
             return {
                 'total': 0,
                 'success': 0,
@@ -187,23 +223,22 @@ class MetricsCollector:
                 'min_duration': 0
             }
         
-        success_requests = [r for r in recent_requests if r.status_code < 400]
-        error_requests = [r for r in recent_requests if r.status_code >= 400]
-        
-        durations = [r.duration for r in recent_requests]
+        durations = self._req_duration[mask]
+        error = int(np.count_nonzero(self._req_status[mask] >= 400))
         
         return {
-            'total': len(recent_requests),
-            'success': len(success_requests),
-            'error': len(error_requests),
-            'avg_duration': sum(durations) / len(durations),
-            'max_duration': max(durations),
-            'min_duration': min(durations),
-            'requests_per_minute': len(recent_requests) / (time_window / 60)
+            'total': total,
+            'success': total - error,
+            'error': error,
+            'avg_duration': float(durations.mean()),
+            'max_duration': float(durations.max()),
+            'min_duration': float(durations.min()),
+            'requests_per_minute': total / (time_window / 60)
         }
     
     def get_system_stats(self) -> Dict:
         """获取当前系统统计"""
+        self._sample_if_stale()
         with self.system_lock:
             if not self.system_history:
                 return {}
@@ -231,25 +266,21 @@ class MetricsCollector:
     
     def get_transcription_stats(self) -> Dict:
         """获取转写统计"""
-        with self.counter_lock:
-            total = self.counters['total_transcriptions']
-            success = self.counters['successful_transcriptions']
-            failed = self.counters['failed_transcriptions']
-            
-            return {
-                'total': total,
-                'successful': success,
-                'failed': failed,
-                'success_rate': (success / total * 100) if total > 0 else 0
-            }
+        total = self._total_transcriptions.value
+        success = self._successful_transcriptions.value
+        failed = self._failed_transcriptions.value
+        
+        return {
+            'total': total,
+            'successful': success,
+            'failed': failed,
+            'success_rate': (success / total * 100) if total > 0 else 0
+        }
     
     def get_all_stats(self) -> Dict:
         """获取所有统计信息"""
-        with self.counter_lock:
-            counters = self.counters.copy()
-        
         return {
-            'counters': counters,
+            'counters': self.counters,
             'requests': self.get_request_stats(),
             'system': self.get_system_stats(),
             'transcriptions': self.get_transcription_stats()
@@ -276,11 +307,39 @@ class MetricsCollector:
     def shutdown(self):
         """关闭监控"""
         self.monitoring = False
-        if self.monitor_thread.is_alive():
+        self._stop_event.set()
+        if self.monitor_thread is not None and self.monitor_thread.is_alive():
             self.monitor_thread.join(timeout=5)
         logger.info("指标收集器已关闭")
 
 
-# 全局指标收集器实例
-metrics_collector = MetricsCollector()
+class _LazyMetricsCollector:
+    """
+    MetricsCollector 的延迟构造代理
+    
+    首次访问属性时才创建实例（并启动 SystemMonitor 线程），
+    只导入本模块而从不读写指标的进程不会产生后台线程。
+    """
+    
+    __slots__ = ('_instance', '_lock')
+    
+    def __init__(self):
+        self._instance: Optional[MetricsCollector] = None
+        self._lock = threading.Lock()
+    
+    def _get_instance(self) -> MetricsCollector:
+        instance = self._instance
+        if instance is None:
+            with self._lock:
+                instance = self._instance
+                if instance is None:
+                    instance = self._instance = MetricsCollector()
+        return instance
+    
+    def __getattr__(self, name):
+        return getattr(self._get_instance(), name)
+
+
+# 全局指标收集器实例（延迟构造）
+metrics_collector = _LazyMetricsCollector()
 
@@ -3,24 +3,124 @@ Prometheus 指标导出模块
 提供标准的 Prometheus 格式指标，便于监控系统抓取
 """
 
+import io
 import time
+import hashlib
+import bisect
 import logging
 import threading
-from typing import Dict, List
+from typing import Dict, Tuple
 from collections import defaultdict, deque
-from dataclasses import dataclass
+
+import numpy as np
+
+from .metrics import AtomicCounter
 
 logger = logging.getLogger(__name__)
 
+# psutil 为可选依赖：缺失时不采集系统指标
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# 并发约定（依赖 CPython GIL）：
+# - 单调计数器与活跃数使用 AtomicCounter（每个计数器一把锁），递增不获取全局锁；
+# - HTTP 请求只追加到无锁队列（deque.append），由汇总方（抓取或积压过多时的请求线程）
+#   在 HTTP 锁内单线程汇总到计数表和耗时直方图；
+# - 多字段更新按指标分别加锁：HTTP 锁、转写指标锁、仪表盘锁，彼此互不阻塞；导出时逐个加锁拷贝快照。
+
+# 默认分桶上界（秒）：0.1, 0.5, 1, 2, 5, 10, 30, 60, 120, 300, +Inf
+_DEFAULT_BUCKETS = (0.1, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+# 分桶标签只构建一次，避免每次导出都做 float -> str 转换
+_DEFAULT_BUCKET_LABELS = tuple(str(b) for b in _DEFAULT_BUCKETS) + ('+Inf',)
+
+try:
+    from config import MONITORING_CONFIG
+    _EXPORT_TTL = MONITORING_CONFIG.get('prometheus_export_ttl_ms', 1000) / 1000.0
+except (ImportError, AttributeError):
+    _EXPORT_TTL = 1.0
+
+# HTTP 请求队列积压达到该长度时，由记录请求的线程顺带汇总（不等待抓取）
+_HTTP_DRAIN_THRESHOLD = 1024
+
+def _escape_label_value(value: str) -> str:
+    """按 Prometheus 文本格式转义标签值（反斜杠、双引号、换行）"""
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# 系统指标后台采样间隔（秒）
+_SYSTEM_SAMPLE_INTERVAL = 5.0
+
+# 摘要统计输出的分位数：p50, p95, p99
+_SUMMARY_QUANTILES = (0.5, 0.95, 0.99)
+
+# HTTP 状态码字符串缓存，避免每次请求都调用 str()
+_STATUS_STR = {code: str(code) for code in range(100, 600)}
+
 
-@dataclass
-class TranscriptionMetrics:
-    """转写任务指标"""
-    duration: float  # 耗时（秒）
-    success: bool
-    file_size: int  # 文件大小（字节）
-    audio_duration: float  # 音频时长（秒）
-    timestamp: float
+class RingF64:
+    """
+    预分配的 float64 环形缓冲区（保留最近 capacity 个样本）
+    
+    样本连续存放、无装箱，可直接交给 numpy 计算。非线程安全，由调用方加锁。
+    """
+    
+    __slots__ = ('buf', 'idx', 'full', 'cap', 'gen')
+    
+    def __init__(self, capacity: int):
+        self.buf = np.empty(capacity, dtype=np.float64)
+        self.idx = 0
+        self.full = False
+        self.cap = capacity
+        self.gen = 0  # 写入代数：每次 append 加一，用于判断缓存的统计结果是否过期
+    
+    def append(self, value: float):
+        self.gen += 1
+        self.buf[self.idx] = value
+        self.idx += 1
+        if self.idx == self.cap:
+            self.idx = 0
+            self.full = True
+    
+    def __len__(self) -> int:
+        return self.cap if self.full else self.idx
+    
+    def view(self) -> np.ndarray:
+        """有效样本视图（不保证时间顺序；与缓冲区共享内存）"""
+        return self.buf if self.full else self.buf[:self.idx]
+
+
+class StreamingHistogram:
+    """
+    流式累计直方图（Prometheus histogram 语义）
+    
+    写入时按二分查找落桶，O(log k)；导出时只读取固定数量的桶，无需保留样本或排序。
+    非线程安全，由调用方加锁。
+    """
+    
+    __slots__ = ('bounds', 'bucket_counts', 'sum', 'count')
+    
+    def __init__(self, bounds=_DEFAULT_BUCKETS):
+        self.bounds = tuple(bounds)
+        self.bucket_counts = [0] * (len(self.bounds) + 1)  # 最后一个为 +Inf
+        self.sum = 0.0
+        self.count = 0
+    
+    def observe(self, value: float):
+        """记录一个样本（落入第一个 value <= 上界 的桶）"""
+        self.bucket_counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+    
+    def snapshot(self):
+        """返回 (累计桶计数列表, 总和, 样本数)"""
+        cumulative = []
+        running = 0
+        for c in self.bucket_counts:
+            running += c
+            cumulative.append(running)
+        return cumulative, self.sum, self.count
 
 
 class PrometheusMetrics:
@@ -28,20 +128,37 @@ class PrometheusMetrics:
     
     def __init__(self):
         # 计数器（Counter）- 只增不减
+        # HTTP 请求记录队列：(endpoint, method, status_code, duration)，汇总后写入 _http_table
+        self._http_queue: deque = deque()
+        # http_requests_total 计数表：{endpoint: {method: {status: count}}}，仅在 HTTP 锁内由汇总方修改
+        self._http_table: Dict[str, Dict[str, Dict[str, int]]] = {}
+        # 简单计数器使用 AtomicCounter（每个计数器各自加锁），递增时无需获取全局锁
         self.counters = {
-            'http_requests_total': defaultdict(int),  # {endpoint: {method: {status: count}}}
-            'transcriptions_total': 0,
-            'transcriptions_success_total': 0,
-            'transcriptions_failed_total': 0,
-            'files_uploaded_total': 0,
-            'files_deleted_total': 0,
+            'transcriptions_total': AtomicCounter(),
+            'transcriptions_success_total': AtomicCounter(),
+            'transcriptions_failed_total': AtomicCounter(),
+            'files_uploaded_total': AtomicCounter(),
+            'files_deleted_total': AtomicCounter(),
         }
         
         # 直方图（Histogram）- 用于统计分布
         self.histograms = {
-            'http_request_duration_seconds': deque(maxlen=1000),  # 请求耗时
-            'transcription_duration_seconds': deque(maxlen=1000),  # 转写耗时
-            'transcription_processing_ratio': deque(maxlen=1000),  # 处理比例（实际耗时/音频时长）
+            'http_request_duration_seconds': RingF64(1000),  # 请求耗时
+            'transcription_duration_seconds': RingF64(1000),  # 转写耗时
+            'transcription_processing_ratio': RingF64(1000),  # 处理比例（实际耗时/音频时长）
+        }
+        
+        # 累计直方图：自启动以来的全部样本（导出 _bucket/_sum/_count），
+        # 上面的滑动窗口只用于平均值和分位数
+        self.streaming_histograms = {
+            'http_request_duration_seconds': StreamingHistogram(),
+            'transcription_duration_seconds': StreamingHistogram(),
+        }
+        
+        # 活跃数仪表盘：拆成“已开始/已结束”两个无锁计数器，当前值 = 开始 - 结束（导出时计算）
+        self._active_counters = {
+            'active_transcriptions': (AtomicCounter(), AtomicCounter()),
+            'active_requests': (AtomicCounter(), AtomicCounter()),
         }
         
         # 仪表盘（Gauge）- 当前值
@@ -56,25 +173,78 @@ class PrometheusMetrics:
             'model_pool_available': 0,  # 可用模型数
         }
         
-        # 转写任务详细指标
-        self.transcription_metrics: deque = deque(maxlen=1000)
+        # 转写任务详细指标：按列存储的环形缓冲区（SoA），记录时不创建 Python 对象
+        self._tm_capacity = 1000
+        self._tm_duration = np.zeros(self._tm_capacity, dtype=np.float64)  # 耗时（秒）
+        self._tm_success = np.zeros(self._tm_capacity, dtype=np.bool_)
+        self._tm_file_size = np.zeros(self._tm_capacity, dtype=np.int64)  # 文件大小（字节）
+        self._tm_audio_duration = np.zeros(self._tm_capacity, dtype=np.float64)  # 音频时长（秒）
+        self._tm_timestamp = np.zeros(self._tm_capacity, dtype=np.float64)
+        self._tm_idx = 0
+        self._tm_full = False
+        
+        self._lock = threading.Lock()  # 转写指标（滑动窗口、累计直方图、详细指标）
+        # HTTP 请求计数与耗时的汇总锁，不与转写/仪表盘指标竞争
+        self._http_lock = threading.Lock()
+        # 仪表盘多字段更新加锁，保证导出时同一组指标（如系统指标）一致
+        self._gauge_lock = threading.Lock()
         
-        self._lock = threading.Lock()
+        # 摘要统计缓存：{直方图名: (写入代数, 摘要)}，样本未变化时直接复用
+        self._summary_cache: Dict[str, tuple] = {}
+        
+        # 导出行前缀缓存：标签组合首次出现时格式化一次，之后只拼接数值
+        self._line_cache: Dict[tuple, str] = {}
+        self._counter_prefix = {name: f'{name} ' for name in self.counters}
+        self._gauge_prefix = {name: f'{name} ' for name in self.gauges}
+        
+        # 系统指标由后台线程定期采样，抓取时只读取仪表盘（首次导出时启动）
+        self._sampler_thread = None
+        self._sampler_lock = threading.Lock()
+        
+        # 导出结果缓存：(生成时间, 文本)，TTL 内的抓取直接复用
+        self._export_ttl = _EXPORT_TTL
+        self._cached_export = (0.0, "")
+        self._export_lock = threading.Lock()
+        # 缓存文本对应的编码结果：(文本, UTF-8 字节, ETag)，文本未刷新时直接复用
+        self._encoded_export = ("", b"", "")
     
     def record_http_request(self, endpoint: str, method: str, status_code: int, duration: float):
-        """记录 HTTP 请求"""
-        with self._lock:
-            # 更新计数器
-            if endpoint not in self.counters['http_requests_total']:
-                self.counters['http_requests_total'][endpoint] = defaultdict(int)
-            if method not in self.counters['http_requests_total'][endpoint]:
-                self.counters['http_requests_total'][endpoint][method] = defaultdict(int)
-            
-            status_str = str(status_code)
-            self.counters['http_requests_total'][endpoint][method][status_str] += 1
-            
-            # 记录耗时
-            self.histograms['http_request_duration_seconds'].append(duration)
+        """记录 HTTP 请求（只入队，不加锁）"""
+        queue = self._http_queue
+        queue.append((endpoint, method, status_code, duration))
+        if len(queue) >= _HTTP_DRAIN_THRESHOLD:
+            # 积压过多时顺带汇总；已有线程在汇总则直接返回
+            self._drain_http_queue(blocking=False)
+    
+    def _drain_http_queue(self, blocking: bool = True):
+        """将队列中的 HTTP 请求记录汇总到计数表和耗时直方图（单线程汇总）"""
+        if not self._http_lock.acquire(blocking):
+            return
+        try:
+            popleft = self._http_queue.popleft
+            table = self._http_table
+            ring = self.histograms['http_request_duration_seconds']
+            streaming = self.streaming_histograms['http_request_duration_seconds']
+            while True:
+                try:
+                    endpoint, method, status_code, duration = popleft()
+                except IndexError:
+                    break
+                
+                # 常见情况（endpoint/method 已存在）只需两次查找
+                by_method = table.get(endpoint)
+                if by_method is None:
+                    by_method = table.setdefault(endpoint, {})
+                by_status = by_method.get(method)
+                if by_status is None:
+                    by_status = by_method.setdefault(method, defaultdict(int))
+                by_status[_STATUS_STR.get(status_code) or str(status_code)] += 1
+                
+                # 记录耗时
+                ring.append(duration)
+                streaming.observe(duration)
+        finally:
+            self._http_lock.release()
     
     def record_transcription(
         self, 
@@ -84,16 +254,17 @@ class PrometheusMetrics:
         audio_duration: float = 0.0
     ):
         """记录转写任务"""
+        # 更新计数器（无锁）
+        self.counters['transcriptions_total'].increment()
+        if success:
+            self.counters['transcriptions_success_total'].increment()
+        else:
+            self.counters['transcriptions_failed_total'].increment()
+        
         with self._lock:
-            # 更新计数器
-            self.counters['transcriptions_total'] += 1
-            if success:
-                self.counters['transcriptions_success_total'] += 1
-            else:
-                self.counters['transcriptions_failed_total'] += 1
-            
             # 记录耗时
             self.histograms['transcription_duration_seconds'].append(duration)
+            self.streaming_histograms['transcription_duration_seconds'].observe(duration)
             
             # 计算处理比例（实际耗时/音频时长）
             if audio_duration > 0:
@@ -101,50 +272,46 @@ class PrometheusMetrics:
                 self.histograms['transcription_processing_ratio'].append(ratio)
             
             # 保存详细指标
-            self.transcription_metrics.append(
-                TranscriptionMetrics(
-                    duration=duration,
-                    success=success,
-                    file_size=file_size,
-                    audio_duration=audio_duration,
-                    timestamp=time.time()
-                )
-            )
+            idx = self._tm_idx
+            self._tm_duration[idx] = duration
+            self._tm_success[idx] = success
+            self._tm_file_size[idx] = file_size
+            self._tm_audio_duration[idx] = audio_duration
+            self._tm_timestamp[idx] = time.time()
+            idx += 1
+            if idx == self._tm_capacity:
+                idx = 0
+                self._tm_full = True
+            self._tm_idx = idx
     
     def increment_active_transcriptions(self):
         """增加活跃转写任务数"""
-        with self._lock:
-            self.gauges['active_transcriptions'] += 1
+        self._active_counters['active_transcriptions'][0].increment()
     
     def decrement_active_transcriptions(self):
         """减少活跃转写任务数"""
-        with self._lock:
-            self.gauges['active_transcriptions'] = max(0, self.gauges['active_transcriptions'] - 1)
+        self._active_counters['active_transcriptions'][1].increment()
     
     def increment_active_requests(self):
         """增加活跃请求数"""
-        with self._lock:
-            self.gauges['active_requests'] += 1
+        self._active_counters['active_requests'][0].increment()
     
     def decrement_active_requests(self):
         """减少活跃请求数"""
-        with self._lock:
-            self.gauges['active_requests'] = max(0, self.gauges['active_requests'] - 1)
+        self._active_counters['active_requests'][1].increment()
     
     def record_file_upload(self):
         """记录文件上传"""
-        with self._lock:
-            self.counters['files_uploaded_total'] += 1
+        self.counters['files_uploaded_total'].increment()
     
     def record_file_delete(self):
         """记录文件删除"""
-        with self._lock:
-            self.counters['files_deleted_total'] += 1
+        self.counters['files_deleted_total'].increment()
     
     def update_system_metrics(self, cpu_percent: float, memory_percent: float, 
                               memory_used_mb: float, threads: int):
         """更新系统指标"""
-        with self._lock:
+        with self._gauge_lock:
             self.gauges['system_cpu_percent'] = cpu_percent
             self.gauges['system_memory_percent'] = memory_percent
             self.gauges['system_memory_used_mb'] = memory_used_mb
@@ -152,138 +319,240 @@ class PrometheusMetrics:
     
     def update_model_pool_metrics(self, pool_size: int, available: int):
         """更新模型池指标"""
-        with self._lock:
+        with self._gauge_lock:
             self.gauges['model_pool_size'] = pool_size
             self.gauges['model_pool_available'] = available
     
-    def _calculate_histogram_buckets(self, values: deque, buckets: List[float] = None) -> Dict[str, int]:
-        """计算直方图分桶"""
-        if buckets is None:
-            # 默认分桶：0.1, 0.5, 1, 2, 5, 10, 30, 60, 120, 300, +Inf
-            buckets = [0.1, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0]
-        
-        if not values:
-            return {}
-        
-        bucket_counts = {str(b): 0 for b in buckets}
-        bucket_counts['+Inf'] = 0
-        
-        for value in values:
-            placed = False
-            for bucket in buckets:
-                if value <= bucket:
-                    bucket_counts[str(bucket)] += 1
-                    placed = True
-                    break
-            if not placed:
-                bucket_counts['+Inf'] += 1
-        
-        return bucket_counts
+    def _sample_system(self):
+        """采集一次系统指标（非阻塞：cpu_percent 返回与上次调用之间的占用）"""
+        memory = psutil.virtual_memory()
+        self.update_system_metrics(
+            cpu_percent=psutil.cpu_percent(interval=None),
+            memory_percent=memory.percent,
+            memory_used_mb=memory.used / (1024 * 1024),
+            threads=threading.active_count()
+        )
+    
+    def _system_sampler_loop(self):
+        """系统指标采样循环（后台线程）"""
+        while True:
+            time.sleep(_SYSTEM_SAMPLE_INTERVAL)
+            try:
+                self._sample_system()
+            except Exception as e:
+                logger.error(f"系统指标采样错误: {e}")
+    
+    def _ensure_system_sampler(self):
+        """启动系统指标采样线程（只启动一次；psutil 不可用时跳过）"""
+        if self._sampler_thread is not None or psutil is None:
+            return
+        with self._sampler_lock:
+            if self._sampler_thread is not None:
+                return
+            # 先同步采样一次，首次抓取即有内存等数据
+            self._sample_system()
+            self._sampler_thread = threading.Thread(
+                target=self._system_sampler_loop,
+                daemon=True,
+                name='PrometheusSystemSampler'
+            )
+            self._sampler_thread.start()
     
-    def _calculate_summary(self, values: deque) -> Dict[str, float]:
+    def _calculate_summary(self, values) -> Dict[str, float]:
         """计算摘要统计（总和、计数、分位数）"""
-        if not values:
+        if not len(values):
             return {'sum': 0.0, 'count': 0, 'avg': 0.0}
         
-        sorted_values = sorted(values)
-        count = len(sorted_values)
-        total = sum(sorted_values)
-        
-        # 计算分位数
-        def percentile(data, p):
-            if not data:
-                return 0.0
-            k = (len(data) - 1) * p
-            f = int(k)
-            c = k - f
-            if f + 1 < len(data):
-                return data[f] + c * (data[f + 1] - data[f])
-            return data[f]
+        arr = np.asarray(values, dtype=np.float64)
+        count = arr.size
+        last = count - 1
+        
+        # 一次 partition 同时定位最小值、最大值和各分位数需要的顺序统计量（O(n)，无需完整排序）
+        positions = [(last * p, int(last * p)) for p in _SUMMARY_QUANTILES]
+        kth = {0, last}
+        for _, f in positions:
+            kth.add(f)
+            kth.add(min(f + 1, last))
+        part = np.partition(arr, sorted(kth))
+        
+        def order_stat_percentile(k, f):
+            # 线性插值，与原 sorted() 实现一致
+            if f + 1 <= last:
+                return float(part[f] + (k - f) * (part[f + 1] - part[f]))
+            return float(part[f])
+        
+        p50, p95, p99 = (order_stat_percentile(k, f) for k, f in positions)
+        total = float(part.sum())
         
         return {
             'sum': total,
             'count': count,
             'avg': total / count,
-            'min': sorted_values[0],
-            'max': sorted_values[-1],
-            'p50': percentile(sorted_values, 0.5),
-            'p95': percentile(sorted_values, 0.95),
-            'p99': percentile(sorted_values, 0.99),
+            'min': float(part[0]),
+            'max': float(part[last]),
+            'p50': p50,
+            'p95': p95,
+            'p99': p99,
         }
     
+    @staticmethod
+    def _write_histogram_lines(w, name: str, snapshot):
+        """输出累计直方图的 _bucket/_sum/_count 行"""
+        cumulative, total, count = snapshot
+        for label, bucket_count in zip(_DEFAULT_BUCKET_LABELS, cumulative):
+            w(f'{name}_bucket{{le="{label}"}} {bucket_count}\n')
+        w(f'{name}_sum {total}\n')
+        w(f'{name}_count {count}\n')
+    
+    def _ring_summary(self, name: str, lock: threading.Lock) -> Dict[str, float]:
+        """计算滑动窗口的摘要统计；自上次计算以来没有新样本时直接返回缓存结果"""
+        ring = self.histograms[name]
+        with lock:
+            gen = ring.gen
+            cached = self._summary_cache.get(name)
+            if cached is not None and cached[0] == gen:
+                return dict(cached[1])
+            # 锁内只做快照，计算在锁外完成，不阻塞记录指标的请求线程
+            values = ring.view().copy()
+        
+        summary = self._calculate_summary(values)
+        self._summary_cache[name] = (gen, summary)
+        return dict(summary)
+    
     def get_transcription_stats(self) -> Dict:
         """获取转写统计信息"""
-        with self._lock:
-            total = self.counters['transcriptions_total']
-            success = self.counters['transcriptions_success_total']
-            failed = self.counters['transcriptions_failed_total']
-            
-            duration_stats = self._calculate_summary(self.histograms['transcription_duration_seconds'])
-            
-            # 计算成功率
-            success_rate = (success / total * 100) if total > 0 else 0.0
-            
-            # 计算平均处理比例
-            ratio_stats = self._calculate_summary(self.histograms['transcription_processing_ratio'])
-            
-            return {
-                'total': total,
-                'success': success,
-                'failed': failed,
-                'success_rate': success_rate,
-                'duration': duration_stats,
-                'processing_ratio': ratio_stats,  # 实际耗时/音频时长的比例
-            }
+        total = self.counters['transcriptions_total'].value
+        success = self.counters['transcriptions_success_total'].value
+        failed = self.counters['transcriptions_failed_total'].value
+        
+        duration_stats = self._ring_summary('transcription_duration_seconds', self._lock)
+        
+        # 计算成功率
+        success_rate = (success / total * 100) if total > 0 else 0.0
+        
+        # 计算平均处理比例
+        ratio_stats = self._ring_summary('transcription_processing_ratio', self._lock)
+        
+        return {
+            'total': total,
+            'success': success,
+            'failed': failed,
+            'success_rate': success_rate,
+            'duration': duration_stats,
+            'processing_ratio': ratio_stats,  # 实际耗时/音频时长的比例
+        }
     
     def export_prometheus_format(self) -> str:
-        """导出 Prometheus 格式的指标"""
-        lines = []
+        """导出 Prometheus 格式的指标（TTL 内复用上次结果，合并并发抓取）"""
+        self._ensure_system_sampler()
         
+        if self._export_ttl <= 0:
+            return self._render_prometheus_format()
+        
+        ts, body = self._cached_export
+        if time.monotonic() - ts < self._export_ttl:
+            return body
+        
+        with self._export_lock:
+            # 双重检查：等待锁期间可能已有其他抓取刷新了缓存
+            ts, body = self._cached_export
+            now = time.monotonic()
+            if now - ts < self._export_ttl:
+                return body
+            body = self._render_prometheus_format()
+            self._cached_export = (now, body)
+            return body
+    
+    def export_prometheus_payload(self) -> Tuple[bytes, str]:
+        """
+        导出 Prometheus 格式指标的 UTF-8 字节和 ETag（用于 HTTP 响应）
+        
+        与 export_prometheus_format 共用同一份 TTL 缓存，缓存刷新后才重新编码和计算 ETag
+        """
+        body = self.export_prometheus_format()
+        encoded = self._encoded_export
+        if encoded[0] is not body:
+            data = body.encode('utf-8')
+            encoded = (body, data, '"' + hashlib.blake2b(data, digest_size=8).hexdigest() + '"')
+            self._encoded_export = encoded
+        return encoded[1], encoded[2]
+    
+    def _render_prometheus_format(self) -> str:
+        """生成 Prometheus 格式的指标文本"""
+        # 锁内只拷贝数据快照；格式化与摘要计算在锁外进行，抓取期间不阻塞指标写入
+        self._drain_http_queue()
+        with self._http_lock:
+            http_requests = [
+                (endpoint, method, status, count)
+                for endpoint, methods in self._http_table.items()
+                for method, statuses in methods.items()
+                for status, count in statuses.items()
+            ]
+            http_streaming = self.streaming_histograms['http_request_duration_seconds'].snapshot()
+        with self._gauge_lock:
+            gauges = dict(self.gauges)
         with self._lock:
-            # 导出计数器
-            for metric_name, counters in self.counters.items():
-                if isinstance(counters, dict):
-                    # 嵌套字典结构（如 http_requests_total）
-                    for endpoint, methods in counters.items():
-                        for method, statuses in methods.items():
-                            for status, count in statuses.items():
-                                lines.append(
-                                    f'{metric_name}{{endpoint="{endpoint}",method="{method}",status="{status}"}} {count}'
-                                )
-                else:
-                    # 简单计数器
-                    lines.append(f'{metric_name} {counters}')
-            
-            # 导出仪表盘
-            for metric_name, value in self.gauges.items():
-                lines.append(f'{metric_name} {value}')
-            
-            # 导出直方图（使用 summary 格式，因为 Prometheus 的 histogram 需要更复杂的实现）
-            # HTTP 请求耗时
-            http_duration = self._calculate_summary(self.histograms['http_request_duration_seconds'])
-            if http_duration['count'] > 0:
-                lines.append(f'http_request_duration_seconds_sum {http_duration["sum"]}')
-                lines.append(f'http_request_duration_seconds_count {http_duration["count"]}')
-                lines.append(f'http_request_duration_seconds_avg {http_duration["avg"]}')
-                lines.append(f'http_request_duration_seconds_p95 {http_duration["p95"]}')
-            
-            # 转写耗时
-            transcription_duration = self._calculate_summary(self.histograms['transcription_duration_seconds'])
-            if transcription_duration['count'] > 0:
-                lines.append(f'transcription_duration_seconds_sum {transcription_duration["sum"]}')
-                lines.append(f'transcription_duration_seconds_count {transcription_duration["count"]}')
-                lines.append(f'transcription_duration_seconds_avg {transcription_duration["avg"]}')
-                lines.append(f'transcription_duration_seconds_p95 {transcription_duration["p95"]}')
-                lines.append(f'transcription_duration_seconds_p99 {transcription_duration["p99"]}')
-            
-            # 处理比例
-            processing_ratio = self._calculate_summary(self.histograms['transcription_processing_ratio'])
-            if processing_ratio['count'] > 0:
-                lines.append(f'transcription_processing_ratio_sum {processing_ratio["sum"]}')
-                lines.append(f'transcription_processing_ratio_count {processing_ratio["count"]}')
-                lines.append(f'transcription_processing_ratio_avg {processing_ratio["avg"]}')
-        
-        return '\n'.join(lines) + '\n'
+            transcription_streaming = self.streaming_histograms['transcription_duration_seconds'].snapshot()
+        
+        buf = io.StringIO()
+        w = buf.write
+        
+        # 导出计数器
+        line_cache = self._line_cache
+        for endpoint, method, status, count in http_requests:
+            key = (endpoint, method, status)
+            prefix = line_cache.get(key)
+            if prefix is None:
+                # 标签值转义只在标签组合首次出现时做一次
+                prefix = line_cache[key] = (
+                    f'http_requests_total{{endpoint="{_escape_label_value(endpoint)}",'
+                    f'method="{_escape_label_value(method)}",status="{status}"}} '
+                )
+            w(prefix)
+            w(str(count))
+            w('\n')
+        counter_prefix = self._counter_prefix
+        for metric_name, counter in self.counters.items():
+            w(counter_prefix[metric_name])
+            w(str(counter.value))
+            w('\n')
+        
+        # 导出仪表盘
+        for name, (started, finished) in self._active_counters.items():
+            # 先读结束数再读开始数，并发时只会略微高估，不会出现负数
+            ended = finished.value
+            gauges[name] = max(0, started.value - ended)
+        gauge_prefix = self._gauge_prefix
+        for metric_name, value in gauges.items():
+            w(gauge_prefix[metric_name])
+            w(str(value))
+            w('\n')
+        
+        # 导出直方图：_bucket/_sum/_count 来自累计直方图，平均值和分位数来自最近的样本窗口
+        # 先用样本计数判断是否为空，空直方图不计算摘要
+        # HTTP 请求耗时
+        if http_streaming[2] > 0:
+            http_duration = self._ring_summary('http_request_duration_seconds', self._http_lock)
+            self._write_histogram_lines(w, 'http_request_duration_seconds', http_streaming)
+            w(f'http_request_duration_seconds_avg {http_duration["avg"]}\n')
+            w(f'http_request_duration_seconds_p95 {http_duration["p95"]}\n')
+        
+        # 转写耗时
+        if transcription_streaming[2] > 0:
+            transcription_duration = self._ring_summary('transcription_duration_seconds', self._lock)
+            self._write_histogram_lines(w, 'transcription_duration_seconds', transcription_streaming)
+            w(f'transcription_duration_seconds_avg {transcription_duration["avg"]}\n')
+            w(f'transcription_duration_seconds_p95 {transcription_duration["p95"]}\n')
+            w(f'transcription_duration_seconds_p99 {transcription_duration["p99"]}\n')
+        
+        # 处理比例
+        if self.histograms['transcription_processing_ratio'].gen > 0:
+            processing_ratio = self._ring_summary('transcription_processing_ratio', self._lock)
+            w(f'transcription_processing_ratio_sum {processing_ratio["sum"]}\n')
+            w(f'transcription_processing_ratio_count {processing_ratio["count"]}\n')
+            w(f'transcription_processing_ratio_avg {processing_ratio["avg"]}\n')
+        
+        return buf.getvalue()
 
 
 # 全局 Prometheus 指标实例
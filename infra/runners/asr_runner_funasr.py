@@ -4,10 +4,58 @@ Infra - ASR执行器（FunASR AutoModel版本）
 与demo.py保持一致
 """
 
+import io
 import os
+import re
+import wave
 import logging
+import threading
+import time
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+
+# CPU推理线程数：线程过多时算子内部的同步开销反而拖慢短音频，默认4，可通过环境变量调整
+# OpenMP/MKL 线程池在 torch 导入时初始化，须提前设置
+_TORCH_NUM_THREADS = int(os.getenv('ASR_TORCH_THREADS', '4'))
+_TORCH_INTEROP_THREADS = 2
+os.environ.setdefault('OMP_NUM_THREADS', str(_TORCH_NUM_THREADS))
+os.environ.setdefault('MKL_NUM_THREADS', str(_TORCH_NUM_THREADS))
+
 import torch
-from typing import Optional, List, Dict
+
+# 设备检测只在模块加载时做一次，模型池按需创建实例时不再重复查询CUDA驱动（与demo.py一致）
+_DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
+_NGPU = 1 if _DEVICE == "cuda" else 0
+
+# CUDA缓存分配器配置（分配器在首次分配显存时读取，已由部署环境指定时不覆盖）：
+# 可扩展显存段减少多个模型实例交替分配/释放造成的碎片和 OOM；
+# expandable_segments 需要 PyTorch 2.1+，更早的版本遇到未知选项会在首次分配显存时报错
+if _DEVICE == "cuda" and tuple(map(int, re.findall(r'\d+', torch.__version__)[:2])) >= (2, 1):
+    os.environ.setdefault('PYTORCH_CUDA_ALLOC_CONF', 'expandable_segments:True,max_split_size_mb:512')
+
+import numpy as np
+from functools import lru_cache
+from typing import Optional, List, Dict, Tuple
+
+# psutil 为可选依赖：缺失时使用 multiprocessing 获取CPU核心数
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+# 推理使用的CPU核心数（模块加载时计算一次）：
+# ⚠️ 限制最大值，FunASR每个核心会分配一定内存，112核的服务器可能导致OOM；
+# FunASR 会按 ncpu 设置 torch 算子内线程数，超过 ASR_TORCH_THREADS 后收益为负
+_NCPU = min((psutil.cpu_count() if psutil is not None else None) or multiprocessing.cpu_count(), 16, _TORCH_NUM_THREADS)
+
+# jieba_fast 为可选依赖：C 实现的 jieba 同接口版本，缺失时回退到纯 Python 的 jieba
+try:
+    import jieba_fast as jieba
+except ImportError:
+    import jieba
+
+# 绑定到模块级名称，分词时省去每次的属性查找
+_jieba_lcut = jieba.lcut
 
 # 禁用FunASR的表单打印
 os.environ['FUNASR_CACHE_DIR'] = os.path.expanduser('~/.cache/modelscope')
@@ -16,10 +64,221 @@ warnings.filterwarnings('ignore')
 
 from funasr import AutoModel
 
-from .model_pool import ModelPool
+from .model_pool import ModelPool, PinnedModelPool, BatchingDispatcher
 
 logger = logging.getLogger(__name__)
 
+# 模型池空闲时归还CUDA缓存显存的最小间隔（秒）
+_CUDA_CACHE_RELEASE_INTERVAL = 60.0
+
+# 句子数超过该阈值时，词级时间戳提取分发到线程池并行执行（句子之间互不依赖）
+_PARALLEL_PARSE_MIN_SENTENCES = 16
+_parse_executor: Optional[ThreadPoolExecutor] = None
+_parse_executor_lock = threading.Lock()
+
+# 中英文标点符号集合（FunASR的timestamp不包含这些字符）
+_PUNCTUATION_SET = frozenset('，。！？、；：""''（）【】《》—…·,.!?;:\'"()[]<>-–—')
+# 删除全部标点的转换表：word.translate(_PUNCT_DELETE) 在 C 层完成逐字符扫描
+_PUNCT_DELETE = str.maketrans('', '', ''.join(_PUNCTUATION_SET))
+# 标点码位（已排序），用于向量化生成整段文本的标点掩码
+_PUNCT_CODEPOINTS = np.array(sorted(map(ord, _PUNCTUATION_SET)), dtype=np.uint32)
+# 句子结束标点（用于拆分子句）
+_SENTENCE_END_PUNCT = frozenset('。！？.!?')
+
+# 不超过该长度且不含英文/数字的短句跳过jieba，直接逐字切分
+_SHORT_TEXT_MAX_CHARS = 8
+# 纯ASCII文本的切分规则（与jieba对英文的切分基本一致）：英文/数字连续串、小数、单个空白字符、单个符号，
+# 空白和标点都作为独立的词保留，各词拼接后等于原文
+_ASCII_TOKEN_RE = re.compile(r'\d+(?:\.\d+)+|[A-Za-z0-9]+|\s|[^A-Za-z0-9\s]')
+_ASCII_ALNUM_RE = re.compile(r'[A-Za-z0-9]')
+
+_CHINESE_RE = re.compile(r'[\u4e00-\u9fff]')
+_CHINESE_DIGIT_RE = re.compile(r'[\u4e00-\u9fff\d]')
+_VOWEL_RE = re.compile(r'[aeiouAEIOU]+')
+_LATIN_RE = re.compile(r'[a-zA-Z]')
+_DIGIT_RE = re.compile(r'\d')
+
+
+def _is_punctuation(word: str) -> bool:
+    """判断是否为纯标点符号（允许夹杂空白）"""
+    return not word.translate(_PUNCT_DELETE).strip()
+
+
+def _scale_timestamps(timestamp_list: List, ts_factor: float) -> Tuple[List, List]:
+    """
+    将FunASR的 [[start_ms, end_ms], ...] 一次性换算为秒并应用校正因子
+    
+    Returns:
+        (起始时间列表, 结束时间列表)，格式不合法的条目对应位置为 None
+    """
+    try:
+        ts_arr = np.asarray(timestamp_list)
+    except ValueError:
+        # 各条目长度不一致
+        ts_arr = None
+    
+    if ts_arr is not None and ts_arr.ndim == 2 and ts_arr.shape[1] >= 2 and ts_arr.dtype.kind in 'iuf':
+        # 规整的数值矩阵：向量化换算（运算顺序与逐个计算一致，结果完全相同）
+        ts_arr = ts_arr[:, :2] / 1000.0 * ts_factor
+        return ts_arr[:, 0].tolist(), ts_arr[:, 1].tolist()
+    
+    # 不规整的输入逐个换算
+    starts = []
+    ends = []
+    for ts in timestamp_list:
+        is_seq = isinstance(ts, (list, tuple))
+        starts.append((ts[0] / 1000.0) * ts_factor if is_seq and len(ts) >= 1 else None)
+        ends.append((ts[1] / 1000.0) * ts_factor if is_seq and len(ts) >= 2 else None)
+    return starts, ends
+
+
+def _configure_torch_threads(num_threads: int):
+    """设置 torch 算子内/算子间线程数（进程级设置，所有模型实例共享）"""
+    torch.set_num_threads(num_threads)
+    try:
+        # 算子间线程数只能在首次并行计算前设置一次，之后调用会抛出 RuntimeError
+        torch.set_num_interop_threads(_TORCH_INTEROP_THREADS)
+    except RuntimeError:
+        pass
+
+
+@lru_cache(maxsize=8192)
+def _interpolation_plan(text: str) -> tuple:
+    """
+    插值降级方案中与时长无关的部分（带缓存）：重复出现的短句（问候语、口头禅等）无需重新分词和估算音节
+    
+    Returns:
+        tuple: (分词结果, 各词音节数, 子句列表)
+               子句按句末标点划分，每个元素为 (词元组, 各词音节数, 子句音节总数)
+    """
+    word_list = _cut(text)
+    all_syllables = tuple(_estimate_syllables(w) for w in word_list)
+    
+    clauses = []
+    clause_begin = 0
+    current_syllables = 0
+    for i, (word, syllables) in enumerate(zip(word_list, all_syllables)):
+        current_syllables += syllables
+        
+        if word in _SENTENCE_END_PUNCT and i > clause_begin:
+            # 遇到句号，结束当前子句
+            clauses.append((word_list[clause_begin:i + 1], all_syllables[clause_begin:i + 1], current_syllables))
+            clause_begin = i + 1
+            current_syllables = 0
+    
+    # 最后一个子句（可能没有句号结尾）
+    if clause_begin < len(word_list):
+        clauses.append((word_list[clause_begin:], all_syllables[clause_begin:], current_syllables))
+    
+    return word_list, all_syllables, tuple(clauses)
+
+
+def _get_parse_executor() -> ThreadPoolExecutor:
+    """获取结果解析线程池（首次使用时创建，所有 ASRRunner 共享）"""
+    global _parse_executor
+    if _parse_executor is None:
+        with _parse_executor_lock:
+            if _parse_executor is None:
+                _parse_executor = ThreadPoolExecutor(
+                    max_workers=min(8, os.cpu_count() or 4),
+                    thread_name_prefix='ASR-Parse'
+                )
+    return _parse_executor
+
+
+def _prepare_audio(audio_input):
+    """
+    在占用模型实例之前把16kHz单声道16位WAV字节流解码为 float32 波形
+    
+    FunASR 收到字节流时会在 generate 内部（持有模型实例期间）按原始PCM解码，
+    连同WAV头一起当作采样点；其他格式或文件路径原样返回，由FunASR自行读取
+    """
+    if not isinstance(audio_input, (bytes, bytearray)) or audio_input[:4] != b'RIFF':
+        return audio_input
+    try:
+        with wave.open(io.BytesIO(audio_input), 'rb') as wav:
+            if wav.getsampwidth() != 2 or wav.getnchannels() != 1 or wav.getframerate() != 16000:
+                return audio_input
+            frames = wav.readframes(wav.getnframes())
+    except (wave.Error, EOFError):
+        return audio_input
+    # 与FunASR一致：int16 归一化到 [-1, 1)
+    return np.frombuffer(frames, dtype=np.int16).astype(np.float32) / 32768.0
+
+
+def _punct_mask(text: str) -> List[bool]:
+    """逐字标点标记：将文本按 UTF-32 码位一次性与标点码位比对，避免逐字查集合"""
+    codepoints = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+    return np.isin(codepoints, _PUNCT_CODEPOINTS).tolist()
+
+
+def _align_char_timestamps(text: str, timestamp_list: List, ts_factor: float) -> List[Dict]:
+    """
+    将字级别timestamp逐字对齐到文本
+    
+    - timestamp 数量等于字符数：逐字直接对应
+    - timestamp 数量等于非标点字符数（FunASR的timestamp不包含标点）：标点沿用前一个字的结束时间
+    - 其他情况无法对齐，返回空列表
+    """
+    if len(timestamp_list) == len(text):
+        skip_punct = False
+    elif len(timestamp_list) == len(text.translate(_PUNCT_DELETE)):
+        skip_punct = True
+    else:
+        return []
+    
+    starts, ends = _scale_timestamps(timestamp_list, ts_factor)
+    is_punct = _punct_mask(text) if skip_punct else [False] * len(text)
+    words = []
+    ts_idx = 0
+    for char, punct in zip(text, is_punct):
+        if punct:
+            if words:
+                punct_time = words[-1]['end']
+                words.append({'text': char, 'start': punct_time, 'end': punct_time})
+            continue
+        if ends[ts_idx] is not None:
+            words.append({'text': char, 'start': starts[ts_idx], 'end': ends[ts_idx]})
+        ts_idx += 1
+    return words
+
+
+def _to_word_dicts(items: List[Tuple[str, float, float]]) -> List[Dict]:
+    """将 (text, start, end) 元组列表转换为词字典列表"""
+    return [{'text': t, 'start': st, 'end': et} for t, st, et in items]
+
+
+def _estimate_syllables(word: str) -> int:
+    """估算词的音节数"""
+    if _is_punctuation(word):
+        return 0
+    chinese_chars = len(_CHINESE_RE.findall(word))
+    english_part = _CHINESE_DIGIT_RE.sub('', word)
+    english_syllables = 0
+    if english_part.strip():
+        vowel_groups = _VOWEL_RE.findall(english_part)
+        english_syllables = max(1, len(vowel_groups)) if _LATIN_RE.search(english_part) else 0
+    digits = len(_DIGIT_RE.findall(word))
+    total = chinese_chars + english_syllables + digits
+    return max(1, total) if total > 0 else 1
+
+
+@lru_cache(maxsize=4096)
+def _cut(text: str) -> Tuple[str, ...]:
+    """
+    分词（带缓存，过滤空词）
+    
+    纯ASCII文本按正则切分（保留空白和标点），不含英文/数字的短句（不超过 _SHORT_TEXT_MAX_CHARS 字）逐字切分，
+    其余文本使用jieba精确模式；各词拼接后等于原文；
+    方法2（时间戳映射）失败后方法3会对同一文本再次分词，缓存可避免重复计算；
+    返回元组，防止调用方修改缓存中的结果
+    """
+    if text.isascii():
+        return tuple(_ASCII_TOKEN_RE.findall(text))
+    if len(text) <= _SHORT_TEXT_MAX_CHARS and not _ASCII_ALNUM_RE.search(text):
+        return tuple(text)
+    return tuple(w for w in _jieba_lcut(text, cut_all=False) if w)
+
 
 class FunASRModelWrapper:
     """FunASR AutoModel包装器，用于池化管理"""
@@ -27,24 +286,22 @@ class FunASRModelWrapper:
     def __init__(self, model_config: dict):
         logger.info("正在创建FunASR AutoModel实例...")
         
-        # 检测设备和硬件资源（与demo.py一致）
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        ngpu = 1 if self.device == "cuda" else 0
-        
-        # 获取CPU核心数（限制最大值，避免超大服务器导致内存问题）
-        try:
-            import psutil
-            ncpu = psutil.cpu_count()
-        except:
-            import multiprocessing
-            ncpu = multiprocessing.cpu_count()
-        
-        # ⚠️ 限制CPU核心数，避免在大型服务器上分配过多内存
-        # FunASR每个核心会分配一定内存，112核可能导致OOM
-        ncpu = min(ncpu, 16)  # 最多使用16个核心
+        # 设备和CPU核心数在模块加载时已确定
+        self.device = _DEVICE
+        ngpu = _NGPU
+        ncpu = _NCPU
         
         logger.info(f"使用设备: {self.device}, GPU数: {ngpu}, CPU核心数: {ncpu}")
         
+        # 半精度推理（仅CUDA）：FunASR只对ASR主模型生效，auto 在CUDA上默认使用fp16
+        precision_kwargs = {}
+        precision = model_config.get('precision', 'auto')
+        if precision == 'auto':
+            precision = 'fp16' if self.device == "cuda" else 'fp32'
+        if self.device == "cuda" and precision in ('fp16', 'bf16'):
+            precision_kwargs[precision] = True
+            logger.info(f"ASR主模型使用 {precision} 推理")
+        
         # 创建AutoModel（集成ASR、VAD、PUNC、说话人识别）
         # 参数与demo.py完全一致
         self.model = AutoModel(
@@ -61,10 +318,60 @@ class FunASRModelWrapper:
             device=self.device,
             disable_pbar=True,
             disable_log=True,  # 禁用日志，防止打印表单
-            disable_update=True
+            disable_update=True,
+            **precision_kwargs
         )
         
+        _configure_torch_threads(ncpu)
+        self._freeze_submodels()
+        
+        if self.device == "cpu" and model_config.get('cpu_int8_quantize', False):
+            self._quantize_cpu_submodels()
+        
         logger.info("FunASR AutoModel实例创建成功")
+        
+        self._warmup()
+    
+    def _freeze_submodels(self):
+        """
+        关闭各子模型参数的梯度
+        
+        torch.set_grad_enabled 只对当前线程生效，无法覆盖模型池中其他线程的调用；
+        参数不再 requires_grad 后，任何线程的前向计算都不会构建 autograd 图
+        """
+        for attr in ('model', 'vad_model', 'punc_model', 'spk_model'):
+            sub_model = getattr(self.model, attr, None)
+            if isinstance(sub_model, torch.nn.Module):
+                sub_model.eval()
+                sub_model.requires_grad_(False)
+    
+    def _quantize_cpu_submodels(self):
+        """对VAD/PUNC模型的线性层做int8动态量化（说话人模型对精度敏感，保持FP32）"""
+        for attr in ('vad_model', 'punc_model'):
+            sub_model = getattr(self.model, attr, None)
+            if sub_model is None:
+                continue
+            try:
+                quantized = torch.ao.quantization.quantize_dynamic(
+                    sub_model, {torch.nn.Linear}, dtype=torch.qint8
+                )
+                setattr(self.model, attr, quantized)
+                logger.info(f"{attr} 已int8动态量化")
+            except Exception as e:
+                logger.warning(f"{attr} int8量化失败，保持FP32: {e}")
+    
+    def _warmup(self):
+        """用一段1秒静音预跑一次，让 cuDNN/cuBLAS 算法选择和显存缓存在接收真实请求前完成"""
+        try:
+            silence = np.zeros(16000, dtype=np.float32)  # 16kHz 采样率下 1 秒
+            with torch.inference_mode():
+                self.model.generate(input=silence, use_itn=True, batch_size_s=60, is_final=True, sentence_timestamp=True)
+                # 静音会被VAD整段过滤，上面的调用不会执行ASR主模型；跳过VAD直接推理一次ASR主模型
+                self.model.inference(silence, model=self.model.model, kwargs=self.model.kwargs)
+            logger.info("FunASR模型预热完成")
+        except Exception as e:
+            # 预热失败不影响使用，首个请求承担初始化开销
+            logger.warning(f"FunASR模型预热失败: {e}")
     
     def transcribe_with_speaker(self, audio_input, hotword: str = '') -> Dict:
         """
@@ -79,6 +386,8 @@ class FunASRModelWrapper:
         """
         try:
             # 准备generate参数
+            # 音频原样交给FunASR：解码、VAD切分和fbank特征都在CPU上完成，
+            # 之后由FunASR自行把特征拷贝到GPU，预先把原始波形放入锁页内存并不能与计算重叠
             generate_kwargs = {
                 'input': audio_input,
                 'use_itn': True,
@@ -92,7 +401,9 @@ class FunASRModelWrapper:
                 generate_kwargs['hotword'] = hotword
             
             # 调用FunASR生成
-            res = self.model.generate(**generate_kwargs)
+            # inference_mode：不记录 autograd 信息，减少每次调用的张量分配
+            with torch.inference_mode():
+                res = self.model.generate(**generate_kwargs)
             
             if not res or len(res) == 0:
                 return None
@@ -103,12 +414,46 @@ class FunASRModelWrapper:
             logger.error(f"FunASR转写失败: {e}")
             raise
     
+    def transcribe_batch(self, audio_inputs: List, hotword: str = '') -> List[Optional[Dict]]:
+        """
+        一次 generate 调用处理多段音频（同一热词）
+        
+        Args:
+            audio_inputs: 音频输入列表（字节流或文件路径）
+            hotword: 热词
+            
+        Returns:
+            与 audio_inputs 按位置对应的结果列表，缺失的结果为 None
+        """
+        # 多段音频的VAD片段合并为更大的批次前向计算（batch_size_s 为每批音频总时长上限）
+        generate_kwargs = {
+            'input': list(audio_inputs),
+            'use_itn': True,
+            'batch_size_s': 300,
+            'batch_size': len(audio_inputs),
+            'is_final': True,
+            'sentence_timestamp': True
+        }
+        if hotword and hotword.strip():
+            generate_kwargs['hotword'] = hotword
+        
+        try:
+            with torch.inference_mode():
+                res = self.model.generate(**generate_kwargs) or []
+        except Exception as e:
+            logger.error(f"FunASR批量转写失败: {e}")
+            raise
+        
+        results = list(res[:len(audio_inputs)])
+        results.extend([None] * (len(audio_inputs) - len(results)))
+        return results
+    
     def cleanup(self):
         """清理模型资源"""
         try:
             if hasattr(self, 'model'):
                 del self.model
-            if torch.cuda.is_available():
+            if self.device == "cuda":
                 torch.cuda.empty_cache()
         except Exception as e:
             logger.error(f"清理FunASR模型资源失败: {e}")
@@ -117,7 +462,9 @@ class FunASRModelWrapper:
 class ASRRunner:
     """ASR执行器 - 使用FunASR AutoModel（支持模型池）"""
     
-    def __init__(self, model_config: dict, use_pool: bool = True, pool_size: int = 3):
+    def __init__(self, model_config: dict, use_pool: bool = True, pool_size: int = 3,
+                 max_batch: Optional[int] = None, max_wait_ms: Optional[int] = None,
+                 pin_to_thread: bool = False):
         """
         初始化ASR运行器（FunASR方式）
         
@@ -125,6 +472,9 @@ class ASRRunner:
             model_config: 模型配置
             use_pool: 是否使用模型池（生产环境推荐开启）
             pool_size: 模型池大小
+            max_batch: 动态批处理最大批量（1 表示关闭，None 时读取 CONCURRENCY_CONFIG）
+            max_wait_ms: 动态批处理凑批等待窗口(毫秒)（None 时读取 CONCURRENCY_CONFIG）
+            pin_to_thread: 模型实例绑定到调用线程（仅当调用线程长期存活且数量不超过池大小时开启）
         """
         self.model_config = model_config
         self.use_pool = use_pool
@@ -140,18 +490,50 @@ class ASRRunner:
             self.ts_correction_enabled = False
             self.ts_correction_factor = 1.0
         
+        # 加载动态批处理配置（构造参数优先）
+        try:
+            from config import CONCURRENCY_CONFIG
+        except ImportError:
+            CONCURRENCY_CONFIG = {}
+        if max_batch is None:
+            max_batch = CONCURRENCY_CONFIG.get('asr_batch_max_size', 1)
+        if max_wait_ms is None:
+            max_wait_ms = CONCURRENCY_CONFIG.get('asr_batch_timeout_ms', 20)
+        self.max_batch = max(1, int(max_batch))
+        initial_size = CONCURRENCY_CONFIG.get('asr_pool_initial_size', 1)
+        self.max_wait_ms = max_wait_ms
+        
+        # CUDA 上模型池只保留一个实例，并发请求在该实例上排队或合并成批
+        if (use_pool and pool_size > 1 and _DEVICE == "cuda"
+                and CONCURRENCY_CONFIG.get('asr_cuda_single_instance', True)):
+            # 未开启动态批处理时，以原池大小作为批量上限，保持相同的并发吞吐
+            if self.max_batch <= 1:
+                self.max_batch = pool_size
+            logger.warning(
+                f"CUDA模式下模型池大小由 {pool_size} 调整为 1，"
+                f"并发请求合并成批处理（最大批量: {self.max_batch}）"
+            )
+            pool_size = 1
+        initial_size = max(1, min(initial_size, pool_size))
+        min_size = max(1, min(CONCURRENCY_CONFIG.get('asr_pool_min_size', 1), pool_size))
+        
+        # 预加载jieba词典：避免首个请求承担词典懒加载的延迟，
+        # 也让之后 fork 出的子进程通过写时复制共享词典内存
+        jieba.initialize()
+        
         if use_pool:
             logger.info(f"使用FunASR AutoModel + 模型池模式，池大小: {pool_size}")
             # 创建模型工厂函数
             def funasr_factory():
                 return FunASRModelWrapper(model_config)
             
-            # 创建模型池
-            self.model_pool = ModelPool(
+            # 创建模型池（线程绑定模式下，线程首次获取的实例之后一直由该线程独占）
+            pool_cls = PinnedModelPool if pin_to_thread else ModelPool
+            self.model_pool = pool_cls(
                 model_factory=funasr_factory,
-                initial_size=min(pool_size, 2),  # 初始创建较少实例
+                initial_size=initial_size,  # 启动时只同步创建少量实例，缩短启动时间
                 max_size=pool_size,
-                min_size=1,
+                min_size=min_size,  # 后台补齐到该数量，空闲超时的实例回收时也至少保留该数量
                 max_idle_time=600,  # 10分钟
                 health_check_interval=300  # 5分钟，降低日志频率
             )
@@ -160,6 +542,62 @@ class ASRRunner:
             logger.info("使用FunASR AutoModel单例模式")
             self.model_pool = None
             self.model = FunASRModelWrapper(model_config)
+        
+        self._last_cache_release = 0.0
+        
+        # 动态批处理：窗口期内到达的请求合并为一次 generate 调用
+        # 每个模型实例对应一个工作线程，保持与模型池相同的并发度
+        self.dispatcher: Optional[BatchingDispatcher] = None
+        if self.max_batch > 1:
+            self.dispatcher = BatchingDispatcher(
+                run_batch=self._run_model_batch,
+                max_batch=self.max_batch,
+                max_wait_ms=self.max_wait_ms,
+                workers=pool_size if (use_pool and self.model_pool) else 1,
+                name='ASR-Batcher'
+            )
+    
+    def _run_model_batch(self, audio_inputs: List, hotword: str) -> List[Optional[Dict]]:
+        """一次模型调用转写多段音频（模型池模式下只占用一个实例）"""
+        if self.use_pool and self.model_pool:
+            with self.model_pool.acquire(timeout=60.0) as model:
+                results = model.transcribe_batch(audio_inputs, hotword)
+            self._release_cuda_cache_if_idle()
+            return results
+        return self.model.transcribe_batch(audio_inputs, hotword)
+    
+    def transcribe_batch(self, audio_inputs: List, hotwords: Optional[List[str]] = None) -> List[Optional[List[Dict]]]:
+        """
+        批量执行语音识别和说话人识别：相同热词的音频合并为一次 generate 调用
+        
+        Args:
+            audio_inputs: 音频输入列表（字节流bytes或文件路径str）
+            hotwords: 与 audio_inputs 一一对应的热词列表，None 表示均不使用热词
+            
+        Returns:
+            与 audio_inputs 按位置对应的转写结果列表（格式同 transcribe_with_speaker），识别为空的项为 None
+        """
+        if hotwords is None:
+            hotwords = [''] * len(audio_inputs)
+        
+        # 热词是整批共用的 generate 参数，按热词分组
+        groups: Dict[str, List[int]] = {}
+        for i, hotword in enumerate(hotwords):
+            groups.setdefault(hotword or '', []).append(i)
+        
+        transcripts: List[Optional[List[Dict]]] = [None] * len(audio_inputs)
+        try:
+            for hotword, indices in groups.items():
+                logger.info("🎙️ 开始FunASR批量转写: %d 段音频", len(indices))
+                results = self._run_model_batch([_prepare_audio(audio_inputs[i]) for i in indices], hotword)
+                for i, result in zip(indices, results):
+                    if result:
+                        transcripts[i] = self._parse_result(result)
+        except Exception as e:
+            logger.error(f"❌ FunASR批量转写失败: {e}")
+            raise
+        
+        return transcripts
     
     def transcribe_with_speaker(self, audio_input, hotword: str = '') -> Optional[List[Dict]]:
         """
@@ -178,95 +616,135 @@ class ASRRunner:
         """
         try:
             input_type = "字节流" if isinstance(audio_input, bytes) else "文件"
-            logger.info(f"🎙️ 开始FunASR一体化转写 (输入类型: {input_type})")
+            logger.info("🎙️ 开始FunASR一体化转写 (输入类型: %s)", input_type)
             if hotword and hotword.strip():
-                logger.info(f"📝 使用热词: {hotword}")
+                logger.info("📝 使用热词: %s", hotword)
             else:
                 logger.info("📝 无热词")
             
-            # 根据模式选择执行方式
-            if self.use_pool and self.model_pool:
-                # 使用模型池
-                logger.info("⏳ 正在从模型池获取模型实例...")
-                with self.model_pool.acquire(timeout=60.0) as model:
-                    logger.info("✅ 模型获取成功，开始转录...")
-                    result = model.transcribe_with_speaker(audio_input, hotword)
-            else:
-                # 使用单例模型
-                logger.info("🔄 使用单例模型进行转录...")
-                result = self.model.transcribe_with_speaker(audio_input, hotword)
+            result = self._run_model(_prepare_audio(audio_input), hotword)
             
             if not result:
                 logger.warning("⚠️ FunASR返回空结果")
                 return None
             
-            # 解析FunASR结果格式
-            transcript_list = []
+            # 结果解析（分词、时间戳插值）在模型归还之后进行，不占用模型实例
+            return self._parse_result(result)
             
-            if 'sentence_info' in result:
-                # 有说话人信息的结果
-                sentence_count = len(result['sentence_info'])
-                
-                # 创建说话人ID映射表（按出现顺序重新编号）
-                speaker_id_map = {}  # 原始spk -> 连续编号
-                next_speaker_number = 1
-                
-                # 统计时间戳使用情况
-                ts_stats = {'native': 0, 'mapped': 0, 'interpolated': 0}
-                
-                for sentence in result['sentence_info']:
-                    original_spk = sentence.get('spk', 0)
-                    
-                    # 第一次遇到这个说话人时，分配新的连续编号
-                    if original_spk not in speaker_id_map:
-                        speaker_id_map[original_spk] = next_speaker_number
-                        next_speaker_number += 1
-                    
-                    # 使用映射后的连续编号
-                    speaker_number = speaker_id_map[original_spk]
-                    
-                    text = sentence.get('text', '')
-                    start_time = sentence.get('start', 0) / 1000.0  # 转为秒
-                    end_time = sentence.get('end', 0) / 1000.0
-                    
-                    # 应用时间戳校正
-                    if self.ts_correction_enabled:
-                        start_time *= self.ts_correction_factor
-                        end_time *= self.ts_correction_factor
-                    
-                    # 提取词级别时间戳（校正因子会在内部方法中应用）
-                    words, ts_method = self._extract_word_timestamps_with_stats(sentence, start_time, end_time, text)
-                    ts_stats[ts_method] = ts_stats.get(ts_method, 0) + 1
-                    
-                    transcript_list.append({
-                        'text': text,
-                        'start_time': start_time,
-                        'end_time': end_time,
-                        'speaker': f"发言人{speaker_number}",  # 使用连续编号
-                        'words': words  # 词级别时间戳
-                    })
+        except Exception as e:
+            logger.error(f"❌ FunASR转写失败: {e}")
+            raise
+    
+    def _run_model(self, audio_input, hotword: str) -> Optional[Dict]:
+        """调用模型获取FunASR原始结果（模型池模式下只在 generate 期间占用模型实例）"""
+        # 根据模式选择执行方式
+        if self.dispatcher is not None:
+            # 动态批处理（与并发请求合并执行，热词相同的请求才会合并）
+            logger.info("⏳ 已提交到批处理队列，等待转录...")
+            return self.dispatcher.submit(audio_input, hotword or '')
+        
+        if self.use_pool and self.model_pool:
+            # 使用模型池
+            logger.info("⏳ 正在从模型池获取模型实例并转录...")
+            with self.model_pool.acquire(timeout=60.0) as model:
+                result = model.transcribe_with_speaker(audio_input, hotword)
+            logger.info("✅ 转录完成，模型实例已归还")
+            self._release_cuda_cache_if_idle()
+            return result
+        
+        # 使用单例模型
+        logger.info("🔄 使用单例模型进行转录...")
+        return self.model.transcribe_with_speaker(audio_input, hotword)
+    
+    def _release_cuda_cache_if_idle(self):
+        """
+        模型池全部空闲时归还CUDA缓存显存
+        
+        繁忙期间保留缓存供后续请求复用（避免反复 cudaMalloc/cudaFree），
+        并限制释放频率，只在流量间隙把显存还给驱动
+        """
+        if _DEVICE != "cuda":
+            return
+        stats = self.model_pool.get_stats()
+        if stats['available_count'] < stats['current_size']:
+            return
+        now = time.monotonic()
+        if now - self._last_cache_release < _CUDA_CACHE_RELEASE_INTERVAL:
+            return
+        self._last_cache_release = now
+        torch.cuda.empty_cache()
+    
+    def _parse_result(self, result: Dict) -> List[Dict]:
+        """将FunASR原始结果解析为转写结果列表"""
+        # 解析FunASR结果格式
+        transcript_list = []
+        
+        if 'sentence_info' in result:
+            # 有说话人信息的结果
+            sentence_count = len(result['sentence_info'])
+            
+            # 统计时间戳使用情况
+            ts_stats = {'native': 0, 'mapped': 0, 'interpolated': 0}
+            
+            # 每个句子的字段只读取一次，再按列拆开
+            sentences = result['sentence_info']
+            texts, starts, ends, spks = zip(*[
+                (s.get('text', ''), s.get('start', 0), s.get('end', 0), s.get('spk', 0))
+                for s in sentences
+            ]) if sentences else ((), (), (), ())
+            
+            # 句子起止时间按列一次性换算：毫秒转秒并应用时间戳校正
+            starts = np.array(starts, dtype=np.float64) / 1000.0
+            ends = np.array(ends, dtype=np.float64) / 1000.0
+            if self.ts_correction_enabled:
+                starts *= self.ts_correction_factor
+                ends *= self.ts_correction_factor
+            
+            # 说话人按首次出现顺序重新编号：原始spk -> "发言人N"（N 连续，从1开始）
+            # 标签只为每位说话人格式化一次，而不是每个句子都构造一次默认值
+            speaker_id_map = {spk: f"发言人{n}" for n, spk in enumerate(dict.fromkeys(spks), 1)}
+            speakers = [speaker_id_map[spk] for spk in spks]
+            
+            starts = starts.tolist()
+            ends = ends.tolist()
+            
+            # 提取词级别时间戳（校正因子会在内部方法中应用）；长转写并行处理，结果保持原顺序
+            if sentence_count > _PARALLEL_PARSE_MIN_SENTENCES:
+                extracted = _get_parse_executor().map(
+                    self._extract_word_timestamps_with_stats, sentences, starts, ends, texts
+                )
+            else:
+                extracted = map(self._extract_word_timestamps_with_stats, sentences, starts, ends, texts)
+            
+            for text, start_time, end_time, speaker, (words, ts_method) in zip(texts, starts, ends, speakers, extracted):
+                ts_stats[ts_method] = ts_stats.get(ts_method, 0) + 1
                 
-                # 输出时间戳统计
-                logger.info(f"✅ 识别完成: 共{sentence_count}个句子, {len(speaker_id_map)}位说话人")
-                logger.info(f"📊 时间戳来源: 原生={ts_stats.get('native', 0)}, 映射={ts_stats.get('mapped', 0)}, 插值={ts_stats.get('interpolated', 0)}")
-            elif 'text' in result:
-                # 只有文本，没有说话人信息
-                logger.warning("⚠️ 结果中无说话人信息，作为单人处理")
-                text = result['text']
-                words = self._extract_word_timestamps(None, 0, 0, text)
                 transcript_list.append({
                     'text': text,
-                    'start_time': 0,
-                    'end_time': 0,
-                    'speaker': '发言人1',  # 单人时默认为发言人1
-                    'words': words
+                    'start_time': start_time,
+                    'end_time': end_time,
+                    'speaker': speaker,  # 使用连续编号
+                    'words': words  # 词级别时间戳
                 })
             
-            return transcript_list
-            
-        except Exception as e:
-            logger.error(f"❌ FunASR转写失败: {e}")
-            raise
+            # 输出时间戳统计
+            logger.info("✅ 识别完成: 共%d个句子, %d位说话人", sentence_count, len(speaker_id_map))
+            logger.info("📊 时间戳来源: 原生=%d, 映射=%d, 插值=%d",
+                        ts_stats.get('native', 0), ts_stats.get('mapped', 0), ts_stats.get('interpolated', 0))
+        elif 'text' in result:
+            # 只有文本，没有说话人信息
+            logger.warning("⚠️ 结果中无说话人信息，作为单人处理")
+            text = result['text']
+            words = self._extract_word_timestamps(None, 0, 0, text)
+            transcript_list.append({
+                'text': text,
+                'start_time': 0,
+                'end_time': 0,
+                'speaker': '发言人1',  # 单人时默认为发言人1
+                'words': words
+            })
+        
+        return transcript_list
     
     def _extract_word_timestamps_with_stats(self, sentence: Dict, start_time: float, end_time: float, text: str) -> tuple:
         """
@@ -290,156 +768,93 @@ class ASRRunner:
         Returns:
             tuple: (词列表, 方法名称)
         """
-        import jieba
-        import re
-        
         words = []
         
         # 获取时间戳校正因子
         ts_factor = self.ts_correction_factor if self.ts_correction_enabled else 1.0
         
-        # 方法1: 尝试从FunASR结果中提取 timestamp 字段（字级别时间戳）
-        if sentence and 'timestamp' in sentence:
-            timestamp_list = sentence.get('timestamp', [])
-            text_chars = list(text) if text else []
-            
-            if timestamp_list and len(timestamp_list) == len(text_chars):
-                # 时间戳数量与字符数量匹配，直接使用
-                for i, (char, ts) in enumerate(zip(text_chars, timestamp_list)):
-                    if isinstance(ts, (list, tuple)) and len(ts) >= 2:
-                        char_start = (ts[0] / 1000.0) * ts_factor
-                        char_end = (ts[1] / 1000.0) * ts_factor
-                        words.append({'text': char, 'start': char_start, 'end': char_end})
-                
-                if words:
-                    return words, 'native'
-                    
-            elif timestamp_list:
-                # FunASR的timestamp不包含标点符号，需要映射
-                PUNCTUATION_SET = set('，。！？、；：""''（）【】《》—…·,.!?;:\'"()[]<>-–—')
-                
-                char_info = []
-                ts_idx = 0
-                for char in text_chars:
-                    is_punct = char in PUNCTUATION_SET
-                    if is_punct:
-                        char_info.append((char, True, -1))
-                    else:
-                        char_info.append((char, False, ts_idx))
-                        ts_idx += 1
-                
-                non_punct_count = sum(1 for c in char_info if not c[1])
-                
-                if non_punct_count == len(timestamp_list):
-                    for i, (char, is_punct, ts_idx) in enumerate(char_info):
-                        if is_punct:
-                            if words:
-                                punct_time = words[-1]['end']
-                                words.append({'text': char, 'start': punct_time, 'end': punct_time})
-                        else:
-                            ts = timestamp_list[ts_idx]
-                            if isinstance(ts, (list, tuple)) and len(ts) >= 2:
-                                words.append({'text': char, 'start': (ts[0] / 1000.0) * ts_factor, 'end': (ts[1] / 1000.0) * ts_factor})
-                    
-                    if words:
-                        return words, 'native'
+        # FunASR的字级别时间戳（不存在时为 None）
+        timestamp_list = sentence.get('timestamp') if sentence else None
+        
+        # 方法1: 字级别时间戳与文本逐字对齐（数量一致时直接对应，否则跳过标点对应）
+        if timestamp_list:
+            words = _align_char_timestamps(text or '', timestamp_list, ts_factor)
+            if words:
+                return words, 'native'
         
         # 方法1b: 尝试从 words 字段提取
         if sentence and 'words' in sentence:
-            for word_info in sentence['words']:
-                word_text = word_info.get('text', '')
-                word_start = (word_info.get('start', 0) / 1000.0) * ts_factor
-                word_end = (word_info.get('end', 0) / 1000.0) * ts_factor
-                if word_text:
-                    words.append({'text': word_text, 'start': word_start, 'end': word_end})
+            word_fields = [(w.get('text', ''), w.get('start', 0), w.get('end', 0)) for w in sentence['words']]
+            if word_fields:
+                # 毫秒转秒按列一次性计算
+                word_texts, word_starts, word_ends = zip(*word_fields)
+                word_starts = (np.array(word_starts, dtype=np.float64) / 1000.0 * ts_factor).tolist()
+                word_ends = (np.array(word_ends, dtype=np.float64) / 1000.0 * ts_factor).tolist()
+                words = [
+                    {'text': t, 'start': ws, 'end': we}
+                    for t, ws, we in zip(word_texts, word_starts, word_ends) if t
+                ]
             if words:
                 return words, 'native'
         
         # 方法2: 分词+timestamp映射
-        if sentence and 'timestamp' in sentence:
-            timestamp_list = sentence.get('timestamp', [])
-            if timestamp_list and text:
-                words = self._map_timestamps_to_words(text, timestamp_list, ts_factor)
-                if words:
-                    return words, 'mapped'
+        if timestamp_list and text:
+            words = self._map_timestamps_to_words(text, timestamp_list, ts_factor)
+            if words:
+                return words, 'mapped'
         
         # 方法3: 智能分词+子句插值（降级方案）
         if not text or not text.strip():
             return words, 'interpolated'
         
+        # 计算过程中词用 (text, start, end) 元组表示，结束时统一转换为字典
+        items = []
         try:
-            # 中英文标点符号集合
-            PUNCTUATION_SET = set('，。！？、；：""''（）【】《》—…·,.!?;:\'"()[]<>-–—')
-            # 句子结束标点（用于拆分子句）
-            SENTENCE_END_PUNCT = set('。！？.!?')
-            
-            def is_punctuation(word: str) -> bool:
-                """判断是否为纯标点符号"""
-                return all(c in PUNCTUATION_SET or c.isspace() for c in word)
-            
-            def is_sentence_end(word: str) -> bool:
-                """判断是否为句子结束标点"""
-                return word in SENTENCE_END_PUNCT
-            
-            def estimate_syllables(word: str) -> int:
-                """估算词的音节数"""
-                if is_punctuation(word):
-                    return 0
-                chinese_chars = len(re.findall(r'[\u4e00-\u9fff]', word))
-                english_part = re.sub(r'[\u4e00-\u9fff\d]', '', word)
-                english_syllables = 0
-                if english_part.strip():
-                    vowel_groups = re.findall(r'[aeiouAEIOU]+', english_part)
-                    english_syllables = max(1, len(vowel_groups)) if re.search(r'[a-zA-Z]', english_part) else 0
-                digits = len(re.findall(r'\d', word))
-                total = chinese_chars + english_syllables + digits
-                return max(1, total) if total > 0 else 1
-            
-            def process_clause(word_list: list, clause_start: float, clause_end: float) -> list:
-                """处理单个子句，返回带时间戳的词列表"""
+            def process_clause(word_list: list, syllable_counts: list, clause_start: float, clause_end: float) -> tuple:
+                """
+                处理单个子句（syllable_counts 与 word_list 一一对应）
+                
+                Returns:
+                    tuple: (带时间戳的词元组列表, 最后一个非标点词的下标，没有时为 -1)
+                """
                 if not word_list:
-                    return []
+                    return [], -1
                 
-                clause_words = []
                 duration = clause_end - clause_start
                 if duration <= 0:
                     duration = max(len(word_list), 1) * 0.2
                     clause_end = clause_start + duration
                 
-                syllable_counts = [estimate_syllables(w) for w in word_list]
                 total_syllables = sum(syllable_counts)
                 
                 if total_syllables == 0:
-                    total_syllables = max(sum(1 for w in word_list if not is_punctuation(w)), 1)
-                    syllable_counts = [1 if not is_punctuation(w) else 0 for w in word_list]
+                    total_syllables = max(sum(1 for w in word_list if not _is_punctuation(w)), 1)
+                    syllable_counts = [1 if not _is_punctuation(w) else 0 for w in word_list]
                 
-                current_time = clause_start
-                for word, syllables in zip(word_list, syllable_counts):
-                    if syllables == 0:
-                        clause_words.append({'text': word, 'start': current_time, 'end': current_time})
-                    else:
-                        word_duration = (syllables / total_syllables) * duration
-                        clause_words.append({'text': word, 'start': current_time, 'end': current_time + word_duration})
-                        current_time += word_duration
+                # 按音节比例分配时长，前缀和得到各词边界（标点时长为 0，起止时间相同）
+                syllable_arr = np.asarray(syllable_counts, dtype=np.float64)
+                bounds = np.concatenate(([clause_start], syllable_arr / total_syllables * duration)).cumsum()
+                clause_words = list(zip(word_list, bounds[:-1].tolist(), bounds[1:].tolist()))
+                
+                voiced = np.flatnonzero(syllable_arr)
+                last_word_idx = int(voiced[-1]) if voiced.size else -1
                 
                 # 确保最后一个非标点词的结束时间等于子句结束时间
-                for w in reversed(clause_words):
-                    if w['start'] != w['end']:
-                        w['end'] = clause_end
-                        break
+                if last_word_idx >= 0:
+                    clause_words[last_word_idx] = clause_words[last_word_idx][:2] + (clause_end,)
                 
-                return clause_words
+                return clause_words, last_word_idx
             
-            # 使用jieba进行中文分词
-            word_segments = list(jieba.cut(text, cut_all=False))
-            word_list = [w for w in word_segments if w]
+            # 分词、音节估算和子句划分只取决于文本，按文本缓存
+            word_list, all_syllables, clauses = _interpolation_plan(text)
             
             if not word_list:
-                return words, 'interpolated'
+                return [], 'interpolated'
             
             duration = end_time - start_time
             if duration <= 0:
-                non_punct_count = sum(1 for w in word_list if not is_punctuation(w))
+                # 音节数为 0 的即纯标点
+                non_punct_count = sum(1 for syllables in all_syllables if syllables)
                 duration = max(non_punct_count, 1) * 0.3
                 end_time = start_time + duration
             
@@ -448,72 +863,49 @@ class ASRRunner:
             should_split = duration > 20 or len(word_list) > 50
             
             if should_split:
-                # 拆分成多个子句
-                clauses = []  # 每个元素是 (word_list, syllable_count)
-                current_clause = []
-                current_syllables = 0
-                
-                for word in word_list:
-                    current_clause.append(word)
-                    current_syllables += estimate_syllables(word)
-                    
-                    if is_sentence_end(word) and len(current_clause) > 1:
-                        # 遇到句号，结束当前子句
-                        clauses.append((current_clause, current_syllables))
-                        current_clause = []
-                        current_syllables = 0
-                
-                # 处理最后一个子句（可能没有句号结尾）
-                if current_clause:
-                    clauses.append((current_clause, current_syllables))
-                
                 # 按子句音节数比例分配时间
-                total_syllables = sum(c[1] for c in clauses)
+                total_syllables = sum(c[2] for c in clauses)
                 if total_syllables == 0:
                     total_syllables = len(clauses)
                 
                 current_time = start_time
-                for clause_words, clause_syllables in clauses:
+                last_word_idx = -1
+                for clause_words, clause_syllable_counts, clause_syllables in clauses:
                     # 计算子句时长
                     if clause_syllables == 0:
-                        clause_syllables = max(sum(1 for w in clause_words if not is_punctuation(w)), 1)
+                        clause_syllables = max(sum(1 for w in clause_words if not _is_punctuation(w)), 1)
                     clause_duration = (clause_syllables / total_syllables) * duration
                     clause_end = current_time + clause_duration
                     
                     # 处理子句
-                    clause_result = process_clause(clause_words, current_time, clause_end)
-                    words.extend(clause_result)
+                    clause_result, clause_last_idx = process_clause(clause_words, clause_syllable_counts, current_time, clause_end)
+                    if clause_last_idx >= 0:
+                        last_word_idx = len(items) + clause_last_idx
+                    items.extend(clause_result)
                     
                     current_time = clause_end
                 
-                # 确保最后一个词的结束时间等于句子结束时间
-                if words:
-                    for w in reversed(words):
-                        if w['start'] != w['end']:
-                            w['end'] = end_time
-                            break
+                # 确保最后一个非标点词的结束时间等于句子结束时间
+                if last_word_idx >= 0:
+                    items[last_word_idx] = items[last_word_idx][:2] + (end_time,)
                 
-                logger.debug(f"超长句子拆分: {len(clauses)} 个子句, {len(words)} 个词")
+                logger.debug("超长句子拆分: %d 个子句, %d 个词", len(clauses), len(items))
             else:
                 # 短句子直接处理
-                words = process_clause(word_list, start_time, end_time)
-                logger.debug(f"使用分词+音节插值: {len(words)} 个词")
+                items, _ = process_clause(word_list, all_syllables, start_time, end_time)
+                logger.debug("使用分词+音节插值: %d 个词", len(items))
             
-            # 验证文本完整性
-            reconstructed_text = ''.join([w['text'] for w in words])
-            if reconstructed_text.replace(' ', '') != text.replace(' ', ''):
-                logger.warning(f"⚠️ 分词后文本不匹配，原文本长度: {len(text)}, 重建长度: {len(reconstructed_text)}")
+            # 验证文本完整性：分词只切分不改写文本，比较去空格后的字符数即可，无需拼接重建
+            reconstructed_chars = sum(len(t) - t.count(' ') for t, _, _ in items)
+            if reconstructed_chars != len(text) - text.count(' '):
+                logger.warning(f"⚠️ 分词后文本不匹配，原文本长度: {len(text)}, 重建长度: {reconstructed_chars}")
             
         except Exception as e:
             logger.warning(f"⚠️ 词级别时间戳提取失败: {e}，将使用句子级别时间戳")
             if text.strip():
-                words.append({
-                    'text': text.strip(),
-                    'start': start_time,
-                    'end': end_time
-                })
+                items.append((text.strip(), start_time, end_time))
         
-        return words, 'interpolated'
+        return _to_word_dicts(items), 'interpolated'
     
     def _map_timestamps_to_words(self, text: str, timestamp_list: List, ts_factor: float = 1.0) -> List[Dict]:
         """
@@ -528,36 +920,29 @@ class ASRRunner:
         Returns:
             词级别时间戳列表
         """
-        import jieba
-        
-        words = []
-        PUNCTUATION_SET = set('，。！？、；：""''（）【】《》—…·,.!?;:\'"()[]<>-–—')
+        words = []  # (text, start, end) 元组，返回时统一转换为字典
         
         try:
             # 使用jieba分词
-            word_segments = list(jieba.cut(text, cut_all=False))
-            word_list = [w for w in word_segments if w]
+            word_list = _cut(text)
+            
+            # 毫秒转秒，并应用校正
+            starts, ends = _scale_timestamps(timestamp_list, ts_factor)
             
             # 为每个词计算时间戳
             # timestamp只对应非标点字符，所以需要跟踪ts_index
             ts_index = 0
             
             for word in word_list:
-                # 检查这个词是否是纯标点
-                is_pure_punct = all(c in PUNCTUATION_SET for c in word)
+                # 去掉标点后剩余的字符与timestamp一一对应
+                non_punct_chars = word.translate(_PUNCT_DELETE)
                 
-                if is_pure_punct:
-                    # 标点使用前一个词的结束时间
+                if not non_punct_chars:
+                    # 纯标点使用前一个词的结束时间
                     if words:
-                        punct_time = words[-1]['end']
-                        words.append({
-                            'text': word,
-                            'start': punct_time,
-                            'end': punct_time
-                        })
+                        punct_time = words[-1][2]
+                        words.append((word, punct_time, punct_time))
                 else:
-                    # 计算这个词中的非标点字符数
-                    non_punct_chars = [c for c in word if c not in PUNCTUATION_SET]
                     num_non_punct = len(non_punct_chars)
                     
                     if ts_index + num_non_punct > len(timestamp_list):
@@ -565,26 +950,18 @@ class ASRRunner:
                         break
                     
                     # 获取该词的起始和结束时间
-                    word_start_ts = timestamp_list[ts_index]
-                    word_end_ts = timestamp_list[ts_index + num_non_punct - 1]
+                    word_start = starts[ts_index]
+                    word_end = ends[ts_index + num_non_punct - 1]
                     
-                    if isinstance(word_start_ts, (list, tuple)) and isinstance(word_end_ts, (list, tuple)):
-                        word_start = (word_start_ts[0] / 1000.0) * ts_factor  # 毫秒转秒，并应用校正
-                        word_end = (word_end_ts[1] / 1000.0) * ts_factor
-                        
-                        words.append({
-                            'text': word,
-                            'start': word_start,
-                            'end': word_end
-                        })
+                    if word_start is not None and word_end is not None:
+                        words.append((word, word_start, word_end))
                     
                     ts_index += num_non_punct
             
-            return words
-            
         except Exception as e:
             logger.warning(f"⚠️ timestamp映射异常: {e}")
-            return words
+        
+        return _to_word_dicts(words)
     
     def get_pool_stats(self) -> Optional[dict]:
         """获取模型池统计信息"""
@@ -594,6 +971,8 @@ class ASRRunner:
     
     def shutdown(self):
         """关闭运行器，清理资源"""
+        if self.dispatcher is not None:
+            self.dispatcher.shutdown()
         if self.use_pool and self.model_pool:
             self.model_pool.shutdown()
         elif self.model:
@@ -3,11 +3,14 @@
 支持多个模型实例的对象池模式，解决全局锁导致的并发瓶颈
 """
 
+import heapq
 import logging
 import threading
 import queue
 import time
-from typing import Optional, Callable, Any
+import weakref
+from collections import deque
+from typing import Optional, Callable, Any, Dict, List, Hashable
 from contextlib import contextmanager
 
 logger = logging.getLogger(__name__)
@@ -49,28 +52,35 @@ class ModelPool:
         self.max_idle_time = max_idle_time
         self.health_check_interval = health_check_interval
         
-        # 可用模型队列
-        self.available_models: queue.Queue = queue.Queue(maxsize=max_size)
+        # 可用模型（LIFO：优先复用最近归还、缓存仍热的实例）
+        # 由条件变量 _cv 保护，获取/归还以及计数统计都在同一把锁内完成
+        self.available_models: deque = deque()
+        self._cv = threading.Condition(threading.Lock())
         
         # 当前池大小
         self.current_size = 0
         self.size_lock = threading.Lock()
         
-        # 统计信息
+        # 统计信息（由 _cv 保护）
         self.stats = {
             'total_acquired': 0,
             'total_released': 0,
             'total_created': 0,
             'total_destroyed': 0,
-            'acquisition_times': [],
+            'acquisition_times': deque(maxlen=100),  # 只保留最近100次的获取时间
             'active_count': 0
         }
-        self.stats_lock = threading.Lock()
         
         # 模型最后使用时间
         self.model_last_used = {}
         self.last_used_lock = threading.Lock()
         
+        # 按最后使用时间排序的最小堆 (last_used, model_id)，健康检查只需查看堆顶；
+        # 每次归还都会压入新条目，与 model_last_used 不一致的旧条目在弹出时丢弃
+        # 使用独立的小锁，不与获取模型的热路径竞争
+        self._idle_heap: List[tuple] = []
+        self._idle_heap_lock = threading.Lock()
+        
         # 初始化池
         self._initialize_pool()
         
@@ -89,29 +99,42 @@ class ModelPool:
         for i in range(self.initial_size):
             try:
                 model = self._create_model()
-                self.available_models.put(model)
+                self._put(model)
                 logger.info(f"初始化模型实例 {i+1}/{self.initial_size}")
             except Exception as e:
                 logger.error(f"初始化模型失败: {e}")
     
     def _create_model(self) -> Any:
-        """创建新模型实例"""
+        """
+        创建新模型实例
+        
+        先在锁内占用一个名额，再在锁外调用 model_factory（加载模型和预热可能需要数秒），
+        其他线程不会排队等待加载完成，达到上限时立即得到 RuntimeError 转而等待归还的实例；
+        创建失败时归还占用的名额
+        """
         with self.size_lock:
             if self.current_size >= self.max_size:
                 raise RuntimeError(f"模型池已达到最大容量: {self.max_size}")
-            
-            model = self.model_factory()
-            model_id = id(model)
             self.current_size += 1
-            
-            with self.stats_lock:
-                self.stats['total_created'] += 1
-            
-            with self.last_used_lock:
-                self.model_last_used[model_id] = time.time()
-            
-            logger.info(f"创建新模型实例, 当前池大小: {self.current_size}/{self.max_size}")
-            return model
+        
+        try:
+            model = self.model_factory()
+        except BaseException:
+            with self.size_lock:
+                self.current_size -= 1
+            raise
+        model_id = id(model)
+        
+        with self._cv:
+            self.stats['total_created'] += 1
+        
+        last_used = time.time()
+        with self.last_used_lock:
+            self.model_last_used[model_id] = last_used
+        self._push_last_used(last_used, model_id)
+        
+        logger.info(f"创建新模型实例, 当前池大小: {self.current_size}/{self.max_size}")
+        return model
     
     def _destroy_model(self, model: Any):
         """销毁模型实例"""
@@ -132,11 +155,35 @@ class ModelPool:
             
             self.current_size -= 1
             
-            with self.stats_lock:
+            with self._cv:
                 self.stats['total_destroyed'] += 1
             
             logger.info(f"销毁模型实例, 当前池大小: {self.current_size}/{self.max_size}")
     
+    def _push_last_used(self, last_used: float, model_id: int):
+        """记录一次使用时间到空闲堆"""
+        with self._idle_heap_lock:
+            heapq.heappush(self._idle_heap, (last_used, model_id))
+    
+    def _take(self, timeout: float) -> Optional[Any]:
+        """取出一个可用模型并记录获取统计，超时返回 None"""
+        with self._cv:
+            if not self._cv.wait_for(lambda: self.available_models, timeout):
+                return None
+            model = self.available_models.pop()
+            self.stats['total_acquired'] += 1
+            self.stats['active_count'] += 1
+            return model
+    
+    def _put(self, model: Any) -> bool:
+        """放回可用模型并唤醒一个等待者，池已满时返回 False"""
+        with self._cv:
+            if len(self.available_models) >= self.max_size:
+                return False
+            self.available_models.append(model)
+            self._cv.notify()
+            return True
+    
     @contextmanager
     def acquire(self, timeout: float = 30.0):
         """
@@ -148,63 +195,84 @@ class ModelPool:
         Yields:
             模型实例
         """
-        start_time = time.time()
         model = None
-        
         try:
-            # 尝试从队列获取模型
-            try:
-                model = self.available_models.get(timeout=timeout)
-            except queue.Empty:
-                # 队列为空，尝试创建新模型
-                logger.warning("模型池无可用实例，尝试创建新实例...")
-                try:
-                    model = self._create_model()
-                except RuntimeError as e:
-                    # 达到最大容量，等待可用模型
-                    logger.error(f"无法创建新模型: {e}，继续等待...")
-                    model = self.available_models.get(timeout=timeout)
-            
-            acquisition_time = time.time() - start_time
-            
-            with self.stats_lock:
-                self.stats['total_acquired'] += 1
-                self.stats['acquisition_times'].append(acquisition_time)
-                self.stats['active_count'] += 1
-                # 只保留最近100次的获取时间
-                if len(self.stats['acquisition_times']) > 100:
-                    self.stats['acquisition_times'].pop(0)
-            
-            if acquisition_time > 1.0:
-                logger.warning(f"获取模型耗时较长: {acquisition_time:.2f}秒")
-            
-            # 更新最后使用时间
-            with self.last_used_lock:
-                self.model_last_used[id(model)] = time.time()
-            
+            model = self._obtain(timeout)
             yield model
-            
         finally:
             # 归还模型到池中
             if model is not None:
-                try:
-                    # 更新最后使用时间
-                    with self.last_used_lock:
-                        self.model_last_used[id(model)] = time.time()
-                    
-                    self.available_models.put_nowait(model)
-                    
-                    with self.stats_lock:
-                        self.stats['total_released'] += 1
-                        self.stats['active_count'] -= 1
-                        
-                except queue.Full:
-                    # 队列已满，销毁模型
-                    logger.warning("模型池已满，销毁多余模型")
-                    self._destroy_model(model)
+                self._return(model)
+    
+    def _obtain(self, timeout: float) -> Any:
+        """从池中取出模型（池为空且未达上限时按需创建），超时抛出 queue.Empty"""
+        start_time = time.time()
+        
+        # 尝试从池中获取模型（不等待）
+        model = self._take(0)
+        if model is None and self.current_size < self.max_size:
+            # 池为空且未达上限，按需创建新模型
+            logger.info("模型池无可用实例，按需创建新实例...")
+            try:
+                model = self._create_model()
+                with self._cv:
+                    self.stats['total_acquired'] += 1
+                    self.stats['active_count'] += 1
+            except RuntimeError as e:
+                # 其他线程已创建到最大容量
+                logger.warning(f"无法创建新模型: {e}，等待可用实例...")
+        if model is None:
+            # 等待其他请求归还模型
+            model = self._take(timeout)
+            if model is None:
+                raise queue.Empty
+        
+        acquisition_time = time.time() - start_time
+        
+        with self._cv:
+            self.stats['acquisition_times'].append(acquisition_time)
+        
+        if acquisition_time > 1.0:
+            logger.warning(f"获取模型耗时较长: {acquisition_time:.2f}秒")
+        
+        return model
+    
+    def _return(self, model: Any):
+        """归还模型到池中，池已满时销毁"""
+        # 更新最后使用时间：只在归还时记录（使用中的模型不在可用池里，不会被当作空闲回收）
+        # 单次字典赋值在 GIL 下是原子的，无需加锁
+        last_used = time.time()
+        self.model_last_used[id(model)] = last_used
+        self._push_last_used(last_used, id(model))
+        
+        with self._cv:
+            self.stats['total_released'] += 1
+            self.stats['active_count'] -= 1
+        
+        if not self._put(model):
+            # 池已满，销毁模型
+            logger.warning("模型池已满，销毁多余模型")
+            self._destroy_model(model)
+    
+    def _backfill(self):
+        """补齐实例到最小池大小（在后台线程中执行，不阻塞启动和请求）"""
+        while self.current_size < self.min_size:
+            try:
+                model = self._create_model()
+            except RuntimeError:
+                # 并发的按需创建已达到最大容量
+                break
+            except Exception as e:
+                logger.error(f"补齐模型实例失败: {e}")
+                break
+            if not self._put(model):
+                self._destroy_model(model)
+                break
     
     def _health_check_loop(self):
         """健康检查循环（后台线程）"""
+        # 启动后先在后台补齐到最小池大小，之后每轮健康检查时再次补齐
+        self._backfill()
         while True:
             try:
                 time.sleep(self.health_check_interval)
@@ -216,36 +284,48 @@ class ModelPool:
         """执行健康检查"""
         current_time = time.time()
         
-        # 检查空闲模型
-        with self.last_used_lock:
-            idle_models = []
-            for model_id, last_used in list(self.model_last_used.items()):
-                idle_time = current_time - last_used
-                if idle_time > self.max_idle_time:
-                    idle_models.append(model_id)
+        # 检查空闲模型：从堆顶弹出超过空闲时间的条目，只有仍是该模型最新使用时间的条目才有效
+        cutoff = current_time - self.max_idle_time
+        idle_models = {}  # model_id -> last_used
+        with self._idle_heap_lock:
+            heap = self._idle_heap
+            while heap and heap[0][0] < cutoff:
+                last_used, model_id = heapq.heappop(heap)
+                if self.model_last_used.get(model_id) == last_used:
+                    idle_models[model_id] = last_used
+            
+            # 旧条目过多时（高频归还）按当前记录重建，避免堆无限增长
+            if len(heap) > 4 * max(len(self.model_last_used), self.max_size):
+                heap[:] = [(t, mid) for mid, t in list(self.model_last_used.items()) if t >= cutoff]
+                heapq.heapify(heap)
         
         # 移除空闲时间过长的模型（但保持最小池大小）
         if idle_models and self.current_size > self.min_size:
             logger.info(f"发现 {len(idle_models)} 个空闲模型，当前池大小: {self.current_size}")
             
-            # 尝试从队列中移除并销毁空闲模型
+            # 从可用模型中移除空闲模型（正在使用的模型不在其中，不会被销毁）
+            limit = self.current_size - self.min_size
             models_to_destroy = []
-            for _ in range(min(len(idle_models), self.current_size - self.min_size)):
-                try:
-                    model = self.available_models.get_nowait()
+            with self._cv:
+                for model in list(self.available_models):
+                    if len(models_to_destroy) >= limit:
+                        break
                     if id(model) in idle_models:
+                        self.available_models.remove(model)
                         models_to_destroy.append(model)
-                    else:
-                        # 不是空闲模型，放回队列
-                        self.available_models.put_nowait(model)
-                except queue.Empty:
-                    break
             
             for model in models_to_destroy:
+                del idle_models[id(model)]
                 self._destroy_model(model)
         
+        # 未被回收的空闲模型放回堆中，下次检查时仍会被考虑
+        if idle_models:
+            with self._idle_heap_lock:
+                for model_id, last_used in idle_models.items():
+                    heapq.heappush(self._idle_heap, (last_used, model_id))
+        
         # 记录统计信息
-        with self.stats_lock:
+        with self._cv:
             avg_acquisition_time = (
                 sum(self.stats['acquisition_times']) / len(self.stats['acquisition_times'])
                 if self.stats['acquisition_times'] else 0
@@ -258,10 +338,13 @@ class ModelPool:
                 f"总销毁={self.stats['total_destroyed']}, "
                 f"平均获取时间={avg_acquisition_time:.3f}秒"
             )
+        
+        self._backfill()
     
     def get_stats(self) -> dict:
         """获取池统计信息"""
-        with self.stats_lock:
+        with self._cv:
+            available_count = len(self.available_models)
             stats = self.stats.copy()
             if stats['acquisition_times']:
                 stats['avg_acquisition_time'] = sum(stats['acquisition_times']) / len(stats['acquisition_times'])
@@ -272,24 +355,215 @@ class ModelPool:
             del stats['acquisition_times']  # 不返回原始列表
         
         stats['current_size'] = self.current_size
-        stats['available_count'] = self.available_models.qsize()
+        stats['available_count'] = available_count
         return stats
     
     def shutdown(self):
         """关闭模型池，清理所有资源"""
         logger.info("正在关闭模型池...")
         
-        # 清空队列中的所有模型
-        while not self.available_models.empty():
-            try:
-                model = self.available_models.get_nowait()
-                self._destroy_model(model)
-            except queue.Empty:
-                break
+        # 清空池中的所有可用模型
+        with self._cv:
+            models = list(self.available_models)
+            self.available_models.clear()
+        for model in models:
+            self._destroy_model(model)
         
         logger.info("模型池已关闭")
 
 
+class _PinnedSlot:
+    """线程绑定的模型槽位，随线程的 threading.local 数据一起释放"""
+    
+    __slots__ = ('model', '__weakref__')
+    
+    def __init__(self, model: Any):
+        self.model = model
+
+
+class PinnedModelPool(ModelPool):
+    """
+    线程绑定的模型池
+    
+    线程首次获取的实例绑定到该线程，之后的获取直接返回该实例，不再经过池的锁和条件变量；
+    线程退出时（其 threading.local 数据被回收）实例自动归还到池中。
+    
+    只适用于长期存活且数量不超过 max_size 的工作线程（如固定大小的线程池），
+    否则后来的线程会一直等不到实例。
+    """
+    
+    def __init__(self, *args, **kwargs):
+        self._tls = threading.local()
+        super().__init__(*args, **kwargs)
+    
+    @contextmanager
+    def acquire(self, timeout: float = 30.0):
+        """
+        获取当前线程绑定的模型实例（上下文管理器），首次调用时从池中取出并绑定
+        
+        Args:
+            timeout: 首次获取的超时时间(秒)
+            
+        Yields:
+            模型实例
+        """
+        slot = getattr(self._tls, 'slot', None)
+        if slot is None:
+            model = self._obtain(timeout)
+            slot = _PinnedSlot(model)
+            # 线程退出后 slot 被回收，回调把实例归还到池中（回调不能引用 slot 本身）
+            weakref.finalize(slot, self._return, model)
+            self._tls.slot = slot
+            logger.info(f"模型实例已绑定到线程: {threading.current_thread().name}")
+        yield slot.model
+
+
+class _BatchRequest:
+    """批处理中的单个请求"""
+    
+    __slots__ = ('item', 'key', 'done', 'result', 'error', 'started', 'cancelled')
+    
+    def __init__(self, item: Any, key: Hashable):
+        self.item = item
+        self.key = key
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        # 由调度器的锁保护：工作线程开始执行后置 started，调用方等待超时且尚未开始时置 cancelled
+        self.started = False
+        self.cancelled = False
+
+
+class BatchingDispatcher:
+    """
+    微批处理调度器
+    
+    调用方线程提交请求后阻塞等待；工作线程取到首个请求后在等待窗口内继续收集，
+    凑满 max_batch 或窗口到期即按 key 分组，每组调用一次 run_batch(items, key)，
+    再把结果按位置分发回各请求。
+    
+    请求在超时时间内未开始执行（队列积压或工作线程已退出）时取消并抛出 TimeoutError，
+    与模型池获取实例的超时一致；已开始执行的请求等待其完成
+    """
+    
+    def __init__(self,
+                 run_batch: Callable[[List[Any], Hashable], List[Any]],
+                 max_batch: int = 8,
+                 max_wait_ms: int = 20,
+                 workers: int = 1,
+                 name: str = 'Batcher',
+                 timeout: float = 60.0):
+        """
+        初始化调度器
+        
+        Args:
+            run_batch: 批处理函数，接收同一 key 的请求列表，返回按位置对应的结果列表
+            max_batch: 单批最大请求数
+            max_wait_ms: 凑批等待窗口(毫秒)
+            workers: 工作线程数（与可并行执行的批次数一致，例如模型池大小）
+            name: 线程名前缀
+            timeout: 请求等待开始执行的超时时间(秒)
+        """
+        self.run_batch = run_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self.timeout = timeout
+        self._queue: queue.Queue = queue.Queue()
+        # 保护关闭标志和请求状态：关闭后不再接受请求，等待超时的请求不会再被执行
+        self._lock = threading.Lock()
+        self._closed = False
+        self._workers = []
+        for i in range(workers):
+            worker = threading.Thread(target=self._worker_loop, daemon=True, name=f'{name}-{i}')
+            worker.start()
+            self._workers.append(worker)
+        
+        logger.info(f"批处理调度器已启动: max_batch={max_batch}, max_wait={max_wait_ms}ms, workers={workers}")
+    
+    def submit(self, item: Any, key: Hashable = '') -> Any:
+        """
+        提交请求并等待结果（批处理函数抛出的异常会在调用方线程重新抛出）
+        
+        Raises:
+            RuntimeError: 调度器已关闭
+            TimeoutError: 请求在超时时间内未开始执行
+        """
+        request = _BatchRequest(item, key)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("批处理调度器已关闭")
+            self._queue.put(request)
+        if not request.done.wait(self.timeout):
+            with self._lock:
+                if not request.started:
+                    request.cancelled = True
+                    raise TimeoutError(f"批处理请求等待超过 {self.timeout} 秒仍未执行")
+            # 已开始执行：等待本批完成
+            request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.result
+    
+    def _worker_loop(self):
+        """工作线程：收集一批请求并执行"""
+        while True:
+            first = self._queue.get()
+            if first is None:
+                break
+            
+            batch = [first]
+            stop = False
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    request = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if request is None:
+                    stop = True
+                    break
+                batch.append(request)
+            
+            groups: Dict[Hashable, List[_BatchRequest]] = {}
+            with self._lock:
+                for request in batch:
+                    # 调用方已等待超时放弃的请求不再执行
+                    if request.cancelled:
+                        continue
+                    request.started = True
+                    groups.setdefault(request.key, []).append(request)
+            for key, requests in groups.items():
+                self._dispatch(requests, key)
+            
+            if stop:
+                break
+    
+    def _dispatch(self, requests: List[_BatchRequest], key: Hashable):
+        """执行一组请求，并把结果或异常分发给各请求"""
+        try:
+            results = self.run_batch([r.item for r in requests], key)
+            for request, result in zip(requests, results):
+                request.result = result
+        except Exception as e:
+            for request in requests:
+                request.error = e
+        finally:
+            for request in requests:
+                request.done.set()
+    
+    def shutdown(self, timeout: float = 5.0):
+        """停止工作线程（已入队的请求处理完后退出，之后提交的请求直接拒绝）"""
+        with self._lock:
+            self._closed = True
+            for _ in self._workers:
+                self._queue.put(None)
+        for worker in self._workers:
+            worker.join(timeout=timeout)
+
+
 class ASRModelWrapper:
     """ASR模型包装器，用于池化管理"""
     
@@ -3,167 +3,226 @@ WebSocket连接管理器
 管理所有客户端连接，支持状态广播
 """
 
+import json
 import logging
 import asyncio
-from typing import Dict, Set, Optional
+import weakref
+from dataclasses import dataclass
+from typing import Dict, List, Set, Optional
 from fastapi import WebSocket
 
 logger = logging.getLogger(__name__)
 
+# orjson 为可选依赖：缺失时回退到标准库 json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _dumps(message: dict) -> str:
+    """序列化消息（输出格式与 WebSocket.send_json 一致）"""
+    if orjson is not None:
+        try:
+            return orjson.dumps(message).decode('utf-8')
+        except TypeError:
+            # orjson 不支持的内容（如非字符串键）交给标准库处理
+            pass
+    return json.dumps(message, separators=(",", ":"), ensure_ascii=False)
+
+
+# 最终状态：总是发送，且不会被后续更新合并掉
+_FINAL_STATUSES = frozenset(('completed', 'error', 'deleted'))
+
+
+@dataclass(slots=True)
+class _FileState:
+    """单个文件上一次发送的进度、状态和序号，用于去重"""
+    progress: int = -1
+    status: str = ""
+    seq: int = 0
+
 
 class ConnectionManager:
     """WebSocket连接管理器"""
     
     def __init__(self):
-        # 存储所有活跃的WebSocket连接
-        self.active_connections: Set[WebSocket] = set()
-        # 存储每个文件ID对应的订阅连接
+        # 存储所有活跃的WebSocket连接（弱引用：异常路径漏调 disconnect 时，连接对象被回收后自动移除）
+        self.active_connections: Set[WebSocket] = weakref.WeakSet()
+        # 存储每个文件ID对应的订阅连接（同样使用弱引用集合）
         self.file_subscriptions: Dict[str, Set[WebSocket]] = {}
-        # 存储每个文件的上一次进度值，用于去重（避免发送重复的进度更新）
-        self.last_progress: Dict[str, int] = {}  # {file_id: last_progress}
-        # 存储每个文件的上一次状态，用于去重
-        self.last_status: Dict[str, str] = {}  # {file_id: last_status}
-        
-        # ✅ 修复：添加异步锁保护去重逻辑
-        self._status_lock = asyncio.Lock()
+        # 反向索引：连接 -> 已订阅的文件ID，断开时只需处理该连接订阅过的文件
+        self._ws_to_files: Dict[WebSocket, Set[str]] = weakref.WeakKeyDictionary()
+        # 存储每个文件上一次发送的进度和状态，用于去重（避免发送重复的进度更新）
+        self._file_states: Dict[str, _FileState] = {}
         
-        # ✅ 修复：为每个文件维护独立的进度更新队列，确保顺序执行
-        self._file_queues: Dict[str, asyncio.Queue] = {}  # {file_id: Queue}
-        self._queue_tasks: Dict[str, asyncio.Task] = {}  # {file_id: Task}
-        self._queue_lock = asyncio.Lock()  # 保护队列字典的锁
+        # 状态更新由单个分发任务处理（任务和唤醒事件在首次发送时于事件循环中创建）：
+        # 进度更新按文件只保留最新一条（发送来不及时中间值被合并），最终状态单独排队，不会丢弃
+        self._pending: Dict[str, dict] = {}  # {file_id: 最新的未发送更新}
+        self._final_updates: List[dict] = []
+        # 状态更新的单调递增序号，按提交顺序分配，用于丢弃过期的更新
+        self._seq = 0
+        self._wake: Optional[asyncio.Event] = None
+        self._closing = False
+        self._dispatcher_task: Optional[asyncio.Task] = None
     
     async def connect(self, websocket: WebSocket):
         """接受新的WebSocket连接"""
         await websocket.accept()
         self.active_connections.add(websocket)
-        logger.info(f"WebSocket连接已建立，当前连接数: {len(self.active_connections)}")
+        logger.info("WebSocket连接已建立，当前连接数: %d", len(self.active_connections))
     
     def disconnect(self, websocket: WebSocket):
         """移除WebSocket连接"""
         self.active_connections.discard(websocket)
-        # 从所有文件订阅中移除
-        for file_id in list(self.file_subscriptions.keys()):
-            self.file_subscriptions[file_id].discard(websocket)
-            if not self.file_subscriptions[file_id]:
-                del self.file_subscriptions[file_id]
-        logger.info(f"WebSocket连接已断开，当前连接数: {len(self.active_connections)}")
+        # 从该连接订阅的文件中移除
+        for file_id in self._ws_to_files.pop(websocket, ()):
+            subscribers = self.file_subscriptions.get(file_id)
+            if subscribers is not None:
+                subscribers.discard(websocket)
+                if not subscribers:
+                    del self.file_subscriptions[file_id]
+        logger.info("WebSocket连接已断开，当前连接数: %d", len(self.active_connections))
     
     def subscribe_file(self, websocket: WebSocket, file_id: str):
         """订阅特定文件的状态更新"""
         if file_id not in self.file_subscriptions:
-            self.file_subscriptions[file_id] = set()
+            self.file_subscriptions[file_id] = weakref.WeakSet()
         self.file_subscriptions[file_id].add(websocket)
+        self._ws_to_files.setdefault(websocket, set()).add(file_id)
     
     async def broadcast(self, message: dict):
         """向所有连接广播消息"""
-        disconnected = set()
-        for connection in self.active_connections:
-            try:
-                await connection.send_json(message)
-            except Exception as e:
-                logger.error(f"发送消息失败: {e}")
-                disconnected.add(connection)
-        
-        # 清理断开的连接
-        for connection in disconnected:
-            self.disconnect(connection)
+        await self._send_to_connections(list(self.active_connections), message, "发送消息失败")
     
     async def send_to_file_subscribers(self, file_id: str, message: dict):
         """向订阅特定文件的连接发送消息"""
         if file_id not in self.file_subscriptions:
             return
+        await self._send_to_connections(list(self.file_subscriptions[file_id]), message, "发送文件状态失败")
+    
+    async def _send_to_connections(self, connections: list, message: dict, error_message: str):
+        """
+        并发发送到一组连接，并清理发送失败的连接
         
-        disconnected = set()
-        for connection in self.file_subscriptions[file_id]:
-            try:
-                await connection.send_json(message)
-            except Exception as e:
-                logger.error(f"发送文件状态失败: {e}")
-                disconnected.add(connection)
+        消息只序列化一次；各连接同时发送，单个慢连接不会拖慢其他连接
+        """
+        if not connections:
+            return
+        payload = _dumps(message)
+        results = await asyncio.gather(
+            *(connection.send_text(payload) for connection in connections),
+            return_exceptions=True
+        )
         
         # 清理断开的连接
-        for connection in disconnected:
-            self.disconnect(connection)
+        for connection, result in zip(connections, results):
+            if isinstance(result, Exception):
+                logger.error("%s: %s", error_message, result)
+                self.disconnect(connection)
     
-    async def _get_or_create_queue(self, file_id: str) -> asyncio.Queue:
-        """获取或创建文件对应的进度更新队列"""
-        async with self._queue_lock:
-            if file_id not in self._file_queues:
-                # 创建新队列
-                queue = asyncio.Queue()
-                self._file_queues[file_id] = queue
-                
-                # 启动队列处理任务
-                task = asyncio.create_task(self._process_file_queue(file_id, queue))
-                self._queue_tasks[file_id] = task
-                logger.debug(f"为文件 {file_id} 创建进度更新队列和处理任务")
-            
-            return self._file_queues[file_id]
+    def _ensure_dispatcher(self) -> asyncio.Event:
+        """获取唤醒事件，分发任务未运行时启动它"""
+        if self._wake is None:
+            self._wake = asyncio.Event()
+        if self._dispatcher_task is None or self._dispatcher_task.done():
+            self._closing = False
+            self._dispatcher_task = asyncio.create_task(self._dispatch_status_updates())
+        return self._wake
     
-    async def _process_file_queue(self, file_id: str, queue: asyncio.Queue):
+    async def _dispatch_status_updates(self):
         """
-        处理文件进度更新队列，确保按顺序执行
+        处理待发送的状态更新（单个消费者）
         
-        每个文件有独立的队列处理任务，保证进度更新的顺序性
+        每次被唤醒时一次性取走全部待发送更新：先发送最终状态，再发送之后到达的进度更新
+        （最终状态入队时已丢弃该文件更早的进度更新），同一文件的更新保持顺序；
+        关闭时发送完剩余更新后退出
         """
-        try:
-            while True:
-                # 从队列获取更新消息
-                update_data = await queue.get()
-                
-                # 如果收到 None，表示停止处理
-                if update_data is None:
-                    break
-                
-                # 处理进度更新
-                await self._send_file_status_internal(
-                    file_id=update_data['file_id'],
-                    status=update_data['status'],
-                    progress=update_data['progress'],
-                    message=update_data['message'],
-                    extra_data=update_data.get('extra_data')
-                )
-                
-                # 标记任务完成
-                queue.task_done()
-        
-        except asyncio.CancelledError:
-            logger.debug(f"文件 {file_id} 的队列处理任务被取消")
-        except Exception as e:
-            logger.error(f"处理文件 {file_id} 的进度更新队列时出错: {e}")
-        finally:
-            # 清理队列和任务
-            async with self._queue_lock:
-                self._file_queues.pop(file_id, None)
-                self._queue_tasks.pop(file_id, None)
-            logger.debug(f"已清理文件 {file_id} 的进度更新队列")
+        wake = self._wake
+        while True:
+            await wake.wait()
+            wake.clear()
+            
+            final_updates, self._final_updates = self._final_updates, []
+            pending, self._pending = self._pending, {}
+            
+            # 本轮的所有状态消息合并为一帧发送：每个连接每轮只写一次
+            messages = []
+            for update_data in final_updates + list(pending.values()):
+                try:
+                    data = self._build_file_status(**update_data)
+                except Exception as e:
+                    logger.error("处理文件 %s 的进度更新时出错: %s", update_data['file_id'], e)
+                    continue
+                if data is not None:
+                    messages.append(data)
+            
+            if messages:
+                try:
+                    # 单条消息保持原格式；多条消息包装为 file_status_batch 消息，不认识该类型的客户端可直接忽略
+                    if len(messages) == 1:
+                        await self.broadcast(messages[0])
+                    else:
+                        await self.broadcast({"type": "file_status_batch", "messages": messages})
+                except Exception as e:
+                    logger.error("广播文件状态更新时出错: %s", e)
+            
+            if self._closing and not self._pending and not self._final_updates:
+                break
     
     async def _send_file_status_internal(self, file_id: str, status: str, progress: int = 0, 
-                                         message: str = "", extra_data: dict = None):
+                                         message: str = "", extra_data: dict = None,
+                                         seq: Optional[int] = None):
+        """内部方法：立即发送单条文件状态更新（带去重逻辑）"""
+        data = self._build_file_status(file_id, status, progress, message, extra_data, seq)
+        if data is not None:
+            # 广播给所有连接（因为文件列表页面需要看到所有文件状态）
+            await self.broadcast(data)
+    
+    def _build_file_status(self, file_id: str, status: str, progress: int = 0,
+                           message: str = "", extra_data: dict = None,
+                           seq: Optional[int] = None) -> Optional[dict]:
         """
-        内部方法：实际发送文件状态更新（带异步锁保护的去重逻辑）
+        去重并构建文件状态消息，过期或重复的更新、以及当前没有连接时返回 None
+        
+        更新的先后由序号判断：序号不大于该文件已发送序号的更新已过期；
+        进度可以回退（如重试、多阶段处理），只有进度和状态都未变化的更新视为重复
+        
+        去重记录的读取和更新之间没有 await，在单线程事件循环中不会交错执行，无需加锁
         """
-        async with self._status_lock:
-            # 获取上一次的进度和状态
-            last_progress = self.last_progress.get(file_id, -1)
-            last_status = self.last_status.get(file_id, "")
-            
-            # 判断是否需要发送更新：
-            # 1. 进度值增加（严格大于）
-            # 2. 状态变化（completed/error 状态总是发送）
-            # 3. 完成状态总是发送
-            progress_increased = progress > last_progress
-            status_changed = status != last_status
-            is_final_status = status in ['completed', 'error', 'deleted']
-            
-            # 如果进度没有增加、状态没变化且不是最终状态，则跳过发送（去重）
-            if not progress_increased and not status_changed and not is_final_status:
-                # 忽略重复的进度更新
-                return
-            
-            # 更新记录的上一次进度和状态
-            self.last_progress[file_id] = progress
-            self.last_status[file_id] = status
+        # 获取上一次的进度和状态
+        state = self._file_states.get(file_id)
+        if state is None:
+            state = self._file_states[file_id] = _FileState()
+        
+        # 忽略比已发送更新更早提交的更新
+        if seq is not None:
+            if seq <= state.seq:
+                return None
+            state.seq = seq
+        
+        # 判断是否需要发送更新：
+        # 1. 进度值变化
+        # 2. 状态变化
+        # 3. 最终状态（completed/error/deleted）总是发送
+        is_final_status = status in _FINAL_STATUSES
+        
+        # 如果进度和状态都没变化且不是最终状态，则跳过发送（去重）
+        if progress == state.progress and status == state.status and not is_final_status:
+            # 忽略重复的进度更新
+            return None
+        
+        # 更新记录的上一次进度和状态
+        state.progress = progress
+        state.status = status
+        
+        # 如果文件已完成或出错，清理记录（释放内存）
+        if is_final_status:
+            self._file_states.pop(file_id, None)
+        
+        # 没有任何连接时只更新去重记录，不构建和发送消息
+        if not self.active_connections:
+            return None
         
         # 构建消息数据
         data = {
@@ -176,77 +235,54 @@ class ConnectionManager:
         if extra_data:
             data.update(extra_data)
         
-        # 广播给所有连接（因为文件列表页面需要看到所有文件状态）
-        await self.broadcast(data)
-        
-        # 如果文件已完成或出错，清理记录（释放内存）
-        if is_final_status:
-            async with self._status_lock:
-                self.last_progress.pop(file_id, None)
-                self.last_status.pop(file_id, None)
-            
-            # 停止队列处理任务
-            await self._stop_file_queue(file_id)
-    
-    async def _stop_file_queue(self, file_id: str):
-        """停止文件队列处理任务"""
-        async with self._queue_lock:
-            if file_id in self._file_queues:
-                queue = self._file_queues[file_id]
-                # 发送 None 信号停止处理
-                try:
-                    await queue.put(None)
-                except Exception as e:
-                    logger.error(f"停止文件 {file_id} 的队列时出错: {e}")
+        return data
     
     async def send_file_status(self, file_id: str, status: str, progress: int = 0, 
                                message: str = "", extra_data: dict = None):
         """
-        发送文件状态更新（使用队列机制确保顺序执行）
+        发送文件状态更新（由分发任务按顺序执行）
         
-        将进度更新放入文件对应的队列中，由独立的处理任务按顺序执行
-        这样可以避免多个文件同时转写时的进度更新乱序问题
+        同一文件尚未发送的进度更新只保留最新一条，客户端来不及接收时不会积压中间进度；
+        最终状态（completed/error/deleted）总是按到达顺序发送
         """
+        self._seq += 1
+        seq = self._seq
         try:
-            # 获取或创建文件对应的队列
-            queue = await self._get_or_create_queue(file_id)
-            
-            # 将更新消息放入队列
-            await queue.put({
+            wake = self._ensure_dispatcher()
+            update_data = {
                 'file_id': file_id,
                 'status': status,
                 'progress': progress,
                 'message': message,
-                'extra_data': extra_data
-            })
+                'extra_data': extra_data,
+                'seq': seq
+            }
+            if status in _FINAL_STATUSES:
+                # 最终状态覆盖该文件此前未发送的进度
+                self._pending.pop(file_id, None)
+                self._final_updates.append(update_data)
+            else:
+                self._pending[file_id] = update_data
+            wake.set()
         except Exception as e:
-            logger.error(f"将文件 {file_id} 的进度更新放入队列时出错: {e}")
-            # 如果队列机制失败，回退到直接发送（但可能丢失顺序保证）
-            await self._send_file_status_internal(file_id, status, progress, message, extra_data)
+            logger.error("将文件 %s 的进度更新放入队列时出错: %s", file_id, e)
+            # 如果分发机制失败，回退到直接发送（但可能丢失顺序保证）
+            await self._send_file_status_internal(file_id, status, progress, message, extra_data, seq)
     
     async def shutdown(self):
         """
-        关闭连接管理器，清理所有队列和任务
+        关闭连接管理器，停止状态分发任务
         
-        应在应用关闭时调用，确保所有资源正确释放
+        应在应用关闭时调用，已提交的更新会先发送完毕
         """
         logger.info("正在关闭WebSocket连接管理器...")
         
-        # 停止所有队列处理任务
-        async with self._queue_lock:
-            file_ids = list(self._file_queues.keys())
-        
-        # 停止所有队列
-        for file_id in file_ids:
-            await self._stop_file_queue(file_id)
-        
-        # 等待所有任务完成
-        async with self._queue_lock:
-            tasks = list(self._queue_tasks.values())
-        
-        if tasks:
-            # 等待所有任务完成或取消
-            await asyncio.gather(*tasks, return_exceptions=True)
+        task = self._dispatcher_task
+        if task is not None and not task.done():
+            self._closing = True
+            self._wake.set()
+            await asyncio.gather(task, return_exceptions=True)
+        self._dispatcher_task = None
         
         logger.info("WebSocket连接管理器已关闭")
 
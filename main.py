@@ -7,15 +7,15 @@
 
 import os
 import sys
+import time
+import shutil
+import asyncio
 import logging
-import subprocess
-import threading
 from pathlib import Path
 
 from fastapi import FastAPI, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, HTMLResponse
 from fastapi.exceptions import RequestValidationError
 from starlette.exceptions import HTTPException as StarletteHTTPException
 
@@ -25,34 +25,31 @@ from slowapi.errors import RateLimitExceeded
 
 # ==================== FFmpeg路径配置 ====================
 def setup_ffmpeg_path():
-    """设置FFmpeg路径"""
-    try:
-        result = subprocess.run(['which', 'ffmpeg'], capture_output=True, text=True)
-        if result.returncode == 0:
-            ffmpeg_path = result.stdout.strip()
-            print(f"✅ 找到FFmpeg: {ffmpeg_path}")
-            return True
-    except Exception:
-        pass
+    """设置FFmpeg路径（进程内查找 PATH，不启动子进程）"""
+    ffmpeg_path = shutil.which('ffmpeg')
+    if ffmpeg_path:
+        print(f"✅ 找到FFmpeg: {ffmpeg_path}")
+        return True
     
+    # PATH 中没有时，再查找常见安装位置
     common_paths = [
         '/usr/bin',
         '/usr/local/bin',
         '/opt/ffmpeg/bin'
     ]
-    
-    for path in common_paths:
-        if os.path.isfile(os.path.join(path, 'ffmpeg')):
-            print(f"✅ 找到FFmpeg: {os.path.join(path, 'ffmpeg')}")
-            os.environ['PATH'] = path + os.pathsep + os.environ.get('PATH', '')
-            return True
+    ffmpeg_path = shutil.which('ffmpeg', path=os.pathsep.join(common_paths))
+    if ffmpeg_path:
+        print(f"✅ 找到FFmpeg: {ffmpeg_path}")
+        os.environ['PATH'] = os.path.dirname(ffmpeg_path) + os.pathsep + os.environ.get('PATH', '')
+        return True
     
     print("❌ 找不到FFmpeg,请安装FFmpeg:")
     print("  Ubuntu/Debian: sudo apt install ffmpeg")
     return False
 
-# 设置FFmpeg
-if not setup_ffmpeg_path():
+# 设置FFmpeg（结果缓存供健康检查使用：运行期间可执行文件不会出现或消失）
+FFMPEG_AVAILABLE = setup_ffmpeg_path()
+if not FFMPEG_AVAILABLE:
     print("⚠️  FFmpeg未找到,音频处理功能可能受限")
 
 # ==================== 禁用FunASR表单打印 ====================
@@ -132,85 +129,78 @@ def get_pipeline_service():
     return pipeline_service
 
 # ==================== 配置静态文件和模板 ====================
-if os.path.exists("static"):
+# 一次 scandir 取得工作目录下的子目录，代替逐个 os.path.exists 探测
+with os.scandir(".") as _entries:
+    _CWD_DIRS = {entry.name for entry in _entries if entry.is_dir()}
+
+if "static" in _CWD_DIRS:
     app.mount("/static", StaticFiles(directory="static"), name="static")
 
-if os.path.exists("uploads"):
+if "uploads" in _CWD_DIRS:
     app.mount("/uploads", StaticFiles(directory=FILE_CONFIG['upload_dir']), name="uploads")
 
-if os.path.exists("templates"):
-    templates = Jinja2Templates(directory="templates")
+def _load_page(name: str):
+    """读取页面文件（页面不含模板语法，启动时读取一次，请求时直接返回），不存在时返回 None"""
+    try:
+        with open(os.path.join("templates", name), "rb") as f:
+            return f.read()
+    except OSError:
+        return None
+
+_INDEX_HTML = _load_page("index.html")
+_RESULT_HTML = _load_page("result.html")
 
 # ==================== 添加监控中间件 ====================
+# 监控模块只在启动时导入一次（不可用时中间件跳过监控）
+try:
+    from infra.monitoring import prometheus_metrics, metrics_collector
+    MONITORING_AVAILABLE = True
+except ImportError:
+    prometheus_metrics = None
+    metrics_collector = None
+    MONITORING_AVAILABLE = False
+
+
+def _record_request_metrics(request: Request, status_code: int, duration: float):
+    """记录请求指标（监控失败不影响请求处理）"""
+    try:
+        endpoint = request.url.path
+        method = request.method
+        prometheus_metrics.record_http_request(endpoint, method, status_code, duration)
+        metrics_collector.record_request(endpoint, method, status_code, duration)
+    except Exception:
+        pass
+
+
 @app.middleware("http")
 async def metrics_middleware(request: Request, call_next):
     """HTTP 请求指标收集中间件"""
-    import time
-    
-    # 尝试导入监控模块（如果不可用则跳过监控）
-    try:
-        from infra.monitoring import prometheus_metrics, metrics_collector
-        monitoring_available = True
-    except ImportError:
-        monitoring_available = False
-        prometheus_metrics = None
-        metrics_collector = None
+    if not MONITORING_AVAILABLE:
+        return await call_next(request)
     
     # 记录开始时间
     start_time = time.time()
     
     # 增加活跃请求数
-    if monitoring_available:
-        try:
-            prometheus_metrics.increment_active_requests()
-            metrics_collector.increment_active_requests()
-        except Exception:
-            pass  # 监控失败不影响请求处理
+    try:
+        prometheus_metrics.increment_active_requests()
+        metrics_collector.increment_active_requests()
+    except Exception:
+        pass  # 监控失败不影响请求处理
     
+    status_code = 500  # 处理过程中抛出异常时记为错误请求
     try:
-        # 处理请求
         response = await call_next(request)
-        
-        # 计算耗时
-        duration = time.time() - start_time
-        
-        # 记录指标
-        if monitoring_available:
-            try:
-                # 获取端点和方法
-                endpoint = request.url.path
-                method = request.method
-                status_code = response.status_code
-                
-                prometheus_metrics.record_http_request(endpoint, method, status_code, duration)
-                metrics_collector.record_request(endpoint, method, status_code, duration)
-            except Exception:
-                pass  # 监控失败不影响请求处理
-        
+        status_code = response.status_code
         return response
-    except Exception as e:
-        # 计算耗时
-        duration = time.time() - start_time
-        
-        # 记录错误请求
-        if monitoring_available:
-            try:
-                endpoint = request.url.path
-                method = request.method
-                prometheus_metrics.record_http_request(endpoint, method, 500, duration)
-                metrics_collector.record_request(endpoint, method, 500, duration)
-            except Exception:
-                pass  # 监控失败不影响错误处理
-        
-        raise
     finally:
+        _record_request_metrics(request, status_code, time.time() - start_time)
         # 减少活跃请求数
-        if monitoring_available:
-            try:
-                prometheus_metrics.decrement_active_requests()
-                metrics_collector.decrement_active_requests()
-            except Exception:
-                pass  # 监控失败不影响清理
+        try:
+            prometheus_metrics.decrement_active_requests()
+            metrics_collector.decrement_active_requests()
+        except Exception:
+            pass  # 监控失败不影响清理
 
 # ==================== 注册路由 ====================
 # 初始化语音网关
@@ -223,28 +213,89 @@ app.include_router(voice_gateway.router)
 @app.get("/")
 async def index(request: Request):
     """主页面"""
-    if os.path.exists("templates/index.html"):
-        return templates.TemplateResponse("index.html", {"request": request})
+    if _INDEX_HTML is not None:
+        return HTMLResponse(_INDEX_HTML)
     return {"message": "音频转写系统API", "version": "3.1.5-FunASR", "docs": "/docs"}
 
 @app.get("/result.html")
 async def result_page(request: Request):
     """结果查看页面"""
-    from fastapi.responses import FileResponse
-    if os.path.exists("templates/result.html"):
-        return templates.TemplateResponse("result.html", {"request": request})
+    if _RESULT_HTML is not None:
+        return HTMLResponse(_RESULT_HTML)
     return JSONResponse({"message": "结果页面", "hint": "请从主页面访问"})
 
+# ==================== 健康检查辅助函数 ====================
+def _probe_dir(dir_path: str) -> tuple:
+    """
+    检查目录是否存在、可写及磁盘空间（同步文件系统操作，在线程池中调用）
+    
+    Returns:
+        tuple: (检查结果, 是否健康)
+    """
+    try:
+        path = Path(dir_path)
+        if not path.exists():
+            return {'exists': False, 'status': 'error'}, False
+        
+        # 检查目录可写性
+        test_file = path / '.health_check'
+        try:
+            test_file.touch()
+            test_file.unlink()
+            writable = True
+        except:
+            writable = False
+        
+        # 获取磁盘使用情况
+        disk_usage = shutil.disk_usage(path)
+        total_gb = disk_usage.total / (1024**3)
+        free_gb = disk_usage.free / (1024**3)
+        used_percent = (disk_usage.used / disk_usage.total) * 100
+        
+        check = {
+            'exists': True,
+            'writable': writable,
+            'total_gb': round(total_gb, 2),
+            'free_gb': round(free_gb, 2),
+            'used_percent': round(used_percent, 2),
+            'status': 'healthy' if writable and free_gb > 1.0 else 'warning'
+        }
+        return check, writable and free_gb >= 1.0
+    except Exception as e:
+        return {'status': 'error', 'error': str(e)}, False
+
+
+# ==================== 系统资源采样（健康检查用） ====================
+# psutil 为可选依赖：缺失时健康检查的系统资源项报告错误
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+_SYSTEM_SAMPLE_TTL = 1.0  # 采样缓存时间(秒)，频繁的健康探测共用同一次采样
+_system_sample = {'t': 0.0, 'cpu': 0.0, 'memory': None}
+
+if psutil is not None:
+    # 预热：interval=None 返回与上次调用之间的 CPU 占用，首次调用结果无意义
+    psutil.cpu_percent(interval=None)
+
+
+def _get_system_sample():
+    """获取 (CPU占用, 内存信息)，不阻塞事件循环（interval=None），结果缓存 _SYSTEM_SAMPLE_TTL 秒"""
+    now = time.monotonic()
+    if _system_sample['memory'] is None or now - _system_sample['t'] > _SYSTEM_SAMPLE_TTL:
+        _system_sample['cpu'] = psutil.cpu_percent(interval=None)
+        _system_sample['memory'] = psutil.virtual_memory()
+        _system_sample['t'] = now
+    return _system_sample['cpu'], _system_sample['memory']
+
+
 @app.get("/healthz")
 async def health_check():
     """
     详细健康检查端点
     检查：模型加载状态、存储空间、依赖服务
     """
-    import shutil
-    import psutil
-    from pathlib import Path
-    
     health_status = {
         'status': 'healthy',
         'version': '3.1.5-FunASR',
@@ -286,57 +337,21 @@ async def health_check():
         }
         overall_healthy = False
     
-    # 2. 检查存储空间
+    # 2. 检查存储空间（文件系统操作在线程池中并发执行，慢磁盘/网络存储不会阻塞事件循环）
     try:
         from config import FILE_CONFIG
-        storage_checks = {}
-        
-        for dir_name, dir_path in [
+        storage_dirs = [
             ('uploads', FILE_CONFIG.get('upload_dir', 'uploads')),
             ('transcripts', FILE_CONFIG.get('output_dir', 'transcripts')),
             ('temp', FILE_CONFIG.get('temp_dir', 'audio_temp')),
             ('summaries', FILE_CONFIG.get('summary_dir', 'meeting_summaries'))
-        ]:
-            try:
-                path = Path(dir_path)
-                if path.exists():
-                    # 检查目录可写性
-                    test_file = path / '.health_check'
-                    try:
-                        test_file.touch()
-                        test_file.unlink()
-                        writable = True
-                    except:
-                        writable = False
-                    
-                    # 获取磁盘使用情况
-                    disk_usage = shutil.disk_usage(path)
-                    total_gb = disk_usage.total / (1024**3)
-                    free_gb = disk_usage.free / (1024**3)
-                    used_percent = (disk_usage.used / disk_usage.total) * 100
-                    
-                    storage_checks[dir_name] = {
-                        'exists': True,
-                        'writable': writable,
-                        'total_gb': round(total_gb, 2),
-                        'free_gb': round(free_gb, 2),
-                        'used_percent': round(used_percent, 2),
-                        'status': 'healthy' if writable and free_gb > 1.0 else 'warning'
-                    }
-                    
-                    if not writable or free_gb < 1.0:
-                        overall_healthy = False
-                else:
-                    storage_checks[dir_name] = {
-                        'exists': False,
-                        'status': 'error'
-                    }
-                    overall_healthy = False
-            except Exception as e:
-                storage_checks[dir_name] = {
-                    'status': 'error',
-                    'error': str(e)
-                }
+        ]
+        results = await asyncio.gather(*(asyncio.to_thread(_probe_dir, dir_path) for _, dir_path in storage_dirs))
+        
+        storage_checks = {}
+        for (dir_name, _), (check, healthy) in zip(storage_dirs, results):
+            storage_checks[dir_name] = check
+            if not healthy:
                 overall_healthy = False
         
         health_status['checks']['storage'] = storage_checks
@@ -349,8 +364,7 @@ async def health_check():
     
     # 3. 检查系统资源
     try:
-        memory = psutil.virtual_memory()
-        cpu_percent = psutil.cpu_percent(interval=0.1)
+        cpu_percent, memory = _get_system_sample()
         
         health_status['checks']['system'] = {
             'cpu_percent': round(cpu_percent, 2),
@@ -370,23 +384,23 @@ async def health_check():
     # 4. 检查依赖服务（Dify Webhook - 可选服务）
     try:
         from config import DIFY_CONFIG
-        import requests
 
         if DIFY_CONFIG.get('base_url') and DIFY_CONFIG.get('api_key'):
-            if requests:
-                try:
-                    # 简单连接测试（不发送实际请求）
-                    base_url = DIFY_CONFIG['base_url']
-                    response = requests.get(
-                        f"{base_url}/health" if not base_url.endswith('/health') else base_url,
-                        timeout=3
-                    )
-                    dify_available = response.status_code < 500
-                except:
-                    # 如果健康检查端点不存在，至少检查配置是否完整
-                    dify_available = bool(DIFY_CONFIG.get('api_key'))
-            else:
-                # requests 不可用，仅检查配置
+            try:
+                # 简单连接测试（不发送实际请求）
+                base_url = DIFY_CONFIG['base_url']
+                url = f"{base_url}/health" if not base_url.endswith('/health') else base_url
+                from infra.monitoring._http import get_async_client, get_session
+                client = get_async_client()
+                if client is not None:
+                    # 复用长连接的异步客户端，探测期间不阻塞事件循环
+                    response = await client.get(url)
+                else:
+                    # httpx 不可用时在线程池中使用同步 Session
+                    response = await asyncio.to_thread(get_session().get, url, timeout=3)
+                dify_available = response.status_code < 500
+            except:
+                # 如果健康检查端点不存在，至少检查配置是否完整
                 dify_available = bool(DIFY_CONFIG.get('api_key'))
 
             health_status['checks']['dify'] = {
@@ -411,24 +425,12 @@ async def health_check():
             'message': 'Dify is optional - service will work without it'
         }
     
-    # 5. 检查 FFmpeg
-    try:
-        result = subprocess.run(['ffmpeg', '-version'], 
-                              capture_output=True, 
-                              timeout=2)
-        ffmpeg_available = result.returncode == 0
-        health_status['checks']['ffmpeg'] = {
-            'available': ffmpeg_available,
-            'status': 'healthy' if ffmpeg_available else 'error'
-        }
-        if not ffmpeg_available:
-            overall_healthy = False
-    except Exception as e:
-        health_status['checks']['ffmpeg'] = {
-            'available': False,
-            'status': 'error',
-            'error': str(e)
-        }
+    # 5. 检查 FFmpeg（启动时已确定）
+    health_status['checks']['ffmpeg'] = {
+        'available': FFMPEG_AVAILABLE,
+        'status': 'healthy' if FFMPEG_AVAILABLE else 'error'
+    }
+    if not FFMPEG_AVAILABLE:
         overall_healthy = False
     
     # 设置总体状态
@@ -494,26 +496,18 @@ async def get_metrics():
             'message': str(e)
         }
 
+_PROMETHEUS_MEDIA_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
 @app.get("/metrics")
-async def get_prometheus_metrics():
-    """Prometheus 指标端点（标准格式）"""
+async def get_prometheus_metrics(request: Request):
+    """Prometheus 指标端点（标准格式，导出结果由 prometheus_metrics 按 TTL 缓存，支持 ETag 条件请求）"""
     from fastapi.responses import Response
-    from infra.monitoring import prometheus_metrics
-    import psutil
     
     try:
-        # 更新系统指标
-        cpu_percent = psutil.cpu_percent(interval=0.1)
-        memory = psutil.virtual_memory()
-        prometheus_metrics.update_system_metrics(
-            cpu_percent=cpu_percent,
-            memory_percent=memory.percent,
-            memory_used_mb=memory.used / (1024 * 1024),
-            threads=threading.active_count()
-        )
+        # 系统指标由 prometheus_metrics 后台线程定期采样，这里不再阻塞采样 CPU
         
         # 更新模型池指标
-        global asr_runner
         if asr_runner:
             pool_stats = asr_runner.get_pool_stats()
             if pool_stats:
@@ -522,9 +516,13 @@ async def get_prometheus_metrics():
                     available=pool_stats.get('available_count', 0)
                 )
         
-        # 导出 Prometheus 格式
-        metrics_text = prometheus_metrics.export_prometheus_format()
-        return Response(content=metrics_text, media_type="text/plain; version=0.0.4")
+        # 导出 Prometheus 格式（缓存期内复用同一份字节和 ETag）
+        body, etag = prometheus_metrics.export_prometheus_payload()
+        
+        headers = {'ETag': etag, 'Cache-Control': 'max-age=1'}
+        if request.headers.get('if-none-match') == etag:
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type=_PROMETHEUS_MEDIA_TYPE, headers=headers)
     except Exception as e:
         logger.error(f"导出 Prometheus 指标失败: {e}")
         return Response(content=f"# Error: {e}\n", media_type="text/plain")
@@ -548,7 +546,6 @@ async def validation_exception_handler(request: Request, exc: RequestValidationE
 @app.on_event("startup")
 async def startup_event():
     """应用启动"""
-    import asyncio
     from api.routers import voice_gateway
     
     logger.info("=" * 60)
@@ -588,6 +585,13 @@ async def shutdown_event():
     except Exception as e:
         logger.error(f"关闭WebSocket连接管理器失败: {e}")
     
+    # 关闭监控模块共享的异步HTTP客户端（健康检查探测、Dify 事件发送）
+    try:
+        from infra.monitoring._http import close_async_client
+        await close_async_client()
+    except Exception as e:
+        logger.error(f"关闭HTTP客户端失败: {e}")
+    
     # 关闭模型池
     global asr_runner
     try:
@@ -620,11 +624,21 @@ def main():
     print("📚 ReDoc文档: http://localhost:8998/redoc")
     print("=" * 60 + "\n")
     
+    # uvloop 事件循环和 httptools 解析器为可选依赖（已列入 requirements），缺失时回退到 asyncio/h11
+    import importlib.util
+    loop_impl = "uvloop" if importlib.util.find_spec("uvloop") else "asyncio"
+    http_impl = "httptools" if importlib.util.find_spec("httptools") else "h11"
+    print(f"⚙️  事件循环: {loop_impl}, HTTP解析器: {http_impl}")
+    
     try:
+        # 单进程运行：WebSocket连接管理器（ws_manager）和模型池都是进程内状态，不能开多个 worker
         uvicorn.run(
             app,
             host='0.0.0.0',
             port=8998,
+            loop=loop_impl,
+            http=http_impl,
+            workers=1,
             log_level="info",
             access_log=True,
             timeout_keep_alive=30,  # Keep-alive连接超时30秒
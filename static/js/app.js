@@ -124,7 +124,12 @@ class TranscriptionApp {
                 try {
                     const data = JSON.parse(event.data);
                     console.log('📨 收到WebSocket消息:', data);
-                    this.handleWebSocketMessage(data);
+                    // 服务端会把同一轮的多条状态更新合并为一条 file_status_batch 消息发送
+                    if (data.type === 'file_status_batch') {
+                        data.messages.forEach(item => this.handleWebSocketMessage(item));
+                    } else {
+                        this.handleWebSocketMessage(data);
+                    }
                 } catch (error) {
                     console.error('解析WebSocket消息失败:', error);
                 }
@@ -0,0 +1,41 @@
+import unittest
+
+try:
+    from infra.runners.asr_runner_funasr import _cut, _interpolation_plan
+except ImportError:
+    # torch / funasr 未安装时跳过
+    _cut = None
+
+
+@unittest.skipIf(_cut is None, "未安装 torch 或 funasr")
+class TestCut(unittest.TestCase):
+    def test_words_join_back_to_text(self):
+        texts = [
+            "Hello world, this is fine.",
+            "The price is 12.50 dollars!  Really?",
+            "a\tb\n c!!",
+            "你好，世界。",
+            "今天hello世界ok吗",
+            "我们今天讨论一下项目的进度安排，大家有什么意见吗？",
+            "这个 API 的 QPS 是 3000，OK.",
+        ]
+        for text in texts:
+            with self.subTest(text=text):
+                words = _cut(text)
+                self.assertEqual("".join(words), text)
+                self.assertNotIn("", words)
+
+    def test_ascii_keeps_spaces_and_punctuation(self):
+        self.assertEqual(
+            _cut("Hello world, this is fine."),
+            ("Hello", " ", "world", ",", " ", "this", " ", "is", " ", "fine", "."),
+        )
+
+    def test_interpolation_plan_splits_english_clauses(self):
+        _, _, clauses = _interpolation_plan("It works. Does it? Yes!")
+        self.assertEqual(len(clauses), 3)
+        self.assertEqual(clauses[0][0][-1], ".")
+
+
+if __name__ == "__main__":
+    unittest.main()
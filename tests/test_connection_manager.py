@@ -0,0 +1,103 @@
+import asyncio
+import json
+import unittest
+
+from infra.websocket.connection_manager import ConnectionManager
+
+
+class _FakeWebSocket:
+    """记录收到的每一帧（已解析的 JSON）"""
+
+    def __init__(self):
+        self.frames = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, payload):
+        self.frames.append(json.loads(payload))
+
+    def messages(self):
+        """把批量消息展开为单条消息列表"""
+        messages = []
+        for frame in self.frames:
+            if frame.get("type") == "file_status_batch":
+                messages.extend(frame["messages"])
+            else:
+                messages.append(frame)
+        return messages
+
+
+class TestConnectionManager(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.manager = ConnectionManager()
+        self.ws = _FakeWebSocket()
+        await self.manager.connect(self.ws)
+
+    async def asyncTearDown(self):
+        await self.manager.shutdown()
+
+    def _statuses(self):
+        return [(m["file_id"], m["status"], m["progress"]) for m in self.ws.messages()]
+
+    async def test_final_status_drops_pending_progress(self):
+        # 同一轮内提交（中间没有让出事件循环），最终状态覆盖该文件尚未发送的进度
+        await self.manager.send_file_status("a", "processing", 10)
+        await self.manager.send_file_status("a", "processing", 20)
+        await self.manager.send_file_status("a", "completed", 100)
+        await self.manager.shutdown()
+        self.assertEqual(self._statuses(), [("a", "completed", 100)])
+        self.assertEqual(len(self.ws.frames), 1)
+        self.assertEqual(self.ws.frames[0]["type"], "file_status")
+
+    async def test_progress_keeps_only_latest_per_file(self):
+        await self.manager.send_file_status("a", "processing", 10)
+        await self.manager.send_file_status("a", "processing", 20)
+        await self.manager.shutdown()
+        self.assertEqual(self._statuses(), [("a", "processing", 20)])
+
+    async def test_final_updates_sent_before_progress_in_same_round(self):
+        await self.manager.send_file_status("b", "processing", 30)
+        await self.manager.send_file_status("a", "completed", 100)
+        await self.manager.shutdown()
+        # 同一轮的多条消息合并为一帧 file_status_batch
+        self.assertEqual(len(self.ws.frames), 1)
+        self.assertEqual(self.ws.frames[0]["type"], "file_status_batch")
+        self.assertEqual(self._statuses(), [("a", "completed", 100), ("b", "processing", 30)])
+
+    async def test_stale_updates_are_dropped_by_seq(self):
+        self.assertIsNotNone(self.manager._build_file_status("a", "processing", 50, seq=5))
+        self.assertIsNone(self.manager._build_file_status("a", "processing", 60, seq=3))
+        self.assertIsNone(self.manager._build_file_status("a", "processing", 70, seq=5))
+        self.assertIsNotNone(self.manager._build_file_status("a", "processing", 70, seq=6))
+
+    async def test_duplicate_dropped_and_progress_may_go_back(self):
+        self.assertIsNotNone(self.manager._build_file_status("a", "processing", 50, seq=1))
+        self.assertIsNone(self.manager._build_file_status("a", "processing", 50, seq=2))
+        # 重试或多阶段处理时进度可以回退
+        self.assertIsNotNone(self.manager._build_file_status("a", "processing", 0, seq=3))
+
+    async def test_shutdown_drains_pending_updates(self):
+        for i, file_id in enumerate(("a", "b", "c")):
+            await self.manager.send_file_status(file_id, "processing", 10 * (i + 1))
+        await self.manager.send_file_status("d", "error", 0, "失败")
+        task = self.manager._dispatcher_task
+        await self.manager.shutdown()
+        self.assertTrue(task.done())
+        self.assertEqual(
+            sorted(self._statuses()),
+            [("a", "processing", 10), ("b", "processing", 20), ("c", "processing", 30), ("d", "error", 0)],
+        )
+
+    async def test_updates_across_rounds_keep_order(self):
+        await self.manager.send_file_status("a", "processing", 10)
+        # 让出事件循环，分发任务先发送第一轮
+        for _ in range(3):
+            await asyncio.sleep(0)
+        await self.manager.send_file_status("a", "processing", 20)
+        await self.manager.shutdown()
+        self.assertEqual(self._statuses(), [("a", "processing", 10), ("a", "processing", 20)])
+
+
+if __name__ == "__main__":
+    unittest.main()
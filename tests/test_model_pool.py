@@ -0,0 +1,212 @@
+import queue
+import threading
+import time
+import unittest
+
+from infra.runners.model_pool import BatchingDispatcher, ModelPool
+
+
+class _FakeModel:
+    def __init__(self, index):
+        self.index = index
+        self.cleaned = False
+
+    def cleanup(self):
+        self.cleaned = True
+
+
+def _make_pool(factory=None, **kwargs):
+    """创建测试用模型池（健康检查间隔足够长，测试中手动触发）"""
+    created = []
+
+    def default_factory():
+        model = _FakeModel(len(created))
+        created.append(model)
+        return model
+
+    options = {"initial_size": 1, "max_size": 3, "min_size": 1, "max_idle_time": 600, "health_check_interval": 3600}
+    options.update(kwargs)
+    pool = ModelPool(model_factory=factory or default_factory, **options)
+    return pool, created
+
+
+def _submit_all(dispatcher, items):
+    """并发提交 (item, key)，按提交顺序返回结果或异常"""
+    results = [None] * len(items)
+
+    def submit(i, item, key):
+        try:
+            results[i] = dispatcher.submit(item, key)
+        except Exception as e:
+            results[i] = e
+
+    threads = [threading.Thread(target=submit, args=(i, item, key)) for i, (item, key) in enumerate(items)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(5)
+    return results
+
+
+class TestModelPool(unittest.TestCase):
+    def test_acquire_reuses_returned_instance(self):
+        pool, created = _make_pool()
+        with pool.acquire(timeout=1) as model:
+            first = model
+        with pool.acquire(timeout=1) as model:
+            self.assertIs(model, first)
+        self.assertEqual(len(created), 1)
+        stats = pool.get_stats()
+        self.assertEqual(stats["total_acquired"], 2)
+        self.assertEqual(stats["active_count"], 0)
+
+    def test_grows_on_demand_up_to_max_size(self):
+        pool, created = _make_pool(max_size=2)
+        with pool.acquire(timeout=1) as a, pool.acquire(timeout=1) as b:
+            self.assertIsNot(a, b)
+            self.assertEqual(pool.current_size, 2)
+            with self.assertRaises(queue.Empty):
+                with pool.acquire(timeout=0.05):
+                    pass
+        self.assertEqual(len(created), 2)
+
+    def test_waiter_gets_returned_instance(self):
+        pool, _ = _make_pool(max_size=1)
+        holder = pool.acquire(timeout=1)
+        model = holder.__enter__()
+        threading.Timer(0.05, holder.__exit__, (None, None, None)).start()
+        with pool.acquire(timeout=1) as waited:
+            self.assertIs(waited, model)
+
+    def test_concurrent_creation_does_not_block_waiters(self):
+        # 加载较慢的实例创建期间，其他请求应能拿到先归还的实例，而不是等待创建完成
+        def slow_factory():
+            time.sleep(0.3)
+            return _FakeModel(0)
+
+        pool, _ = _make_pool(factory=slow_factory, initial_size=1, max_size=2)
+        holder = pool.acquire(timeout=1)
+        holder.__enter__()
+        creator = threading.Thread(target=lambda: pool.acquire(timeout=1).__enter__())
+        creator.start()
+        time.sleep(0.05)
+        threading.Timer(0.05, holder.__exit__, (None, None, None)).start()
+        start = time.monotonic()
+        with pool.acquire(timeout=1):
+            elapsed = time.monotonic() - start
+        creator.join()
+        self.assertLess(elapsed, 0.25)
+
+    def test_factory_failure_releases_reserved_slot(self):
+        def failing_factory():
+            raise ValueError("load failed")
+
+        pool, _ = _make_pool(factory=failing_factory, initial_size=0, min_size=0, max_size=2)
+        with self.assertRaises(ValueError):
+            pool._create_model()
+        self.assertEqual(pool.current_size, 0)
+
+    def test_backfill_to_min_size(self):
+        pool, created = _make_pool(initial_size=1, min_size=3, max_size=3)
+        deadline = time.monotonic() + 2
+        while pool.current_size < 3 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(pool.current_size, 3)
+        self.assertEqual(pool.get_stats()["available_count"], 3)
+
+    def test_health_check_reclaims_idle_instances_above_min_size(self):
+        pool, created = _make_pool(initial_size=3, min_size=1, max_size=3, max_idle_time=0)
+        self.assertEqual(pool.current_size, 3)
+        with pool.acquire(timeout=1) as in_use:
+            time.sleep(0.01)
+            pool._perform_health_check()
+            # 使用中的实例不会被回收，空闲实例只回收到最小池大小
+            self.assertEqual(pool.current_size, 1)
+        self.assertFalse(in_use.cleaned)
+        self.assertEqual(sum(m.cleaned for m in created), 2)
+
+    def test_health_check_keeps_recently_used_instances(self):
+        pool, created = _make_pool(initial_size=3, min_size=1, max_size=3, max_idle_time=600)
+        pool._perform_health_check()
+        self.assertEqual(pool.current_size, 3)
+        self.assertFalse(any(m.cleaned for m in created))
+
+    def test_shutdown_destroys_available_instances(self):
+        pool, created = _make_pool(initial_size=2)
+        pool.shutdown()
+        self.assertEqual(pool.current_size, 0)
+        self.assertTrue(all(m.cleaned for m in created))
+
+
+class TestBatchingDispatcher(unittest.TestCase):
+    def _dispatcher(self, run_batch, **kwargs):
+        options = {"max_batch": 4, "max_wait_ms": 200, "workers": 1}
+        options.update(kwargs)
+        dispatcher = BatchingDispatcher(run_batch=run_batch, **options)
+        self.addCleanup(dispatcher.shutdown)
+        return dispatcher
+
+    def test_groups_requests_by_key(self):
+        calls = []
+
+        def run_batch(items, key):
+            calls.append((key, sorted(items)))
+            return [f"{key}:{item}" for item in items]
+
+        dispatcher = self._dispatcher(run_batch)
+        results = _submit_all(dispatcher, [(1, "a"), (2, "b"), (3, "a"), (4, "b")])
+        self.assertEqual(results, ["a:1", "b:2", "a:3", "b:4"])
+        self.assertEqual(sorted(calls), [("a", [1, 3]), ("b", [2, 4])])
+
+    def test_error_is_raised_in_every_request_of_the_batch(self):
+        def run_batch(items, key):
+            raise ValueError("batch failed")
+
+        dispatcher = self._dispatcher(run_batch)
+        results = _submit_all(dispatcher, [(1, ""), (2, ""), (3, "")])
+        for result in results:
+            self.assertIsInstance(result, ValueError)
+
+    def test_missing_results_are_none(self):
+        dispatcher = self._dispatcher(lambda items, key: ["first"], max_wait_ms=100)
+        results = _submit_all(dispatcher, [(1, ""), (2, "")])
+        self.assertEqual(results.count("first"), 1)
+        self.assertEqual(results.count(None), 1)
+
+    def test_submit_after_shutdown_is_rejected(self):
+        dispatcher = self._dispatcher(lambda items, key: items)
+        self.assertEqual(dispatcher.submit(1), 1)
+        dispatcher.shutdown()
+        with self.assertRaises(RuntimeError):
+            dispatcher.submit(2)
+
+    def test_request_not_started_in_time_is_cancelled(self):
+        calls = []
+
+        def run_batch(items, key):
+            calls.append(list(items))
+            time.sleep(0.3)
+            return items
+
+        dispatcher = self._dispatcher(run_batch, max_batch=1, max_wait_ms=0, timeout=0.1)
+        first = threading.Thread(target=dispatcher.submit, args=(1,))
+        first.start()
+        time.sleep(0.05)
+        with self.assertRaises(TimeoutError):
+            dispatcher.submit(2)
+        first.join()
+        time.sleep(0.1)
+        # 已取消的请求不会再被执行
+        self.assertEqual(calls, [[1]])
+
+    def test_started_request_waits_past_timeout(self):
+        def run_batch(items, key):
+            time.sleep(0.2)
+            return items
+
+        dispatcher = self._dispatcher(run_batch, max_wait_ms=0, timeout=0.05)
+        self.assertEqual(dispatcher.submit(7), 7)
+
+
+if __name__ == "__main__":
+    unittest.main()
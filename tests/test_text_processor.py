@@ -1,11 +1,26 @@
+import re
 import unittest
+from unittest import mock
 
+from domain.voice import text_processor
 from domain.voice.text_processor import TextProcessor
 
+# (文本, 词表, 匹配模式, 处理方式, 期望输出, 是否命中)：有无 pyahocorasick 时结果必须一致
+PROFANITY_CASES = [
+    ("你这个坏词，坏词啊", ["坏词"], "substring", "mask", "你这个**，**啊", True),
+    ("说 坏词 了，x坏词y bad坏词 坏词2", ["坏词"], "word", "replace", "说 [X] 了，x坏词y bad坏词 坏词2", True),
+    ("ass class bad_ass Ass", ["ass"], "word", "mask", "*** class bad_ass ***", True),
+    ("N M S L 和 nmsl 以及 wsnd", [r"/n\s*m\s*s\s*l/i", "/WSND/i"], "substring", "replace", "[X] 和 [X] 以及 [X]", True),
+    ("你妈的你妈", ["你妈的", "妈的你", "你妈"], "substring", "mask", "*****", True),
+    ("坏蛋词语", ["坏蛋", "蛋词", "/词./"], "substring", "mask", "****", True),
+    ("这句话没有问题", ["坏词", r"/n\s*m/i"], "substring", "mask", "这句话没有问题", False),
+]
+
 
 class TestTextProcessor(unittest.TestCase):
-    def setUp(self):
-        self.tp = TextProcessor()
+    @classmethod
+    def setUpClass(cls):
+        cls.tp = TextProcessor()
 
     def test_remove_chinese_phrase_repetition(self):
         text = "嗯，这是这是第二个。"
@@ -100,6 +115,158 @@ class TestTextProcessor(unittest.TestCase):
         self.assertTrue(self.tp.is_tail_only_change("你好", "你好。"))
         self.assertFalse(self.tp.is_tail_only_change("这是这是第二个。", "这是第二个。"))
 
+    def _check_profanity_cases(self):
+        for text, words, match_mode, action, expected, expected_hit in PROFANITY_CASES:
+            with self.subTest(text=text, words=words, match_mode=match_mode):
+                processed, hit = self.tp._filter_profanity(
+                    text,
+                    profanity_words=words,
+                    action=action,
+                    mask_char="*",
+                    replacement="[X]",
+                    match_mode=match_mode,
+                )
+                self.assertEqual(processed, expected)
+                self.assertEqual(hit, expected_hit)
+
+                # 字级 words 打码后拼接结果与整句打码一致
+                if action == "mask":
+                    char_words = [{"text": t, "start": 0.0, "end": 0.0} for t in text]
+                    new_words, hit = self.tp.filter_profanity_in_words(
+                        char_words, profanity_words=words, action="mask", mask_char="*", match_mode=match_mode
+                    )
+                    self.assertEqual("".join(w["text"] for w in new_words), expected)
+                    self.assertEqual(hit, expected_hit)
+
+    @unittest.skipIf(text_processor.ahocorasick is None, "未安装 pyahocorasick")
+    def test_profanity_with_ahocorasick(self):
+        self._check_profanity_cases()
+
+    def test_profanity_without_ahocorasick(self):
+        with mock.patch.object(text_processor, "ahocorasick", None):
+            self._check_profanity_cases()
+
+    def _filter_with_engine(self, text, words, match_mode, action, regex_engine):
+        return self.tp._filter_profanity(
+            text,
+            profanity_words=words,
+            action=action,
+            mask_char="*",
+            replacement="[X]",
+            match_mode=match_mode,
+            regex_engine=regex_engine,
+        )
+
+    def test_profanity_re2_engine_without_re2(self):
+        # 编译结果按 use_re2 缓存，清空缓存保证本用例在 re2 缺失的条件下重新编译
+        text_processor._compile_profanity.cache_clear()
+        self.addCleanup(text_processor._compile_profanity.cache_clear)
+        with mock.patch.object(text_processor, "re2", None):
+            for text, words, match_mode, action, _, _ in PROFANITY_CASES:
+                with self.subTest(text=text, words=words):
+                    self.assertEqual(
+                        self._filter_with_engine(text, words, match_mode, action, "re2"),
+                        self._filter_with_engine(text, words, match_mode, action, "re"),
+                    )
+
+    def test_profanity_re2_keeps_unsupported_rules_on_re(self):
+        def fake_compile(pattern):
+            # 模拟 RE2 拒绝环视语法；其余正则返回占位对象，误用时下面的类型断言会失败
+            if "(?=" in pattern:
+                raise ValueError("lookahead not supported")
+            return object()
+
+        fake_re2 = mock.Mock()
+        fake_re2.compile.side_effect = fake_compile
+        words = [r"/坏(?=词)/", "/b a d  # 英文\n/x"]
+        text = "这是坏词，bad 也是"
+
+        text_processor._compile_profanity.cache_clear()
+        self.addCleanup(text_processor._compile_profanity.cache_clear)
+        with mock.patch.object(text_processor, "re2", fake_re2):
+            compiled = self.tp._compile_profanity(words, "re2")
+            result = self._filter_with_engine(text, words, "substring", "mask", "re2")
+
+        patterns = list(compiled.regex_patterns) + [p for p, _ in compiled.fused_patterns]
+        self.assertTrue(patterns)
+        for pattern in patterns:
+            self.assertIsInstance(pattern, re.Pattern)
+        # VERBOSE 词条不交给 RE2 编译
+        self.assertEqual([c.args[0] for c in fake_re2.compile.call_args_list], [r"坏(?=词)"])
+        self.assertEqual(result, ("这是*词，*** 也是", True))
+        self.assertEqual(result, self._filter_with_engine(text, words, "substring", "mask", "re"))
+
+    def test_post_process_cache_returns_independent_meta(self):
+        # 结果缓存在实例上，使用独立实例避免与共享的 self.tp 互相影响
+        tp = TextProcessor()
+        text = "这是这是坏词"
+        kwargs = {"profanity_words": ["坏词"]}
+        processed, meta = tp.post_process_text(text, **kwargs)
+        meta["changed"] = None
+        processed2, meta2 = tp.post_process_text(text, **kwargs)
+        self.assertEqual(processed2, processed)
+        self.assertEqual(meta2, {"changed": True, "removed_repetitions": True, "profanity_hit": True})
+        self.assertIsNot(meta2, meta)
+        meta2["profanity_hit"] = None
+        self.assertTrue(tp.post_process_text(text, **kwargs)[1]["profanity_hit"])
+
+    def test_post_process_cache_misses_on_any_argument_change(self):
+        tp = TextProcessor()
+        text = "这是这是坏词"
+        base = {
+            "remove_repetitions": True,
+            "profanity_words": ["坏词"],
+            "profanity_action": "mask",
+            "profanity_mask_char": "*",
+            "profanity_replacement": "[X]",
+            "profanity_match_mode": "substring",
+            "profanity_regex_engine": "re",
+        }
+        variants = {
+            "remove_repetitions": False,
+            "profanity_words": ["坏"],
+            "profanity_action": "replace",
+            "profanity_mask_char": "#",
+            "profanity_replacement": "[Y]",
+            "profanity_match_mode": "word",
+            "profanity_regex_engine": "re2",
+        }
+        with mock.patch.object(tp, "clean_text", wraps=tp.clean_text) as clean_text:
+            tp.post_process_text(text, **base)
+            tp.post_process_text(text, **base)
+            self.assertEqual(clean_text.call_count, 1)
+            tp.post_process_text(text + "。", **base)
+            self.assertEqual(clean_text.call_count, 2)
+            for name, value in variants.items():
+                with self.subTest(argument=name):
+                    # 先以基准参数调用一次，使缓存中是基准参数的结果
+                    tp.post_process_text(text, **base)
+                    before = clean_text.call_count
+                    tp.post_process_text(text, **dict(base, **{name: value}))
+                    self.assertEqual(clean_text.call_count, before + 1)
+
+    def test_extract_entities(self):
+        # 期望值为单次扫描实现之前（分别 findall 人名/数字/时间）的输出
+        cases = {
+            "张三在2023年5月12日召开了项目会议，预算为300万。": {
+                "人名:项目会议", "人名:预算为",
+                "数字:2023", "数字:5", "数字:12", "数字:300",
+                "时间:2023年", "时间:5月", "时间:12日",
+            },
+            "我们明天下午3点开会": {"人名:下午", "人名:点开会", "数字:3"},
+            "李四说第2季度收入增长了15%，王五表示同意。": {
+                "人名:李四说第", "人名:季度收入", "人名:王五表示", "人名:同意", "数字:2", "数字:15",
+            },
+            "会议定在10月1日，共有120人参加": {
+                "人名:人参加", "数字:10", "数字:1", "数字:120", "时间:10月", "时间:1日",
+            },
+            "abc 123 测试": {"人名:测试", "数字:123"},
+            "": set(),
+        }
+        for text, expected in cases.items():
+            with self.subTest(text=text):
+                self.assertEqual(self.tp.extract_entities(text), expected)
+
 
 if __name__ == "__main__":
     unittest.main()